@@ -3,7 +3,11 @@ import os, torch, logging
 from transformers import MarianMTModel, MarianTokenizer
 from .cache_manager import ModelCacheManager
 from .gpu_optimizer  import GPUOptimizer
-from .model_compressor import ModelCompressor
+from .model_compressor import ModelCompressor, METHODS
+from .translation_memory import TranslationMemory
+from .batching import run_batched
+from . import onnx_backend
+from .performance_monitor import tracer
 from .config        import Config
 
 class AITranslator:
@@ -12,50 +16,118 @@ class AITranslator:
         self.logger = logging.getLogger(self.__class__.__name__)
         self.cache   = ModelCacheManager(cache_dir=Config.CACHE_DIR,
                                          max_memory_models=Config.MAX_MEMORY_MODELS)
+        self.cache.cleanup_old_cache(Config.CACHE_CLEANUP_DAYS)
         self.gpu_opt = GPUOptimizer(memory_fraction=Config.GPU_MEMORY_FRACTION,
                                     mixed_precision=Config.ENABLE_MIXED_PRECISION)
         self.compr   = ModelCompressor()
 
         name = "Helsinki-NLP/opus-mt-en-ar"
         key  = self.cache.get_model_hash(name)
+        self.tm = None
+        if Config.ENABLE_TRANSLATION_MEMORY and Config.TRANSLATION_SAMPLING:
+            # ترجمة عيّنة عشوائية لا تُحفظ كترجمة دائمة للنص
+            self.logger.info("Translation memory disabled: sampling is on (TRANSLATION_SAMPLING)")
+        elif Config.ENABLE_TRANSLATION_MEMORY:
+            self.tm = TranslationMemory(Config.TRANSLATION_MEMORY_FILE, model_id=self._memory_id(name))
 
         self.logger.info("Loading tokenizer")
         self.tokenizer = self.cache.get_model(f"{key}_tok",
             lambda: MarianTokenizer.from_pretrained(name))
-        self.logger.info("Loading model")
-        self.model = self.cache.get_model(f"{key}_mdl",
-            lambda: self._load_model(name))
+        self.logger.info("Loading model (%s backend)", Config.INFERENCE_BACKEND)
+        if Config.INFERENCE_BACKEND == "onnx":
+            # جلسات ONNX Runtime تُدار من ملفاتها المصدّرة، لا من ذاكرة النماذج
+            self.model = onnx_backend.load_marian(name, key)
+        elif Config.COMPRESS_MODELS:
+            # النسخة المضغوطة تُبنى مرة واحدة وتُحمّل بعدها من compressed_models/ مباشرة
+            self.model = self.compr.load_or_compress(name, lambda: MarianMTModel.from_pretrained(name),
+                                                     method=Config.COMPRESSION_METHOD,
+                                                     compression_ratio=Config.COMPRESSION_RATIO)
+            # طبقات int8 الديناميكية تعمل على الـ CPU فقط
+            if not METHODS[Config.COMPRESSION_METHOD][1]:
+                self.model = self.gpu_opt.optimize_model(self.model)
+        else:
+            self.model = self.cache.get_model(f"{key}_mdl",
+                lambda: self._load_model(name))
+            # النماذج المحمّلة من WeightStore تكون على الـ CPU (mmap)
+            self.model = self.model.to(self.gpu_opt.device)
+
+    @staticmethod
+    def _memory_id(name):
+        """كل ما يغيّر ناتج النموذج لنفس النص: الواجهة الخلفية والضغط وإعدادات الـ decoding"""
+        variant = f":{Config.COMPRESSION_METHOD}:{Config.COMPRESSION_RATIO:g}" if Config.COMPRESS_MODELS else ""
+        return (f"{name}:{Config.INFERENCE_BACKEND}:{Config.COMPRESS_MODELS}{variant}"
+                f":beams={Config.TRANSLATION_BEAM_SIZE}:lp={Config.TRANSLATION_LENGTH_PENALTY:g}"
+                f":max={Config.MAX_SEQUENCE_LENGTH}")
 
     def _load_model(self, name):
         m = MarianMTModel.from_pretrained(name)
-        if Config.COMPRESS_MODELS:
-            m = self.compr.compress_model(m,
-                  method=Config.COMPRESSION_METHOD,
-                  compression_ratio=Config.COMPRESSION_RATIO)
         m = self.gpu_opt.optimize_model(m)
         return m
 
     def translate(self, texts, context=None):
         if isinstance(texts,str): texts=[texts]
+        return self.translate_pages([(texts, context)])[0]
+
+    def translate_pages(self, pages):
+        """ترجمة نصوص عدة صفحات في استدعاء واحد.
+        pages: قائمة (texts, context)، والنتيجة قائمة ترجمات لكل صفحة بنفس الترتيب."""
+        pages = [(list(t), (c or {}).get("emotion","neutral")) for t,c in pages]
+        hits, misses = [], {}
+        for texts, emotion in pages:
+            h = self.tm.lookup(texts, emotion) if (self.tm and texts) else {}
+            hits.append(h)
+            for i,t in enumerate(texts):
+                if i not in h: misses.setdefault((t, emotion), None)
+        if misses:
+            items = list(misses)
+            for item, res in zip(items, self._generate(items)):
+                misses[item] = res
+            if self.tm:
+                for emotion in {e for _,e in items}:
+                    src = [t for t,e in items if e == emotion]
+                    self.tm.store(src, [misses[(t, emotion)] for t in src], emotion)
+        out = []
+        for (texts, emotion), h in zip(pages, hits):
+            out.append([h[i] if i in h else misses[(t, emotion)] for i,t in enumerate(texts)])
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Translated %d texts (%d from memory, %d generated)",
+                              sum(len(t) for t,_ in pages), sum(len(h) for h in hits), len(misses))
+        return out
+
+    def _generate(self, items):
         inst_map={"angry":".مع نبرة غضب.","happy":".بنبرة فرح.","neutral":""}
-        inst = inst_map.get((context or {}).get("emotion","neutral"),"")
-        inputs=[t+inst for t in texts]
-        self.logger.debug(f"Translating texts: {inputs}")
-
-        with self.gpu_opt.optimized_inference() as dev:
-            tok = self.tokenizer(inputs,
-                return_tensors="pt", padding=True, truncation=True,
-                max_length=Config.MAX_SEQUENCE_LENGTH).to(dev)
+        inputs=[t+inst_map.get(e,"") for t,e in items]
+        self.logger.debug("Translating texts: %s", inputs)
+        enc = self.tokenizer(inputs, truncation=True, max_length=Config.MAX_SEQUENCE_LENGTH)
+        feats = [{"input_ids": ids, "attention_mask": am}
+                 for ids, am in zip(enc["input_ids"], enc["attention_mask"])]
+        res = run_batched(feats, [len(f["input_ids"]) for f in feats], self._generate_batch,
+                          token_budget=Config.TRANSLATION_TOKEN_BUDGET,
+                          max_batch_size=Config.TRANSLATION_MAX_BATCH)
+        self.logger.debug("Translated to: %s", res)
+        return res
+
+    def _generate_batch(self, feats):
+        with tracer.span("translate.batch", size=len(feats),
+                         max_tokens=max(len(f["input_ids"]) for f in feats)), \
+             self.gpu_opt.optimized_inference():
+            tok = self.tokenizer.pad(feats, return_tensors="pt").to(self.model.device)
             gen = self.model.generate(**tok,
                 max_length=Config.MAX_SEQUENCE_LENGTH,
                 num_beams=Config.TRANSLATION_BEAM_SIZE,
                 length_penalty=Config.TRANSLATION_LENGTH_PENALTY,
-                do_sample=True, top_p=0.9)
-            res = [self.tokenizer.decode(g, skip_special_tokens=True) for g in gen]
-            self.logger.debug(f"Translated to: {res}")
-            return res
+                **self._decoding())
+            return [self.tokenizer.decode(g, skip_special_tokens=True) for g in gen]
+
+    @staticmethod
+    def _decoding():
+        if Config.TRANSLATION_SAMPLING:
+            return {"do_sample": True, "top_p": Config.TRANSLATION_TOP_P}
+        return {"do_sample": False}
 
     def get_performance_stats(self):
         stats = self.gpu_opt.get_memory_info()
-        self.logger.debug(f"Performance stats: {stats}")
+        stats["backend"] = Config.INFERENCE_BACKEND
+        if self.tm: stats.update(self.tm.get_stats())
+        self.logger.debug("Performance stats: %s", stats)
         return stats
\ No newline at end of file
@@ -0,0 +1,135 @@
+# core/archive.py
+import os, re, zipfile, logging, threading
+from pathlib import Path, PurePosixPath
+import cv2
+from .config import Config
+
+ARCHIVE_FORMATS = ('.cbz', '.zip')
+
+def is_archive(path):
+    return isinstance(path, (str, os.PathLike)) and str(path).lower().endswith(ARCHIVE_FORMATS)
+
+def _natural_key(name):
+    """ترتيب الصفحات كما يتوقعه القارئ: page2 قبل page10"""
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+class PageBytes:
+    """صفحة مرمّزة في الذاكرة (من أرشيف): تقبلها MangaTranslationPipeline.process بدل مسار الملف"""
+    __slots__ = ("archive", "member", "data")
+
+    def __init__(self, archive, member, data):
+        self.archive = str(archive)
+        self.member = member
+        self.data = data
+
+    def __str__(self):
+        return f"{self.archive}!{self.member}"
+
+    def decode(self):
+        import numpy as np
+        return cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+
+class ArchiveReader:
+    """قراءة صفحات CBZ/ZIP بترتيبها دون فك الأرشيف على القرص؛ كل صفحة تُقرأ عند الطلب فقط"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.zip = zipfile.ZipFile(self.path)
+        exts = tuple(Config.SUPPORTED_IMAGE_FORMATS)
+        infos = [i for i in self.zip.infolist()
+                 if not i.is_dir() and not i.filename.startswith("__MACOSX/")]
+        self.members = sorted((i.filename for i in infos if i.filename.lower().endswith(exts)), key=_natural_key)
+        # ComicInfo.xml وما شابه يُنسخ كما هو إلى الأرشيف الناتج
+        self.extras = [i.filename for i in infos if not i.filename.lower().endswith(exts)]
+
+    def __len__(self):
+        return len(self.members)
+
+    def pages(self):
+        for name in self.members:
+            yield PageBytes(self.path, name, self.zip.read(name))
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+class ArchiveWriter:
+    """كتابة الصفحات المترجمة إلى CBZ فور انتهاء كل صفحة (بأي ترتيب).
+    الصور مضغوطة أصلاً فتُخزّن بدون ضغط zip؛ الأرشيف يُكتب باسم مؤقت ويُنقل عند اكتمال كل الصفحات.
+    الخروج من with قبل اكتمالها (استثناء أو صفحات لم تصل) يحذف الملف المؤقت فيبقى الناتج السابق كما هو."""
+
+    def __init__(self, path, expected, extras=None, source=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".tmp")
+        self.zip = zipfile.ZipFile(self.tmp, "w", zipfile.ZIP_STORED)
+        self.expected, self.seen, self.failed = expected, 0, 0
+        self.lock = threading.Lock()
+        # أسماء محجوزة: صفحات المصدر (ما لم يصل منها بعد أيضاً) والملفات المنسوخة وما كُتب
+        self.names = set(extras or []) | set(source.members if source is not None else [])
+        for name in extras or []:
+            self.zip.writestr(name, source.zip.read(name))
+        if not expected:
+            self.close()
+
+    def _rename(self, member, suffix):
+        """member بامتداد جديد، باسم لا يصطدم بصفحة أخرى في الأرشيف ("b.png" ثم "b (2).png")"""
+        path = PurePosixPath(member)
+        name, n = str(path.with_suffix(suffix)), 1
+        while name in self.names:
+            n += 1; name = str(path.with_name(f"{path.stem} ({n}){suffix}"))
+        return name
+
+    def add(self, member, data):
+        """data: بايتات الصورة المرمّزة، أو None لصفحة فشلت (تُحتسب ولا تُكتب). يعيد اسم الصفحة في الأرشيف:
+        الشرائط الطويلة تُكتب PNG دائماً (core.strip) فيتغير امتدادها"""
+        with self.lock:
+            if data is not None:
+                if data[:8] == b"\x89PNG\r\n\x1a\n" and not member.lower().endswith(".png"):
+                    member = self._rename(member, ".png")
+                self.names.add(member)
+                self.zip.writestr(member, data)
+            else:
+                self.failed += 1
+            self.seen += 1
+            if self.seen >= self.expected:
+                self.close()
+        return member
+
+    def close(self):
+        """نشر الأرشيف إذا وصلت كل الصفحات، وإلا حذفه"""
+        if self.zip is None:
+            return
+        if self.seen < self.expected:
+            return self.abort()
+        self.zip.close(); self.zip = None
+        os.replace(self.tmp, self.path)
+        self.logger.info("Wrote %s (%d/%d pages)", self.path, self.seen - self.failed, self.expected)
+
+    def abort(self):
+        if self.zip is None:
+            return
+        self.zip.close(); self.zip = None
+        try:
+            os.unlink(self.tmp)
+        except OSError:
+            pass
+        self.logger.warning("Discarded %s (%d/%d pages arrived)", self.path, self.seen, self.expected)
+
+    def __enter__(self): return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+def encode_page(page, image):
+    """ترميز الصفحة المترجمة بنفس صيغة الأصل داخل الأرشيف"""
+    ext = Path(page.member).suffix.lower() or ".png"
+    ok, buf = cv2.imencode(ext, image)
+    if not ok:
+        raise OSError(f"Could not encode {page}")
+    return buf.tobytes()
@@ -0,0 +1,265 @@
+# core/batch.py
+import os, gc, glob, time, logging
+import multiprocessing as mp
+from contextlib import ExitStack
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from .archive import ArchiveReader, ArchiveWriter, PageBytes, is_archive, encode_page, ARCHIVE_FORMATS
+from .config import Config
+from .logger import flush_logging
+from .performance_monitor import tracer, read_trace_records, summarize_records, write_chrome_trace
+
+# pipeline خاص بكل عملية عاملة
+_pipeline = None
+
+def _init_worker(threads, shared=False):
+    global _pipeline
+    import cv2, torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    if not Config.ONNX_INTRA_OP_THREADS:
+        Config.ONNX_INTRA_OP_THREADS = threads
+    if shared:   # الـ pipeline موروث من العملية الأم عبر fork
+        # اتصال SQLite لا يُشارك بين العمليات: كل عملية تفتح اتصالها الخاص بذاكرة الترجمة
+        tm = getattr(_pipeline.translator, "tm", None) if _pipeline.is_ready(["translator"]) else None
+        if tm is not None:
+            tm.reopen()
+        return
+    from .pipeline import MangaTranslationPipeline
+    _pipeline = MangaTranslationPipeline(preload=True)
+
+def _share_blocker():
+    """سبب عدم إمكان مشاركة النماذج عبر fork، أو None"""
+    import torch
+    if "fork" not in mp.get_all_start_methods():
+        return "fork is not available on this platform"
+    if Config.INFERENCE_BACKEND == "onnx":
+        return "ONNX Runtime sessions are not fork-safe"
+    if torch.cuda.is_available():
+        return "CUDA cannot be used in forked workers"
+    return None
+
+def _load_shared():
+    """تحميل النماذج مرة واحدة في العملية الأم قبل fork: صفحات الأوزان تبقى مشتركة (copy-on-write)
+    لأن الاستدلال لا يكتب عليها. gc.freeze يمنع الـ GC في العمليات العاملة من لمس صفحات الكائنات الموروثة."""
+    global _pipeline
+    from .pipeline import MangaTranslationPipeline
+    _pipeline = MangaTranslationPipeline(preload=True)
+    tracer.flush()   # حتى لا تعيد العمليات العاملة تصدير مقاطع التحميل الموروثة
+    gc.collect()
+    gc.freeze()
+
+def _memory(pids):
+    """RSS وPSS وUSS بالـ MB؛ USS هو ما تضيفه كل عملية فعلاً، وPSS يوزّع الصفحات المشتركة بين العمليات"""
+    import psutil
+    mem = {}
+    for pid in pids:
+        try:
+            m = psutil.Process(pid).memory_full_info()
+        except psutil.Error:
+            continue
+        mem[pid] = {k: round(getattr(m, k, 0) / 2**20, 1) for k in ("rss", "pss", "uss")}
+    return mem
+
+def _process_page(path, output_dir):
+    import cv2
+    from .strip import StripProcessor, is_strip
+    start = time.perf_counter()
+    try:
+        if is_strip(path):
+            # شرائط webtoon الطويلة تُكتب تدريجياً كـ PNG دون تجميع الصفحة في الذاكرة
+            out, blocks = StripProcessor(_pipeline).process_page(path, output_dir)
+            return str(path), out, len(blocks), time.perf_counter()-start, None, os.getpid()
+        if isinstance(path, PageBytes):
+            # صفحة من أرشيف: تُعاد مرمّزة ليكتبها الأب في الأرشيف الناتج
+            final, blocks = _pipeline.process(path)
+            return str(path), encode_page(path, final), len(blocks), time.perf_counter()-start, None, os.getpid()
+        final, blocks = _pipeline.process(path)
+        out = Path(output_dir) / Path(path).name
+        if not cv2.imwrite(str(out), final):
+            raise OSError(f"Could not write {out}")
+        return path, str(out), len(blocks), time.perf_counter()-start, None, os.getpid()
+    except Exception as e:
+        return str(path), None, 0, time.perf_counter()-start, f"{type(e).__name__}: {e}", os.getpid()
+    finally:
+        tracer.flush()
+        flush_logging()   # مقاطع الصفحة على القرص قبل أن تقرأها العملية الأم في _log_summary
+
+def collect_inputs(patterns):
+    """جمع مسارات الصفحات وأرشيفات CBZ/ZIP من مجلدات أو أنماط glob"""
+    exts = tuple(Config.SUPPORTED_IMAGE_FORMATS) + ARCHIVE_FORMATS
+    paths = []
+    for p in patterns:
+        if os.path.isdir(p):
+            found = [str(f) for f in Path(p).iterdir() if f.suffix.lower() in exts]
+        else:
+            found = [f for f in glob.glob(p) if f.lower().endswith(exts)]
+        paths.extend(sorted(found))
+    return list(dict.fromkeys(paths))
+
+def _count_pages(paths):
+    total = 0
+    for p in paths:
+        if is_archive(p):
+            with ArchiveReader(p) as reader:
+                total += len(reader)
+        else:
+            total += 1
+    return total
+
+def _sources(paths, output_dir, stack, sinks):
+    """الصفحات بالترتيب: الملفات كمسارات، وصفحات الأرشيفات كـ PageBytes تُقرأ واحدة واحدة.
+    لكل أرشيف أرشيف ناتج بنفس الاسم في output_dir، وsinks تربط كل صفحة بـ (writer, member)."""
+    for p in paths:
+        if not is_archive(p):
+            yield p; continue
+        reader = stack.enter_context(ArchiveReader(p))
+        writer = stack.enter_context(ArchiveWriter(Path(output_dir) / Path(p).name, len(reader),
+                                                   reader.extras, reader))
+        for page in reader.pages():
+            sinks[str(page)] = (writer, page.member)
+            yield page
+
+def _to_sink(sinks, path, out, n, secs, err):
+    """كتابة نتيجة صفحة الأرشيف (بايتات مرمّزة) في أرشيفها الناتج؛ نتائج الملفات تمر كما هي"""
+    sink = sinks.pop(path, None)
+    if sink is None:
+        return path, out, n, secs, err
+    writer, member = sink
+    member = writer.add(member, None if err else out)
+    return path, None if err else f"{writer.path}!{member}", n, secs, err
+
+def _bounded(pool, items, limit, *args):
+    """submit + as_completed مع حد للمهام المعلّقة، حتى لا تُقرأ كل صفحات الأرشيف في الذاكرة دفعة واحدة"""
+    pending = set()
+    for item in items:
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done: yield fut.result()
+        pending.add(pool.submit(_process_page, item, *args))
+    for fut in as_completed(pending):
+        yield fut.result()
+
+class BatchReport:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failures = []
+        self.elapsed = 0.0
+        self.stages = {}
+        self.memory = {}
+
+    @property
+    def pages_per_second(self):
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+def _log_page(logger, report, i, path, out, n, secs, err):
+    if err:
+        report.failures.append((path, err))
+        logger.error("[%d/%d] FAILED %s: %s", i, report.total, path, err)
+    else:
+        report.done += 1
+        logger.info("[%d/%d] %s -> %s (%d blocks, %.2fs)", i, report.total, path, out, n, secs)
+
+def _log_summary(logger, report, since_us):
+    logger.info("Batch finished: %d/%d pages in %.1fs (%.2f pages/s), %d failed",
+                report.done, report.total, report.elapsed, report.pages_per_second, len(report.failures))
+    tracer.flush()
+    flush_logging()
+    recs = read_trace_records(since_us=since_us)
+    if not recs:
+        return
+    report.stages = summarize_records(recs)
+    for name, st in sorted(report.stages.items()):
+        logger.info("  %-16s n=%-5d p50=%8.1fms p95=%8.1fms p99=%8.1fms",
+                    name, st["count"], st["p50_ms"], st["p95_ms"], st["p99_ms"])
+    write_chrome_trace(recs, Config.TRACE_FILE)
+    logger.info("Chrome trace written to %s", Config.TRACE_FILE)
+
+def run_stream(paths, output_dir):
+    """ترجمة الصفحات في عملية واحدة مع تداخل المراحل (core.streaming)"""
+    import cv2
+    from .pipeline import MangaTranslationPipeline
+    from .streaming import StreamingPipeline
+    from .strip import StripProcessor
+    logger = logging.getLogger("Batch")
+    report = BatchReport(_count_pages(paths))
+    stream = StreamingPipeline(MangaTranslationPipeline())
+    logger.info("Streaming batch: %d pages, queue size %d", report.total, stream.queue_size)
+    since_us = time.perf_counter_ns() // 1000
+    start = last = time.perf_counter()
+    with ExitStack() as stack:
+        sinks = {}
+        for i, job in enumerate(stream.run(_sources(paths, output_dir, stack, sinks)), 1):
+            out, err = None, None
+            try:
+                if job.error is not None:
+                    err = f"{type(job.error).__name__}: {job.error}"
+                elif job.strip:
+                    # تجاوز الشريط مراحل التدفق؛ يُعالج هنا شريحة شريحة بينما تكمل المراحل الصفحات التالية
+                    out, job.blocks = StripProcessor(stream.pipeline).process_page(job.path, output_dir)
+                elif isinstance(job.path, PageBytes):
+                    out = encode_page(job.path, job.final)
+                else:
+                    out = Path(output_dir) / Path(job.path).name
+                    if not cv2.imwrite(str(out), job.final):
+                        raise OSError(f"Could not write {out}")
+            except Exception as e:
+                out, err = None, f"{type(e).__name__}: {e}"
+            now = time.perf_counter()
+            _log_page(logger, report, i, *_to_sink(sinks, str(job.path), out, len(job.blocks or []), now-last, err))
+            last = now
+            job.final = None
+            tracer.flush()
+    report.elapsed = time.perf_counter() - start
+    _log_summary(logger, report, since_us)
+    return report
+
+def _log_memory(logger, report, parent, workers):
+    report.memory = {"parent": parent, "workers": workers}
+    for name, m in [("parent", parent)] + [(f"worker {pid}", m) for pid, m in workers.items()]:
+        logger.info("  %-14s rss=%8.1fMB pss=%8.1fMB uss=%8.1fMB", name, m["rss"], m["pss"], m["uss"])
+    total = parent["pss"] + sum(m["pss"] for m in workers.values())
+    logger.info("  total pss=%.1fMB for %d workers", total, len(workers))
+
+def run_batch(patterns, workers=None, output_dir=None, stream=False, shared=None):
+    """ترجمة مجموعة صفحات بالتوازي عبر عدة عمليات.
+    shared: تحميل النماذج مرة واحدة في العملية الأم ومشاركتها مع العمليات العاملة (الافتراضي Config.BATCH_SHARE_MODELS)"""
+    logger = logging.getLogger("Batch")
+    paths = collect_inputs(patterns)
+    output_dir = Path(output_dir or Config.OUTPUT_DIR)
+    output_dir.mkdir(exist_ok=True, parents=True)
+    if stream and paths:
+        return run_stream(paths, output_dir)
+    report = BatchReport(_count_pages(paths))
+    workers = max(1, min(workers or Config.BATCH_WORKERS, report.total or 1))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    if not paths:
+        logger.warning("No input pages found")
+        return report
+
+    shared = Config.BATCH_SHARE_MODELS if shared is None else shared
+    blocker = shared and workers > 1 and _share_blocker()
+    if blocker:
+        logger.warning("Shared models disabled: %s; each worker loads its own copy", blocker)
+    shared = shared and workers > 1 and not blocker
+    logger.info("Batch: %d pages, %d workers x %d threads%s",
+                report.total, workers, threads, ", models shared via fork" if shared else "")
+    since_us = time.perf_counter_ns() // 1000
+    start = time.perf_counter()
+    if shared:
+        _load_shared()
+    ctx = mp.get_context("fork") if shared else None
+    with ExitStack() as stack, ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                   initargs=(threads, shared), mp_context=ctx) as pool:
+        sinks, pids = {}, set()
+        results = _bounded(pool, _sources(paths, output_dir, stack, sinks), 2*workers, str(output_dir))
+        for i, (*res, pid) in enumerate(results, 1):
+            pids.add(pid)
+            _log_page(logger, report, i, *_to_sink(sinks, *res))
+        # العمليات العاملة ما زالت حية هنا (كل صفحة تحمل معرّف العملية التي عالجتها)
+        mem = _memory([os.getpid()] + sorted(pids))
+    report.elapsed = time.perf_counter() - start
+    _log_summary(logger, report, since_us)
+    _log_memory(logger, report, mem.pop(os.getpid()), mem)
+    return report
\ No newline at end of file
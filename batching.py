@@ -0,0 +1,27 @@
+# core/batching.py
+
+def plan_batches(lengths, token_budget, max_batch_size=None):
+    """تقسيم المدخلات إلى دفعات صغيرة مرتبة حسب الطول.
+    كل دفعة تحقق: عدد العناصر × أطول عنصر فيها <= token_budget (بعد الحشو).
+    يعيد قائمة من قوائم الفهارس الأصلية."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, cur, cur_max = [], [], 0
+    for i in order:
+        new_max = max(cur_max, lengths[i])
+        full = max_batch_size and len(cur) >= max_batch_size
+        if cur and (full or new_max * (len(cur)+1) > token_budget):
+            batches.append(cur)
+            cur, new_max = [], lengths[i]
+        cur.append(i)
+        cur_max = new_max
+    if cur:
+        batches.append(cur)
+    return batches
+
+def run_batched(items, lengths, fn, token_budget, max_batch_size=None):
+    """تطبيق fn على دفعات مرتبة حسب الطول ثم إعادة النتائج بالترتيب الأصلي"""
+    out = [None] * len(items)
+    for idx in plan_batches(lengths, token_budget, max_batch_size):
+        for i, r in zip(idx, fn([items[i] for i in idx])):
+            out[i] = r
+    return out
\ No newline at end of file
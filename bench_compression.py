@@ -0,0 +1,121 @@
+# benchmarks/bench_compression.py
+"""تقرير الضغط: الحجم وزمن الـ CPU وجودة الترجمة (chrF) لكل إعداد، لاختيار COMPRESSION_METHOD/RATIO
+
+    python benchmarks/bench_compression.py [--model Helsinki-NLP/opus-mt-en-ar]
+                                           [--settings fp32,int8,int8_sparse:0.3,pruning:0.3]
+                                           [--runs 3] [--batch 8] [--threads N] [--json report.json]
+
+- النسخ المضغوطة تُحفظ في compressed_models/ (المكان الذي يقرأ منه التطبيق) فلا تُبنى مرتين
+- الجودة تُقاس على benchmarks/compression_samples.json مقابل ترجمات مرجعية، وأيضاً مقابل مخرجات fp32
+- الترجمة هنا حتمية (beam search بدون sampling) حتى تكون المقارنة عادلة
+"""
+import sys, json, time, argparse, statistics
+from collections import Counter
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+SAMPLES = HERE / "compression_samples.json"
+
+import torch
+from core.config import Config
+from core.model_compressor import ModelCompressor, METHODS
+
+def _ngrams(text, n):
+    text = text.replace(" ", "")
+    return Counter(text[i:i+n] for i in range(len(text) - n + 1))
+
+def chrf(hyps, refs, order=6, beta=2):
+    """chrF على مستوى المجموعة (Popović 2015): متوسط دقة واسترجاع n-grams الحروف حتى order"""
+    stats = [[0, 0, 0] for _ in range(order)]   # match, hyp, ref
+    for h, r in zip(hyps, refs):
+        for n in range(1, order + 1):
+            hc, rc = _ngrams(h, n), _ngrams(r, n)
+            s = stats[n-1]
+            s[0] += sum((hc & rc).values()); s[1] += sum(hc.values()); s[2] += sum(rc.values())
+    used = [(m/h, m/r) for m, h, r in stats if h and r]
+    if not used:
+        return 0.0
+    p = sum(x for x, _ in used) / len(used)
+    r = sum(y for _, y in used) / len(used)
+    return 0.0 if p + r == 0 else 100 * (1 + beta**2) * p * r / (beta**2 * p + r)
+
+def translate_all(model, tok, texts, batch):
+    out = []
+    for i in range(0, len(texts), batch):
+        enc = tok(texts[i:i+batch], return_tensors="pt", padding=True,
+                  truncation=True, max_length=Config.MAX_SEQUENCE_LENGTH)
+        with torch.no_grad():
+            gen = model.generate(**enc, num_beams=Config.TRANSLATION_BEAM_SIZE, do_sample=False,
+                                 max_length=Config.MAX_SEQUENCE_LENGTH)
+        out += tok.batch_decode(gen, skip_special_tokens=True)
+    return out
+
+def load_setting(compr, name, setting):
+    """يعيد (model, زمن التحميل من القرص، حجم الأثر على القرص)"""
+    from transformers import MarianMTModel
+    if setting == "fp32":
+        start = time.perf_counter()
+        model = MarianMTModel.from_pretrained(name).eval()
+        return model, time.perf_counter() - start, None
+    method, _, ratio = setting.partition(":")
+    ratio = float(ratio or Config.COMPRESSION_RATIO)
+    compr.load_or_compress(name, lambda: MarianMTModel.from_pretrained(name), method, ratio)
+    path = compr.artifact_path(name, method, ratio)
+    start = time.perf_counter()
+    model = compr.load(path)
+    disk = sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1024 / 1024
+    return model, time.perf_counter() - start, disk
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default="Helsinki-NLP/opus-mt-en-ar")
+    ap.add_argument("--settings", default="fp32,int8,int8_sparse:0.3,pruning:0.3",
+                    help=f"fp32 أو method[:ratio] حيث method من {sorted(METHODS)}")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--output", help="مجلد النسخ المضغوطة (الافتراضي Config.COMPRESSED_MODELS_DIR)")
+    ap.add_argument("--json", help="حفظ التقرير في ملف JSON")
+    args = ap.parse_args()
+
+    from transformers import MarianTokenizer
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    samples = json.loads(SAMPLES.read_text(encoding="utf-8"))
+    src, refs = [s["en"] for s in samples], [s["ar"] for s in samples]
+    tok = MarianTokenizer.from_pretrained(args.model)
+    compr = ModelCompressor(args.output)
+
+    report, base = {}, None
+    print(f"{len(src)} sentences, batch={args.batch}, beams={Config.TRANSLATION_BEAM_SIZE}, "
+          f"torch threads={torch.get_num_threads()}")
+    print(f"{'setting':<18} {'size_mb':>8} {'disk_mb':>8} {'sparsity':>8} {'load_s':>7} "
+          f"{'ms/sent':>8} {'chrF':>6} {'ΔchrF':>6} {'vs_base':>7}")
+    for setting in args.settings.split(","):
+        model, load_s, disk = load_setting(compr, args.model, setting)
+        hyps = translate_all(model, tok, src, args.batch)   # إحماء + المخرجات
+        times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            translate_all(model, tok, src, args.batch)
+            times.append(time.perf_counter() - start)
+        if base is None:
+            base = hyps
+        r = report[setting] = {
+            "size_mb": round(compr._model_size(model), 2), "disk_mb": disk and round(disk, 2),
+            "sparsity": round(compr.sparsity(model), 4), "load_s": round(load_s, 3),
+            "ms_per_sentence": round(1000 * statistics.median(times) / len(src), 2),
+            "chrf": round(chrf(hyps, refs), 2), "chrf_vs_first": round(chrf(hyps, base), 2)}
+        first = next(iter(report.values()))
+        r["chrf_delta"] = round(r["chrf"] - first["chrf"], 2)
+        print(f"{setting:<18} {r['size_mb']:>8.1f} {disk or float('nan'):>8.1f} {100*r['sparsity']:>7.1f}% "
+              f"{r['load_s']:>7.2f} {r['ms_per_sentence']:>8.1f} {r['chrf']:>6.1f} "
+              f"{r['chrf_delta']:>+6.1f} {r['chrf_vs_first']:>7.1f}")
+        del model
+    print("ΔchrF و vs_base محسوبان نسبةً إلى أول إعداد في --settings (fp32 افتراضياً)")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
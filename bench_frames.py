@@ -0,0 +1,92 @@
+# benchmarks/bench_frames.py
+"""عدد مخازن الصفحة الكاملة (نسخ وتحويلات ألوان) وذروة الذاكرة لكل صفحة ولكل مرحلة
+
+    python benchmarks/bench_frames.py [--models stub] [--resolution large] [--density dense] [--pages 3]
+
+يعدّ مخازن numpy/OpenCV بحجم الصفحة (≥ 90% منها) التي تنشئها استدعاءات C أثناء معالجة الصفحة
+(cvtColor، copy، np.array...) عبر tracemalloc؛ ذاكرة torch وPillow خارج القياس لأنهما يستخدمان مخصّصاتهما.
+"""
+import os, sys, argparse, tempfile, tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("PAGE_STORE", "false")
+os.environ.setdefault("PAGE_CACHE", "false")
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cv2
+from benchmark import RESOLUTIONS, DENSITIES, make_page, build_pipeline
+
+STAGES = ["load", "detect", "recognize", "translate_results", "inpaint", "render"]
+
+class FrameCounter:
+    """profile hook: مخزن جديد بحجم الصفحة = زيادة الذاكرة المتتبعة بين c_call وc_return"""
+
+    def __init__(self, frame_bytes):
+        self.threshold = 0.9 * frame_bytes
+        self.stack, self.count = [], 0
+
+    def __call__(self, frame, event, arg):
+        if event == "c_call":
+            self.stack.append(tracemalloc.get_traced_memory()[0])
+        elif event in ("c_return", "c_exception") and self.stack:
+            if tracemalloc.get_traced_memory()[0] - self.stack.pop() >= self.threshold:
+                self.count += 1
+
+def instrument(pipeline, counter, stats):
+    """تغليف مراحل الـ pipeline لقياس كل مرحلة على حدة"""
+    for name in STAGES:
+        fn = getattr(pipeline, name)
+        def wrapped(*a, _fn=fn, _name=name, **kw):
+            base, before = tracemalloc.get_traced_memory()[0], counter.count
+            tracemalloc.reset_peak()
+            try:
+                return _fn(*a, **kw)
+            finally:
+                st = stats.setdefault(_name, {"frames": 0, "peak_mb": 0.0})
+                st["frames"] += counter.count - before
+                st["peak_mb"] = max(st["peak_mb"], (tracemalloc.get_traced_memory()[1] - base) / 2**20)
+        setattr(pipeline, name, wrapped)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models", choices=["auto", "real", "stub"], default="stub")
+    ap.add_argument("--resolution", choices=list(RESOLUTIONS), default="large")
+    ap.add_argument("--density", choices=list(DENSITIES), default="sparse")
+    ap.add_argument("--pages", type=int, default=3)
+    args = ap.parse_args()
+
+    pipeline, kinds = build_pipeline(args.models)
+    w, h = RESOLUTIONS[args.resolution]
+    frame_mb = w * h * 3 / 2**20
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.pages + 1):
+            paths.append(str(Path(tmp) / f"{i}.png"))
+            cv2.imwrite(paths[-1], make_page((w, h), DENSITIES[args.density], seed=i)[0])
+        pipeline.process(paths[0])   # إحماء (تحميل الخطوط وذاكرات القياس)
+
+        counter, stats = FrameCounter(w * h * 3), {}
+        instrument(pipeline, counter, stats)
+        tracemalloc.start()
+        peak = 0.0
+        for path in paths[1:]:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            sys.setprofile(counter)
+            try:
+                pipeline.process(path)
+            finally:
+                sys.setprofile(None)
+            peak = max(peak, (tracemalloc.get_traced_memory()[1] - base) / 2**20)
+        tracemalloc.stop()
+
+    n = args.pages
+    print(f"models: {kinds}  page {w}x{h} ({frame_mb:.1f} MB BGR), {n} pages")
+    print(f"{'stage':<18} {'frames/page':>11} {'peak_mb':>8}")
+    for name in STAGES:
+        st = stats.get(name, {"frames": 0, "peak_mb": 0.0})
+        print(f"{name:<18} {st['frames']/n:>11.1f} {st['peak_mb']:>8.1f}")
+    print(f"{'page':<18} {counter.count/n:>11.1f} {peak:>8.1f}")
+
+if __name__ == "__main__":
+    main()
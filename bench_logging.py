@@ -0,0 +1,93 @@
+# benchmarks/bench_logging.py
+"""كلفة التسجيل لكل صفحة: pipeline.process مع كل إعداد لـ core.logger مقارنة بتسجيل معطّل
+
+    python benchmarks/bench_logging.py [--models stub] [--level DEBUG] [--pages 10] [--rounds 3]
+
+caller_us: الزمن الذي تدفعه خيوط المعالجة داخل handler الطابور (الفلترة ودمج الوسائط والإضافة إلى الطابور)؛
+التنسيق والكتابة على خيط QueueListener. مخرجات الطرفية تُوجّه إلى /dev/null أثناء القياس.
+"""
+import os, sys, time, logging, argparse, tempfile
+from pathlib import Path
+
+os.environ.setdefault("PAGE_STORE", "false")
+os.environ.setdefault("PAGE_CACHE", "false")
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import cv2
+from benchmark import RESOLUTIONS, DENSITIES, make_page, build_pipeline
+from core import logger as core_logger
+from core.config import Config
+from core.performance_monitor import tracer
+
+CONFIGS = {"off": None, "sync/text": (False, "text"), "async/text": (True, "text"), "async/json": (True, "json")}
+
+def configure(name, level, log_dir):
+    logging.disable(logging.NOTSET)
+    if CONFIGS[name] is None:
+        core_logger.stop_logging()
+        logging.disable(logging.CRITICAL)
+        return
+    Config.LOG_ASYNC, Config.LOG_FORMAT = CONFIGS[name]
+    Config.LOG_LEVEL = level
+    Config.LOG_DIR = log_dir / name.replace("/", "_")
+    Config.LOG_FILE = Config.LOG_DIR / "manga_translator.log"
+    Config.ERROR_LOG_FILE = Config.LOG_DIR / "errors.log"
+    Config.PERFORMANCE_LOG_FILE = Config.LOG_DIR / "performance.log"
+    core_logger.setup_logging()
+
+def run(pipeline, paths):
+    """مثل core.batch: تصدير مقاطع الأداء بعد كل صفحة"""
+    start = time.perf_counter()
+    for path in paths:
+        pipeline.process(path)
+        tracer.flush()
+    return time.perf_counter() - start
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models", choices=["auto", "real", "stub"], default="stub")
+    ap.add_argument("--resolution", choices=list(RESOLUTIONS), default="small")
+    ap.add_argument("--density", choices=list(DENSITIES), default="dense")
+    ap.add_argument("--level", default="DEBUG")
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+
+    pipeline, kinds = build_pipeline(args.models)
+    w, h = RESOLUTIONS[args.resolution]
+    stats = {name: {"secs": 0.0, "records": 0, "caller_ns": 0} for name in CONFIGS}
+    stderr = sys.stderr
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        paths = []
+        for i in range(args.pages):
+            paths.append(str(Path(tmp) / f"{i}.png"))
+            cv2.imwrite(paths[-1], make_page((w, h), DENSITIES[args.density], seed=i)[0])
+        pipeline.process(paths[0])   # إحماء
+        sys.stderr = devnull
+        try:
+            # الجولات تتناوب بين الإعدادات حتى لا يُحسب انحراف زمني على إعداد واحد
+            for _ in range(args.rounds):
+                for name in CONFIGS:
+                    configure(name, args.level, Path(tmp))
+                    secs = run(pipeline, paths)
+                    core_logger.flush_logging()
+                    st, ls = stats[name], core_logger.log_stats() if CONFIGS[name] else {}
+                    st["secs"] += secs
+                    st["records"] += ls.get("records", 0)
+                    st["caller_ns"] += ls.get("caller_ms", 0.0) * 1e6
+            core_logger.stop_logging()
+        finally:
+            sys.stderr = stderr
+            logging.disable(logging.NOTSET)
+
+    n = args.pages * args.rounds
+    base = stats["off"]["secs"] / n * 1000
+    print(f"models: {kinds}  page {w}x{h}, level {args.level}, {n} pages per config")
+    print(f"{'config':<12} {'ms/page':>8} {'overhead':>9} {'records/page':>13} {'caller_us/page':>15}")
+    for name, st in stats.items():
+        ms = st["secs"] / n * 1000
+        caller = f"{st['caller_ns'] / n / 1e3:.0f}" if st["records"] else "-"
+        print(f"{name:<12} {ms:>8.1f} {ms - base:>+8.2f}ms {st['records'] / n:>13.1f} {caller:>15}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_model_cache.py
+"""مقارنة زمن بدء التشغيل: pickle (الصيغة القديمة) مقابل WeightStore (mmap)
+
+    python benchmarks/bench_model_cache.py [--model Helsinki-NLP/opus-mt-en-ar] [--runs 3]
+
+كل قياس يتم في عملية جديدة حتى لا تؤثر الذاكرة المحمّلة مسبقاً على النتيجة.
+"""
+import sys, time, json, pickle, argparse, tempfile, subprocess, resource
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def _child(method, cache_dir):
+    start = time.perf_counter()
+    if method == "pickle":
+        with open(Path(cache_dir) / "model.pkl", "rb") as f:
+            model = pickle.load(f)
+    else:
+        from core.weight_store import WeightStore
+        model = WeightStore(cache_dir).load("model")
+    load_s = time.perf_counter() - start
+    n = sum(p.numel() for p in model.parameters())
+    print(json.dumps({"load_s": load_s, "params": n,
+                      "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default="Helsinki-NLP/opus-mt-en-ar")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--child", nargs=2, metavar=("METHOD", "DIR"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return _child(*args.child)
+
+    from transformers import MarianMTModel
+    from core.weight_store import WeightStore
+    with tempfile.TemporaryDirectory() as tmp:
+        model = MarianMTModel.from_pretrained(args.model)
+        with open(Path(tmp) / "model.pkl", "wb") as f:
+            pickle.dump(model, f)
+        WeightStore(tmp).save("model", model)
+        del model
+
+        print(f"{'method':<8} {'run':>3} {'load_s':>8} {'max_rss_mb':>11}")
+        for method in ("pickle", "mmap"):
+            for run in range(args.runs):
+                out = subprocess.run([sys.executable, __file__, "--child", method, tmp],
+                                     capture_output=True, text=True, check=True).stdout
+                r = json.loads(out.strip().splitlines()[-1])
+                print(f"{method:<8} {run:>3} {r['load_s']:>8.3f} {r['max_rss_mb']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
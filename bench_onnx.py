@@ -0,0 +1,92 @@
+# benchmarks/bench_onnx.py
+"""مقارنة PyTorch (eager) مع ONNX Runtime على الـ CPU لنموذجي MarianMT وLaMa
+
+    python benchmarks/bench_onnx.py [--model Helsinki-NLP/opus-mt-en-ar] [--lama PATH/big-lama.pt]
+                                    [--sizes 256,512] [--runs 5] [--threads N]
+
+التصدير يتم مرة واحدة إلى مجلد مؤقت؛ الأزمنة لا تشمل التصدير ولا التحميل.
+"""
+import sys, os, time, argparse, tempfile, statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np, torch
+from core.config import Config
+
+SENTENCES = [
+    "What are you doing here?", "I told you not to come back!", "Hey... wait for me!",
+    "This is the end of the road for you.", "Huh? Really?", "We have to go now, run!",
+    "So you came after all.", "It's over. Everything we fought for is gone.",
+]
+
+def _time(fn, runs):
+    fn()   # إحماء
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter(); fn(); times.append(time.perf_counter() - start)
+    return 1000 * statistics.median(times)
+
+def bench_marian(name, runs):
+    from transformers import MarianMTModel, MarianTokenizer
+    from core import onnx_backend
+    tok = MarianTokenizer.from_pretrained(name)
+    eager = MarianMTModel.from_pretrained(name).eval()
+    ort_model = onnx_backend.load_marian(name, "bench_marian")
+    batch = tok(SENTENCES, return_tensors="pt", padding=True)
+    kw = dict(max_length=Config.MAX_SEQUENCE_LENGTH, num_beams=Config.TRANSLATION_BEAM_SIZE)
+    with torch.no_grad():
+        out_e = eager.generate(**batch, **kw)
+        t_e = _time(lambda: eager.generate(**batch, **kw), runs)
+    out_o = ort_model.generate(**batch, **kw)
+    t_o = _time(lambda: ort_model.generate(**batch, **kw), runs)
+    same = tok.batch_decode(out_e, skip_special_tokens=True) == tok.batch_decode(out_o, skip_special_tokens=True)
+    print(f"marian  batch={len(SENTENCES):<3} eager={t_e:8.1f}ms  onnx={t_o:8.1f}ms  "
+          f"speedup={t_e/t_o:4.2f}x  same_output={same}")
+
+def bench_lama(path, sizes, runs):
+    from core.onnx_backend import LamaONNX
+    jit = torch.jit.load(str(path), map_location="cpu").eval()
+    lama = LamaONNX(lambda: jit)
+    config = type("C", (), {"hd_strategy": "original"})()
+    rng = np.random.default_rng(0)
+    for size in sizes:
+        img = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+        mask = np.zeros((size, size), np.uint8); mask[size//4:size//2, size//4:3*size//4] = 255
+        x = torch.from_numpy(img.transpose(2, 0, 1)[None].astype(np.float32) / 255)
+        m = torch.from_numpy((mask > 0).astype(np.float32)[None, None])
+        with torch.no_grad():
+            ref = jit(x, m)[0].numpy().transpose(1, 2, 0)
+            t_e = _time(lambda: jit(x, m), runs)
+        out = lama(img, mask, config)
+        t_o = _time(lambda: lama(img, mask, config), runs)
+        sel = mask > 0
+        diff = np.abs(out[sel][:, ::-1].astype(int) - np.clip(ref*255, 0, 255).astype(np.uint8)[sel]).max()
+        print(f"lama    {size}x{size:<5} eager={t_e:8.1f}ms  onnx={t_o:8.1f}ms  "
+              f"speedup={t_e/t_o:4.2f}x  max_diff={diff}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default="Helsinki-NLP/opus-mt-en-ar")
+    ap.add_argument("--lama", default=Path(os.getenv("TORCH_HOME", Path.home()/".cache"/"torch"))
+                                        / "hub" / "checkpoints" / "big-lama.pt")
+    ap.add_argument("--sizes", default="256,512")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--threads", type=int, default=0, help="خيوط torch وintra-op لـ ONNX (0 = تلقائي)")
+    args = ap.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+        Config.ONNX_INTRA_OP_THREADS = args.threads
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.CACHE_DIR = Path(tmp)
+        print(f"torch threads={torch.get_num_threads()}  "
+              f"onnx intra_op={Config.ONNX_INTRA_OP_THREADS or 'physical cores'}")
+        bench_marian(args.model, args.runs)
+        if Path(args.lama).exists():
+            bench_lama(args.lama, [int(s) for s in args.sizes.split(",")], args.runs)
+        else:
+            print(f"lama    skipped: {args.lama} not found")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_startup.py
+"""قياس زمن بدء التشغيل ومقارنته بالهدف المسجّل في benchmarks/baseline.json
+
+    python benchmarks/bench_startup.py [--warm] [--runs 5]
+
+- construct_s: استيراد core.pipeline وإنشاء MangaTranslationPipeline (ما يسبق ظهور النافذة)
+- warm_s:      تحميل جميع المراحل (--warm، يحتاج الأوزان محلياً)
+"""
+import sys, time, json, argparse, subprocess, statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+sys.path.insert(0, str(ROOT))
+
+def _child(warm):
+    start = time.perf_counter()
+    from core.pipeline import MangaTranslationPipeline
+    pipeline = MangaTranslationPipeline()
+    out = {"construct_s": time.perf_counter() - start,
+           "torch_imported": "torch" in sys.modules}
+    if warm:
+        t = time.perf_counter()
+        pipeline.warm_up(background=False)
+        out["warm_s"] = time.perf_counter() - t
+        out["readiness"] = pipeline.readiness()
+    print(json.dumps(out))
+
+def measure(runs=5, warm=False):
+    results = []
+    for _ in range(runs):
+        cmd = [sys.executable, __file__, "--child"] + (["--warm"] if warm else [])
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    summary = {"construct_s": statistics.median(r["construct_s"] for r in results),
+               "torch_imported": any(r["torch_imported"] for r in results)}
+    if warm:
+        summary["warm_s"] = statistics.median(r["warm_s"] for r in results)
+    return summary
+
+def check(summary, targets):
+    """يعيد قائمة بالأهداف التي تم تجاوزها"""
+    failed = []
+    if summary["construct_s"] > targets["construct_s"]:
+        failed.append(f"construct_s {summary['construct_s']:.3f}s > {targets['construct_s']}s")
+    if summary["torch_imported"] and not targets.get("allow_torch_import", False):
+        failed.append("torch was imported on the startup path")
+    return failed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--warm", action="store_true")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return _child(args.warm)
+
+    summary = measure(args.runs, args.warm)
+    print(json.dumps(summary, indent=2))
+    targets = json.loads(BASELINE.read_text())["startup"]
+    failed = check(summary, targets)
+    for f in failed:
+        print(f"❌ {f}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
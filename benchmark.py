@@ -0,0 +1,247 @@
+# benchmarks/benchmark.py
+"""مجموعة قياس أداء بدون شبكة: صفحات مانجا اصطناعية + نماذج بديلة خفيفة عند غياب الأوزان
+
+    python benchmarks/benchmark.py                     # تشغيل (auto: نماذج حقيقية إن وُجدت محلياً)
+    python benchmarks/benchmark.py --models stub       # بدائل خفيفة فقط
+    python benchmarks/benchmark.py --save-baseline     # حفظ النتائج كخط أساس
+    python benchmarks/benchmark.py --compare           # مقارنة مع خط الأساس (فشل إذا تراجع الأداء)
+
+خط الأساس يخزن pages/s نسبةً إلى حمل مرجعي يُقاس في نفس التشغيل (reference_rate)، مع وصف الجهاز:
+المقارنة بالنسب، وتُتخطى إذا اختلف عدد الأنوية أو المعمارية عن الجهاز الذي سُجّل عليه.
+"""
+import os, sys, json, time, random, argparse, resource, platform
+from pathlib import Path
+
+# لا شبكة: النماذج تُحمّل من النسخ المحلية فقط
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("TRANSLATION_MEMORY", "false")
+os.environ.setdefault("PAGE_CACHE", "false")   # الصفحات الاصطناعية تتكرر بين الجولات
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+BASELINE = HERE / "baseline.json"
+
+import cv2, numpy as np
+from core.box_ops import BoxTable
+from core.page_frame import PageFrame
+from core.performance_monitor import tracer
+
+RESOLUTIONS = {"small": (800, 1200), "medium": (1200, 1800), "large": (1654, 2339)}
+DENSITIES = {"sparse": 4, "dense": 12}   # عدد الفقاعات لكل ميغابكسل
+STAGES = ["page", "detect", "ocr", "translate", "inpaint", "render"]
+WORDS = ("what are you doing here hey wait i told you not to come back this is "
+         "the end huh really we have to go now run it is over so you came after all").split()
+
+# ---------------------------------------------------------------- صفحات اصطناعية
+def make_page(size, density, seed=0):
+    """صفحة بيضاء مع خطوط رسم عشوائية وفقاعات بيضاوية فيها نص إنجليزي"""
+    w, h = size
+    rng = random.Random(seed)
+    img = np.full((h, w, 3), 255, np.uint8)
+    for _ in range(40):   # "رسم" الخلفية
+        p1 = (rng.randrange(w), rng.randrange(h)); p2 = (rng.randrange(w), rng.randrange(h))
+        cv2.line(img, p1, p2, (rng.randrange(60, 200),)*3, rng.randrange(1, 4))
+    texts = []
+    for _ in range(max(1, int(density * w * h / 1e6))):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).upper()
+                 for _ in range(rng.randint(1, 3))]
+        tw = max(cv2.getTextSize(l, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0][0] for l in lines)
+        bw, bh = tw + 40, 26*len(lines) + 30
+        cx, cy = rng.randrange(bw//2, max(bw//2+1, w-bw//2)), rng.randrange(bh//2, max(bh//2+1, h-bh//2))
+        cv2.ellipse(img, (cx, cy), (bw//2 + 10, bh//2 + 10), 0, 0, 360, (255, 255, 255), -1)
+        cv2.ellipse(img, (cx, cy), (bw//2 + 10, bh//2 + 10), 0, 0, 360, (0, 0, 0), 2)
+        for i, line in enumerate(lines):
+            cv2.putText(img, line, (cx - tw//2, cy - bh//2 + 30 + 26*i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+        texts.append(" ".join(lines))
+    return img, texts
+
+# ---------------------------------------------------------------- بدائل خفيفة
+class StubOCR:
+    def extract_batch(self, image, bboxes):
+        return [WORDS[i % len(WORDS)].upper() for i in range(len(bboxes))]
+
+class StubTranslator:
+    def translate(self, texts, context=None):
+        return self.translate_pages([(texts, context)])[0]
+
+    def translate_pages(self, pages):
+        return [["ترجمة " + t[::-1].lower() for t in texts] for texts, _ in pages]
+
+    def get_performance_stats(self):
+        return {"device": "stub"}
+
+class StubInpainter:
+    """تعبئة كل صندوق بمتوسط لونه بدلاً من LaMa"""
+    def inpaint(self, image, bboxes):
+        for x1, y1, x2, y2 in BoxTable.of(bboxes).rects.tolist():
+            roi = image[y1:y2, x1:x2]
+            if roi.size:
+                roi[:] = roi.reshape(-1, 3).mean(axis=0)
+        return image
+
+def _weights_present(stage):
+    home = Path.home()
+    if stage == "ocr":
+        d = home / ".EasyOCR" / "model"
+        return (d / "craft_mlt_25k.pth").exists() and (d / "english_g2.pth").exists()
+    if stage == "inpainter":
+        return (Path(os.getenv("TORCH_HOME", home / ".cache" / "torch")) / "hub" / "checkpoints" / "big-lama.pt").exists()
+    if stage == "translator":
+        try:
+            from huggingface_hub import try_to_load_from_cache
+            return isinstance(try_to_load_from_cache("Helsinki-NLP/opus-mt-en-ar", "config.json"), str)
+        except Exception:
+            return False
+    return True
+
+def build_pipeline(models="auto"):
+    """يعيد (pipeline, {stage: "real"|"stub"})"""
+    from core.pipeline import MangaTranslationPipeline
+    from core.graphic_reintegration import TextReintegrator, ARABIC_FONT_PATH
+    stubs = {"ocr": StubOCR, "translator": StubTranslator, "inpainter": StubInpainter}
+    overrides, kinds = {}, {}
+    for stage, stub in stubs.items():
+        if models == "stub" or (models == "auto" and not _weights_present(stage)):
+            overrides[stage] = stub(); kinds[stage] = "stub"
+        else:
+            kinds[stage] = "real"
+    overrides["reintegrator"] = TextReintegrator(ARABIC_FONT_PATH, strict=False)
+    pipeline = MangaTranslationPipeline(stages=overrides)
+    pipeline.warm_up(background=False)
+    failed = [n for n, st in pipeline.readiness().items() if st != "ready"]
+    if failed:
+        raise RuntimeError(f"Stages failed to load: {failed} (use --models stub)")
+    return pipeline, kinds
+
+# ---------------------------------------------------------------- التشغيل
+def run_config(pipeline, size, density, pages):
+    imgs = [make_page(size, density, seed=i)[0] for i in range(pages + 1)]
+    # صفحة إحماء لا تدخل في القياس
+    _run_page(pipeline, imgs[0])
+    tracer.reset()
+    start = time.perf_counter()
+    boxes = 0
+    for img in imgs[1:]:
+        boxes += _run_page(pipeline, img)
+    elapsed = time.perf_counter() - start
+    stages = tracer.percentiles(STAGES)
+    tracer.reset()
+    return {"pages_per_s": pages / elapsed, "boxes_per_page": boxes / pages,
+            "stages_ms": {n: {k: round(v, 3) for k, v in st.items() if k != "count"}
+                          for n, st in stages.items()},
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+def _run_page(pipeline, image):
+    image = PageFrame(image)   # مثل load: تحويل رمادي واحد يتشاركه الكشف وOCR؛ الأصل يُنسخ عند inpaint
+    with tracer.span("page"):
+        bboxes = pipeline.detect(image)
+        results = pipeline.recognize(image, bboxes)
+        blocks = pipeline.translate_results(results)
+        cleaned = pipeline.inpaint(image, blocks)
+        pipeline.render(PageFrame(cleaned, owned=True), blocks)
+    return len(bboxes)
+
+def reference_rate(rounds=2):
+    """سرعة هذا الجهاز الآن (تكرارات/ثانية) لحمل ثابت لا يعتمد على كود المشروع:
+    عمليات OpenCV على صفحة اصطناعية وحلقة Python، مثل مزيج المراحل. أفضل جولة من rounds"""
+    img, _ = make_page(RESOLUTIONS["medium"], DENSITIES["dense"], seed=0)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(5):
+            gray = cv2.GaussianBlur(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+            _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            cv2.findContours(bw, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            cv2.resize(img, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+            sum(i * i for i in range(100000))
+        best = min(best, time.perf_counter() - start)
+    return 1 / best
+
+def host_info():
+    """ما لا تعوّضه النسبة إلى الحمل المرجعي (توازي المراحل، تعليمات المعالج)"""
+    return {"cpus": os.cpu_count(), "cv2_threads": cv2.getNumThreads(), "machine": platform.machine()}
+
+def compare(results, baseline, threshold):
+    """يعيد (التراجعات التي تتجاوز threshold من خط الأساس، سبب التخطي أو None).
+    المقارنة بـ relative: pages/s مقسوماً على reference_rate المقاس في نفس التشغيل"""
+    host = host_info()
+    if baseline.get("host") != host:
+        return [], f"host {host} differs from baseline host {baseline.get('host')}; re-record with --save-baseline"
+    failed = []
+    for key, res in results.items():
+        base = baseline.get("pipeline", {}).get(key)
+        if not base or "relative" not in base:
+            continue
+        relative = res["relative"]
+        drop = 1 - relative / base["relative"]
+        if drop > threshold:
+            failed.append(f"{key}: {res['pages_per_s']:.2f} pages/s ({relative:.3f} of reference) is "
+                          f"{100*drop:.0f}% below baseline {base['relative']:.3f}")
+    return failed, None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models", choices=["auto", "real", "stub"], default="auto")
+    ap.add_argument("--pages", type=int, default=5)
+    ap.add_argument("--resolutions", default=",".join(RESOLUTIONS))
+    ap.add_argument("--densities", default=",".join(DENSITIES))
+    ap.add_argument("--compare", action="store_true")
+    ap.add_argument("--threshold", type=float, default=0.2, help="أقصى تراجع مسموح (0.2 = 20%%)")
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--startup", action="store_true", help="قياس زمن بدء التشغيل أيضاً")
+    ap.add_argument("--json", help="حفظ النتائج في ملف JSON")
+    args = ap.parse_args()
+
+    pipeline, kinds = build_pipeline(args.models)
+    mode = "real" if all(v == "real" for v in kinds.values()) else \
+           "stub" if all(v == "stub" for v in kinds.values()) else "mixed"
+    print(f"models: {kinds}")
+
+    print(f"host: {host_info()}")
+    results, refs = {}, []
+    for r in args.resolutions.split(","):
+        for d in args.densities.split(","):
+            key = f"{mode}/{r}/{d}"
+            # المرجع يُقاس قبل كل إعداد وبعده، فيتبع تغيّر سرعة الجهاز أثناء التشغيل
+            before = reference_rate()
+            results[key] = res = run_config(pipeline, RESOLUTIONS[r], DENSITIES[d], args.pages)
+            ref = (before + reference_rate()) / 2
+            res["relative"] = res["pages_per_s"] / ref
+            refs.append(ref)
+            st = res["stages_ms"]
+            print(f"{key:<24} {res['pages_per_s']:7.2f} pages/s  boxes/page={res['boxes_per_page']:5.1f}  "
+                  + "  ".join(f"{n}={st[n]['p50_ms']:.1f}ms" for n in STAGES if n in st)
+                  + f"  peak_rss={res['peak_rss_mb']:.0f}MB  relative={res['relative']:.3f}")
+
+    failed = []
+    if args.startup:
+        from bench_startup import measure, check
+        startup = measure()
+        print(f"startup: {startup}")
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    if args.startup:
+        failed += check(startup, baseline["startup"])
+    if args.compare:
+        regressions, skipped = compare(results, baseline, args.threshold)
+        if skipped:
+            print(f"⚠️ regression gate skipped: {skipped}")
+        failed += regressions
+    if args.save_baseline:
+        if baseline.get("host") != host_info():
+            baseline["pipeline"] = {}   # أرقام جهاز آخر لا تُخلط مع هذا
+        baseline["host"], baseline["reference_per_s"] = host_info(), round(sum(refs) / len(refs), 3)
+        baseline.setdefault("pipeline", {}).update(
+            {k: {"pages_per_s": round(v["pages_per_s"], 3), "relative": round(v["relative"], 4)}
+             for k, v in results.items()})
+        BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"baseline saved to {BASELINE}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    for f in failed:
+        print(f"❌ {f}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
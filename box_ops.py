@@ -0,0 +1,171 @@
+# core/box_ops.py
+import numpy as np
+
+def to_rects(bboxes):
+    """قائمة صناديق بصيغة 4 زوايا → مصفوفة (N,4) بصيغة x1,y1,x2,y2"""
+    if len(bboxes) == 0:
+        return np.zeros((0,4), np.int32)
+    c = np.asarray(bboxes, np.int32)
+    return np.stack([c[:,0,0], c[:,0,1], c[:,2,0], c[:,2,1]], axis=1)
+
+def to_corners(rects):
+    return [[[int(x1),int(y1)],[int(x2),int(y1)],[int(x2),int(y2)],[int(x1),int(y2)]]
+            for x1,y1,x2,y2 in rects]
+
+def _candidate_pairs(rects, gap_x, gap_y):
+    """أزواج الصناديق المتداخلة أو المتجاورة (ضمن gap) بمسح على x بدل مصفوفة N×N، الأقرب أولاً"""
+    order = np.argsort(rects[:,0], kind="stable")
+    r = rects[order]
+    n = len(r)
+    # كل صندوق يُقارن فقط بما يبدأ قبل نهايته (+gap) على x
+    counts = np.maximum(np.searchsorted(r[:,0], r[:,2] + gap_x, side="right") - np.arange(n) - 1, 0)
+    i = np.repeat(np.arange(n), counts)
+    j = i + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ok = (r[i,1] <= r[j,3] + gap_y) & (r[j,1] <= r[i,3] + gap_y)
+    i, j = i[ok], j[ok]
+    dist = np.maximum(np.maximum(r[j,0] - r[i,2], 0),
+                      np.maximum(np.maximum(r[j,1] - r[i,3], r[i,1] - r[j,3]), 0))
+    k = np.argsort(dist, kind="stable")
+    return order[i[k]], order[j[k]]
+
+def merge_boxes(rects, gap_x=0, gap_y=0, max_size=None, max_iter=8):
+    """دمج الصناديق المتداخلة أو المتجاورة (ضمن gap) حتى الاستقرار.
+    الصناديق المكررة أو المحتواة داخل غيرها تُدمج تلقائياً.
+    max_size: (عرض، ارتفاع) لا يتجاوزه صندوق مدموج؛ الدمج الذي يتجاوزه يُرفض، فلا تتسلسل
+    الأجزاء المتجاورة عبر الصفحة إلى صندوق واحد بحجمها."""
+    rects = np.asarray(rects, np.int32).reshape(-1,4)
+    for _ in range(max_iter):
+        if len(rects) < 2:
+            break
+        a, b = _candidate_pairs(rects, gap_x, gap_y)
+        parent, bounds = list(range(len(rects))), rects.tolist()
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        merged = 0
+        for i, j in zip(a.tolist(), b.tolist()):
+            ri, rj = find(i), find(j)
+            if ri == rj:
+                continue
+            (ax1, ay1, ax2, ay2), (bx1, by1, bx2, by2) = bounds[ri], bounds[rj]
+            u = [min(ax1, bx1), min(ay1, by1), max(ax2, bx2), max(ay2, by2)]
+            if max_size is not None and (u[2] - u[0] > max_size[0] or u[3] - u[1] > max_size[1]):
+                continue
+            if rj < ri:
+                ri, rj = rj, ri
+            parent[rj], bounds[ri] = ri, u
+            merged += 1
+        if not merged:
+            break
+        rects = np.array([bounds[i] for i in range(len(rects)) if find(i) == i], np.int32)
+    return rects
+
+def reading_order(rects, rtl=True):
+    """ترتيب القراءة: صفوف من الأعلى للأسفل، وداخل الصف من اليمين لليسار (مانجا) أو العكس"""
+    if len(rects) < 2:
+        return np.arange(len(rects))
+    h = rects[:,3] - rects[:,1]
+    band = max(1, int(np.median(h)))
+    row = ((rects[:,1] + rects[:,3]) // 2) // band
+    xc = (rects[:,0] + rects[:,2]) // 2
+    return np.lexsort((-xc if rtl else xc, row))
+
+BLOCK_TYPES = ("speech", "narration", "on_scene", "title", "other")
+_TYPE_CODES = {name: i for i, name in enumerate(BLOCK_TYPES)}
+
+def type_code(name):
+    """رمز نوع الفقاعة في عمود types؛ الأنواع غير المعروفة كلها "other" (الرموز ثابتة بين العمليات)"""
+    return _TYPE_CODES.get(name, _TYPE_CODES["other"])
+
+class BoxTable:
+    """صناديق الصفحة كأعمدة numpy تمر بين الكشف وOCR والترجمة والـ inpainting والرسم:
+    rects (N,4) x1,y1,x2,y2 · ids ترتيب الصندوق عند الكشف · types رموز من BLOCK_TYPES
+    · texts/translations قوائم نصوص بنفس الترتيب (None قبل OCR/الترجمة).
+    قوائم الـ dicts بأربع زوايا ({"bbox", "type", ...}) تبقى صيغة الإخراج والتخزين فقط."""
+    __slots__ = ("rects", "ids", "types", "texts", "translations")
+
+    def __init__(self, rects, ids=None, types=None, texts=None, translations=None):
+        self.rects = np.asarray(rects, np.int32).reshape(-1,4)
+        n = len(self.rects)
+        self.ids = np.arange(n, dtype=np.int32) if ids is None else np.asarray(ids, np.int32)
+        self.types = np.zeros(n, np.uint8) if types is None else np.asarray(types, np.uint8)
+        self.texts, self.translations = texts, translations
+
+    @classmethod
+    def of(cls, boxes):
+        """BoxTable كما هو، أو قائمة صناديق بأربع زوايا، أو قائمة blocks"""
+        if isinstance(boxes, cls):
+            return boxes
+        if len(boxes) and isinstance(boxes[0], dict):
+            return cls.from_blocks(boxes)
+        return cls(to_rects(boxes))
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        def column(key):
+            vals = [b.get(key) for b in blocks]
+            return None if all(v is None for v in vals) else vals
+        return cls(to_rects([b["bbox"] for b in blocks]),
+                   types=[type_code(b.get("type", "speech")) for b in blocks],
+                   texts=column("extracted_text"), translations=column("translated_text"))
+
+    @classmethod
+    def concat(cls, tables):
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls(np.zeros((0,4), np.int32))
+        def column(name):
+            cols = [getattr(t, name) for t in tables]
+            return None if any(c is None for c in cols) else [v for c in cols for v in c]
+        return cls(np.concatenate([t.rects for t in tables]), np.concatenate([t.ids for t in tables]),
+                   np.concatenate([t.types for t in tables]), column("texts"), column("translations"))
+
+    def __len__(self):
+        return len(self.rects)
+
+    def take(self, index):
+        """صفوف مختارة بقناع منطقي أو فهارس"""
+        idx = np.flatnonzero(index) if np.asarray(index).dtype == bool else np.asarray(index, np.intp)
+        pick = lambda col: None if col is None else [col[i] for i in idx.tolist()]
+        return BoxTable(self.rects[idx], self.ids[idx], self.types[idx], pick(self.texts), pick(self.translations))
+
+    def replace(self, **columns):
+        """نسخة تشارك الأعمدة مع استبدال ما يُمرّر (مثل translations)"""
+        cols = {k: getattr(self, k) for k in self.__slots__}
+        cols.update(columns)
+        return BoxTable(**cols)
+
+    def shifted(self, dy):
+        return self.replace(rects=self.rects + np.array([0, dy, 0, dy], np.int32))
+
+    def clipped(self, shape):
+        h, w = shape[:2]
+        r = self.rects.copy()
+        r[:,[0,2]] = np.clip(r[:,[0,2]], 0, w); r[:,[1,3]] = np.clip(r[:,[1,3]], 0, h)
+        return self.replace(rects=r)
+
+    def mask(self, shape):
+        """قناع uint8 (255 داخل الصناديق، الحواف مشمولة مثل cv2.rectangle المملوء)"""
+        mask = np.zeros(shape[:2], np.uint8)
+        r = np.maximum(self.rects + np.array([0, 0, 1, 1], np.int32), 0)   # حدود slices غير سالبة
+        for x1,y1,x2,y2 in r.tolist():
+            mask[y1:y2, x1:x2] = 255
+        return mask
+
+    def type_names(self):
+        return [BLOCK_TYPES[t] for t in self.types.tolist()]
+
+    def corners(self):
+        return to_corners(self.rects)
+
+    def to_blocks(self):
+        """صيغة الإخراج: {"bbox": 4 زوايا, "extracted_text"?, "translated_text"?, "type"}"""
+        blocks = [{"bbox": bb} for bb in self.corners()]
+        for key, col in (("extracted_text", self.texts), ("translated_text", self.translations)):
+            if col is not None:
+                for b, v in zip(blocks, col): b[key] = v
+        for b, t in zip(blocks, self.type_names()):
+            b["type"] = t
+        return blocks
@@ -1,32 +1,56 @@
 # core/cache_manager.py
-import os, json, pickle, hashlib, threading, gc
+import os, json, time, pickle, hashlib, threading, gc
+from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
 import torch, logging
+from .weight_store import WeightStore
+from .config import Config
 
 class ModelCacheManager:
-    def __init__(self, cache_dir="./model_cache", max_memory_models=2):
+    def __init__(self, cache_dir="./model_cache", max_memory_models=2, max_memory_mb=None):
         self.cache_dir = Path(cache_dir); self.cache_dir.mkdir(exist_ok=True)
         self.cache_info_file = self.cache_dir / "cache_info.json"
+        # القفل يحمي الهياكل الداخلية فقط ولا يُحتجز أثناء تحميل أي نموذج
         self.lock = threading.Lock()
         self.max_memory_models = max_memory_models
-        self.memory_cache = {}
+        self.max_memory_bytes = int((max_memory_mb or Config.MODEL_CACHE_MAX_MB) * 1024 * 1024)
+        self.memory_cache = OrderedDict()   # key -> (data, nbytes)، الأقدم استخداماً أولاً
+        self.memory_bytes = 0
+        self._loading = {}                  # key -> Future (تحميل واحد لكل مفتاح)
+        self.weights = WeightStore(self.cache_dir / "weights")
         self.logger = logging.getLogger(self.__class__.__name__)
+        self._info = self._read_cache_info()
+        self._info_flushed = time.monotonic()
 
     def get_model_hash(self, model_name, model_config=None):
         key = f"{model_name}_{model_config}"
         return hashlib.md5(key.encode()).hexdigest()[:12]
 
     def save_to_disk(self, key, data):
-        with self.lock:
+        # الأوزان تُخزّن بصيغة mmap (WeightStore)، وpickle فقط لما لا يمكن تمثيله كـ tensors
+        if WeightStore.can_store(data):
+            self.weights.save(key, data)
+            stale = self.cache_dir/f"{key}.pkl"
+            if stale.exists(): stale.unlink()
+        else:
             with open(self.cache_dir/f"{key}.pkl", "wb") as f:
                 pickle.dump(data, f)
-            self._update_cache_info(key)
-            self.logger.debug(f"Saved model '{key}' to disk")
+        self._update_cache_info(key)
+        self.logger.debug("Saved model '%s' to disk", key)
 
     def load_from_disk(self, key):
+        if self.weights.exists(key):
+            self.logger.debug("Mapping model '%s' from weight store", key)
+            try:
+                return self.weights.load(key)
+            except Exception:
+                self.logger.exception("Weight store entry '%s' is unusable, discarding", key)
+                self.weights.remove(key)
+                return None
         path = self.cache_dir/f"{key}.pkl"
         if path.exists():
-            self.logger.debug(f"Loading model '{key}' from disk")
+            self.logger.debug("Loading model '%s' from disk", key)
             with open(path, "rb") as f:
                 return pickle.load(f)
         return None
@@ -34,44 +58,120 @@ class ModelCacheManager:
     def get_model(self, key, loader_func):
         with self.lock:
             if key in self.memory_cache:
-                self.logger.debug(f"Loaded '{key}' from memory")
-                return self.memory_cache[key]
+                self.memory_cache.move_to_end(key)
+                self._touch(key)
+                self.logger.debug("Loaded '%s' from memory", key)
+                return self.memory_cache[key][0]
+            fut = self._loading.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._loading[key] = Future()
+        if not owner:
+            # مفتاح قيد التحميل في خيط آخر: ننتظر نتيجته بدلاً من تحميله مرة ثانية
+            return fut.result()
+
+        try:
             data = self.load_from_disk(key)
             if data is not None:
-                self.logger.info(f"Loaded '{key}' from disk cache")
-                self._add_to_memory(key, data)
-                return data
-            self.logger.info(f"Cache miss for '{key}', loading model…")
-            try:
-                data = loader_func()
-            except Exception:
-                self.logger.exception(f"Failed to load model '{key}'")
-                raise
-            self.save_to_disk(key, data)
+                self.logger.info("Loaded '%s' from disk cache", key)
+            else:
+                self.logger.info("Cache miss for '%s', loading model…", key)
+                try:
+                    data = loader_func()
+                except Exception:
+                    self.logger.exception("Failed to load model '%s'", key)
+                    raise
+                self.save_to_disk(key, data)
             self._add_to_memory(key, data)
+            fut.set_result(data)
             return data
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self._loading.pop(key, None)
+
+    def _sizeof(self, key, data):
+        if isinstance(data, torch.nn.Module):
+            return sum(t.numel()*t.element_size()
+                       for t in list(data.parameters()) + list(data.buffers()))
+        # كائنات بلا tensors (مثل الـ tokenizer): نستخدم حجمها على القرص كتقدير
+        return int(self._info.get(key, {}).get("size_mb", 0) * 1024 * 1024)
 
     def _add_to_memory(self, key, data):
-        if len(self.memory_cache) >= self.max_memory_models:
-            old = next(iter(self.memory_cache))
-            del self.memory_cache[old]
+        size = self._sizeof(key, data)
+        evicted = []
+        with self.lock:
+            while self.memory_cache and (
+                    self.memory_bytes + size > self.max_memory_bytes or
+                    (self.max_memory_models and len(self.memory_cache) >= self.max_memory_models)):
+                old, (_, old_size) = self.memory_cache.popitem(last=False)
+                self.memory_bytes -= old_size
+                evicted.append(old)
+            self.memory_cache[key] = (data, size)
+            self.memory_bytes += size
+            self._touch(key)
+        if evicted:
             gc.collect()
             if torch.cuda.is_available(): torch.cuda.empty_cache()
-            self.logger.debug(f"Evicted '{old}' from memory cache")
-        self.memory_cache[key] = data
+            self.logger.debug("Evicted %s from memory cache (%.0f/%.0f MB used)",
+                              evicted, self.memory_bytes/1e6, self.max_memory_bytes/1e6)
+
+    def _read_cache_info(self):
+        try:
+            return json.loads(self.cache_info_file.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache_info(self):
+        tmp = self.cache_info_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._info, indent=2))
+        os.replace(tmp, self.cache_info_file)
+        self._info_flushed = time.monotonic()
+
+    def _touch(self, key):
+        # يُستدعى والقفل محتجز؛ الكتابة على القرص مجمّعة حتى لا تتكرر مع كل وصول
+        entry = self._info.get(key)
+        if entry is None:
+            return
+        entry["last_used"] = time.time()
+        if time.monotonic() - self._info_flushed > Config.CACHE_INFO_FLUSH_SECONDS:
+            self._write_cache_info()
 
     def _update_cache_info(self, key):
-        info = {}
-        if self.cache_info_file.exists():
-            info = json.loads(self.cache_info_file.read_text())
-        size = round((self.cache_dir/f"{key}.pkl").stat().st_size/(1024*1024),2)
-        info[key] = {"last_used": str(Path().resolve()), "size_mb": size}
-        self.cache_info_file.write_text(json.dumps(info, indent=2))
+        pkl = self.cache_dir/f"{key}.pkl"
+        size = (self.weights.size_mb(key) if self.weights.exists(key)
+                else round(pkl.stat().st_size/(1024*1024),2))
+        now = time.time()
+        with self.lock:
+            self._info[key] = {"created": now, "last_used": now, "size_mb": size}
+            self._write_cache_info()
+
+    def flush(self):
+        with self.lock:
+            self._write_cache_info()
 
     def cleanup_old_cache(self, days=30):
-        import time
         cutoff = time.time() - days*24*3600
-        for f in self.cache_dir.glob("*.pkl"):
-            if f.stat().st_mtime < cutoff:
-                f.unlink()
-                self.logger.info(f"Removed old cache file {f.name}")
\ No newline at end of file
+        removed = []
+        with self.lock:
+            for key, entry in list(self._info.items()):
+                if entry.get("last_used", 0) < cutoff and key not in self.memory_cache:
+                    del self._info[key]
+                    removed.append(key)
+            # ملفات قديمة غير مسجلة في cache_info (من إصدارات سابقة)
+            known = set(self._info)
+            for f in self.cache_dir.glob("*.pkl"):
+                if f.stem not in known and f.stat().st_mtime < cutoff:
+                    removed.append(f.stem)
+            for d in self.weights.root.iterdir():
+                if d.name not in known and d.stat().st_mtime < cutoff:
+                    removed.append(d.name)
+            self._write_cache_info()
+        for key in removed:
+            pkl = self.cache_dir/f"{key}.pkl"
+            if pkl.exists(): pkl.unlink()
+            self.weights.remove(key)
+            self.logger.info("Removed old cache entry %s", key)
+        return removed
\ No newline at end of file
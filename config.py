@@ -7,6 +7,8 @@ class Config:
     CACHE_DIR = Path("./model_cache")
     ENABLE_DISK_CACHE = True
     MAX_MEMORY_MODELS = 2
+    MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", "4096"))  # ميزانية RAM للنماذج
+    CACHE_INFO_FLUSH_SECONDS = 60
     CACHE_CLEANUP_DAYS = 30
     
     # إعدادات GPU
@@ -14,15 +16,49 @@ class Config:
     ENABLE_MIXED_PRECISION = True
     OPTIMIZE_FOR_INFERENCE = True
     
+    # إعدادات محرك الاستدلال
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()  # torch | onnx (ONNX Runtime، CPU)
+    ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = عدد الأنوية الفعلية
+    ONNX_INTER_OP_THREADS = 1
+    ONNX_OPSET = 17
+    
     # إعدادات الضغط
     COMPRESS_MODELS = os.getenv("COMPRESS_MODELS", "false").lower() == "true"
-    COMPRESSION_METHOD = "quantization"
-    COMPRESSION_RATIO = 0.3
+    COMPRESSION_METHOD = os.getenv("COMPRESSION_METHOD", "quantization")  # int8 | int8_sparse | pruning | quantization (= int8_sparse)
+    COMPRESSION_RATIO = float(os.getenv("COMPRESSION_RATIO", "0.3"))     # نسبة الأوزان المصفّرة في كل طبقة
+    COMPRESSED_MODELS_DIR = Path("./compressed_models")
+    
+    # إعدادات كشف النصوص
+    DETECTOR_MAX_BOX = (500, 200)   # أكبر (عرض، ارتفاع) لجزء قبل الدمج ولصندوق بعده
+    DETECTOR_MIN_BOX = (15, 8)      # أصغر (عرض، ارتفاع) لصندوق بعد الدمج
+    DETECTOR_MERGE_GAP = (12, 8)    # المسافة الأفقية/الرأسية التي تُدمج ضمنها الصناديق
+    READING_ORDER_RTL = True        # ترتيب المانجا: من اليمين لليسار
+    
+    # إعدادات OCR
+    OCR_BATCH_SIZE = 16  # عدد الصناديق في كل تمريرة للـ recognizer (على الـ GPU فقط؛ EasyOCR يعالج صندوقاً واحداً على الـ CPU)
+    
+    # إعدادات الـ inpainting
+    INPAINT_MODE = os.getenv("INPAINT_MODE", "roi")  # roi | full
+    INPAINT_ROI_PADDING = 24       # هامش السياق حول كل منطقة نص
+    INPAINT_ROI_MAX_SIDE = 1024    # المناطق الأكبر تُصغّر كما في وضع الصفحة الكاملة
+    
+    # إعدادات رسم النص
+    LAYOUT_MIN_FONT_SIZE = 12
+    LAYOUT_MAX_FONT_SIZE = 30
+    LAYOUT_FONT_CACHE_SIZE = 32      # عدد أحجام الخط المحمّلة في الذاكرة
+    LAYOUT_WIDTH_CACHE_SIZE = 50000  # عدد الكلمات المقاسة المخزنة
     
     # إعدادات الترجمة
     MAX_SEQUENCE_LENGTH = 512
     TRANSLATION_BEAM_SIZE = 4
     TRANSLATION_LENGTH_PENALTY = 0.6
+    # أخذ عينات (top_p) بدل beam search الحتمي: كل تشغيل قد يعطي ترجمة مختلفة، فتُعطَّل ذاكرة الترجمة معه
+    TRANSLATION_SAMPLING = os.getenv("TRANSLATION_SAMPLING", "false").lower() == "true"
+    TRANSLATION_TOP_P = 0.9
+    TRANSLATION_TOKEN_BUDGET = 1024  # حد (عدد النصوص × أطول نص بالـ tokens) لكل دفعة
+    TRANSLATION_MAX_BATCH = 32
+    ENABLE_TRANSLATION_MEMORY = os.getenv("TRANSLATION_MEMORY", "true").lower() == "true"
+    TRANSLATION_MEMORY_FILE = CACHE_DIR / "translation_memory.db"
     
     # إعدادات Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -30,12 +66,59 @@ class Config:
     LOG_FILE = LOG_DIR / "manga_translator.log"
     ERROR_LOG_FILE = LOG_DIR / "errors.log"
     PERFORMANCE_LOG_FILE = LOG_DIR / "performance.log"
+    TRACE_FILE = LOG_DIR / "trace.json"  # Chrome trace (chrome://tracing / Perfetto)
+    ENABLE_TRACING = os.getenv("ENABLE_TRACING", "true").lower() == "true"
     LOG_MAX_BYTES = 10 * 1024 * 1024  # 10MB
     LOG_BACKUP_COUNT = 5
-    
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text | json (سطر JSON لكل سجل في LOG_FILE وERROR_LOG_FILE)
+    LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"  # التنسيق والكتابة على خيط خلفي (core.logger)
+    LOG_QUEUE_SIZE = 10000  # عند الامتلاء تُسقط سجلات DEBUG/INFO بدل إبطاء المعالجة
+    # حدود لكل logger وأبنائه: "AdvancedOCR=20,AITranslator=5" سجل/ثانية، و"AITranslator=0.1" نسبة العينة
+    LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "")
+    LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
     # إعدادات التطبيق
     SUPPORTED_IMAGE_FORMATS = ['.png', '.jpg', '.jpeg', '.webp', '.bmp']
-    MAX_IMAGE_SIZE_MB = 10
+    MAX_IMAGE_PIXELS = 50_000_000  # أبعاد الصفحة بعد فك الترميز (الشرائط الطويلة تُعالج شريحة شريحة)
+    OUTPUT_DIR = Path("./output")
+    
+    # النتائج الوسيطة لكل صفحة (الصناديق، النصوص، الترجمات، الخلفية) لإعادة الرسم بعد التعديل دون إعادة المعالجة
+    ENABLE_PAGE_STORE = os.getenv("PAGE_STORE", "false").lower() == "true"  # معطّل افتراضياً: خلفية كاملة الدقة لكل صفحة
+    PAGE_STORE_DIR = Path("./page_store")
+    PAGE_STORE_MAX_MB = int(os.getenv("PAGE_STORE_MAX_MB", "1024"))  # الصفحات الأقدم استخداماً تُحذف عند التجاوز
+    
+    # الصفحات المكررة والمتقاربة (صفحات الشكر، إعادة الرفع، نفس الفصل من عدة مصادر) تُعاد مترجمة من القرص
+    # معطّل افتراضياً: كل صفحة تُضيف final.png كاملة الدقة (بضغط PNG سريع، عدة MB للصفحة) حتى PAGE_CACHE_MAX_MB
+    ENABLE_PAGE_CACHE = os.getenv("PAGE_CACHE", "false").lower() == "true"
+    PAGE_CACHE_DIR = CACHE_DIR / "pages"
+    PAGE_CACHE_MAX_DISTANCE = int(os.getenv("PAGE_CACHE_MAX_DISTANCE", "6"))  # أقصى فرق (بت من 64) بين بصمتين
+    PAGE_CACHE_MAX_CELL_DIFF = 8.0  # أقصى فرق متوسط (0-255) لأي خلية في الصورة المصغرة (تغيّر الرسم)
+    PAGE_CACHE_MAX_PIXEL_DIFF = 24.0  # أقصى فرق متوسط لأي خلية 4×4 بكسل (نفس الأبعاد)؛ يمنع خلط صفحات بنفس الرسم ونص مختلف
+    PAGE_CACHE_MAX_MB = int(os.getenv("PAGE_CACHE_MAX_MB", "512"))  # الأقدم استخداماً يُحذف عند التجاوز
+    
+    # إعدادات شرائط webtoon الطويلة
+    STRIP_SLICE_HEIGHT = 2048   # ارتفاع كل شريحة
+    STRIP_OVERLAP = 256         # التداخل بين الشرائح (يجب أن يتجاوز ارتفاع أكبر فقاعة)
+    STRIP_MIN_HEIGHT = 6000     # الصور الأطول من ذلك...
+    STRIP_MIN_ASPECT = 3.0      # ...والأطول من 3× عرضها تُعالج كشريط
+    
+    # إعدادات المعالجة الدفعية
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+    STREAM_QUEUE_SIZE = 2  # عدد الصفحات المسموح بانتظارها بين كل مرحلتين
+    BATCH_SHARE_MODELS = os.getenv("BATCH_SHARE_MODELS", "true").lower() == "true"  # نسخة واحدة من الأوزان لكل العمليات (fork)
+    
+    # إعدادات الخدمة المحلية (python main.py --serve)
+    SERVER_HOST = "127.0.0.1"
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8765"))
+    SERVER_BATCH_WINDOW_MS = float(os.getenv("SERVER_BATCH_WINDOW_MS", "15"))  # مدة تجميع الطلبات المتزامنة
+    SERVER_BATCH_MAX_TEXTS = 128     # تُرسل الدفعة فوراً عند بلوغ هذا العدد من النصوص
+    SERVER_MAX_CONCURRENT_PAGES = 2  # صفحات تُعالج في نفس الوقت (كشف/OCR/inpaint)
+    SERVER_MAX_QUEUE = 64            # صفحات منتظرة (بعد SERVER_MAX_CONCURRENT_PAGES) قبل الرد بـ 503
+    SERVER_MAX_PENDING_TEXTS = 1024  # نصوص /v1/translate المنتظرة في المجمّع قبل الرد بـ 503
+    # POST /v1/page بصيغة JSON: "path" داخل SERVER_INPUT_DIR و"output" داخل SERVER_OUTPUT_DIR فقط
+    SERVER_INPUT_DIR = Path(os.getenv("SERVER_INPUT_DIR", "./input"))
+    SERVER_OUTPUT_DIR = Path(os.getenv("SERVER_OUTPUT_DIR", "./output"))
+    SERVER_MAX_BODY_MB = 64          # أقصى حجم صورة مرفوعة (الرد بـ 413)
     
     @classmethod
     def create_directories(cls):
@@ -43,8 +126,8 @@ class Config:
         directories = [
             cls.CACHE_DIR,
             cls.LOG_DIR,
-            Path("./compressed_models"),
-            Path("./output"),
+            cls.COMPRESSED_MODELS_DIR,
+            cls.OUTPUT_DIR,
         ]
         
         for directory in directories:
@@ -13,17 +13,18 @@ class MangaError(Exception):
 def handle_errors(component: str = "GENERAL"):
     """ديكوراتور لمعالجة الأخطاء تلقائياً"""
     def decorator(func: Callable) -> Callable:
+        logger = logging.getLogger(func.__module__)
+        extra = {"component": component}
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            logger = logging.getLogger(func.__module__)
             try:
-                logger.debug(f"Starting {func.__name__}", extra={"component": component})
+                logger.debug("Starting %s", func.__name__, extra=extra)
                 result = func(*args, **kwargs)
-                logger.debug(f"Completed {func.__name__}", extra={"component": component})
+                logger.debug("Completed %s", func.__name__, extra=extra)
                 return result
             except Exception as e:
-                logger.error(f"Error in {func.__name__}: {str(e)}", 
-                           exc_info=True, extra={"component": component})
+                logger.error("Error in %s: %s", func.__name__, e,
+                             exc_info=True, extra=extra)
                 raise MangaError(f"{func.__name__} failed: {str(e)}", component) from e
         return wrapper
     return decorator
@@ -34,6 +35,6 @@ def safe_execute(func: Callable, *args, **kwargs):
         return func(*args, **kwargs)
     except Exception as e:
         logging.getLogger(func.__module__).error(
-            f"Safe execution failed: {str(e)}", exc_info=True
+            "Safe execution failed: %s", e, exc_info=True
         )
         return None
\ No newline at end of file
@@ -16,7 +16,7 @@ class GPUOptimizer:
             for i in range(torch.cuda.device_count()):
                 m = torch.cuda.get_device_properties(i).total_memory
                 if m > max_mem: best, max_mem = i, m
-            self.logger.info(f"Selected GPU cuda:{best}")
+            self.logger.info("Selected GPU cuda:%d", best)
             return f"cuda:{best}"
         elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
             self.logger.info("Selected MPS device")
@@ -32,7 +32,7 @@ class GPUOptimizer:
             torch.backends.cudnn.benchmark = True
             if hasattr(torch.cuda, "set_memory_fraction"):
                 torch.cuda.set_memory_fraction(self.memory_fraction, idx)
-            self.logger.info(f"[GPU] Using {torch.cuda.get_device_name(idx)}")
+            self.logger.info("[GPU] Using %s", torch.cuda.get_device_name(idx))
 
     @contextmanager
     def optimized_inference(self):
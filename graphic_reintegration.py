@@ -1,46 +1,67 @@
 # core/graphic_reintegration.py
-from .inpainting_lama import LamaInpainter
-from PIL import Image, ImageDraw, ImageFont
-import cv2, numpy as np, os, logging
+from PIL import Image, ImageDraw, ImageColor, features
+import numpy as np, os, logging
+from .box_ops import BoxTable, BLOCK_TYPES
+from .page_frame import PageFrame
+from .text_layout import TextLayoutEngine
 
 ARABIC_FONT_PATH = "fonts/Amiri-Regular.ttf"
 
+def _bgr(color):
+    """لون Pillow مع عكس القنوات، للرسم مباشرة على مخزن BGR"""
+    return ImageColor.getrgb(color)[::-1]
+
 class TextReintegrator:
-    def __init__(self):
+    def __init__(self, font_path=ARABIC_FONT_PATH, strict=True):
         self.logger = logging.getLogger(self.__class__.__name__)
-        if not os.path.exists(ARABIC_FONT_PATH):
-            self.logger.error(f"Missing font: {ARABIC_FONT_PATH}")
-            raise FileNotFoundError(f"Missing font: {ARABIC_FONT_PATH}")
-        self.inpainter = LamaInpainter()
+        if not os.path.exists(font_path):
+            if strict:
+                self.logger.error("Missing font: %s", font_path)
+                raise FileNotFoundError(f"Missing font: {font_path}")
+            self.logger.warning("Missing font: %s, falling back to the default font", font_path)
+        self.layout = TextLayoutEngine(font_path)
+        # direction='rtl' يتطلب libraqm؛ بدونه يرسم Pillow النص دون تشكيل بدلاً من الفشل
+        self.direction = "rtl" if features.check_feature("raqm") else None
+        if self.direction is None:
+            self.logger.warning("Pillow was built without libraqm; Arabic text will not be shaped")
+
+    def restore_panel(self, image, blocks, inpainter):
+        """inpainter: مرحلة الـ pipeline نفسها (pipeline.inpainter) حتى لا تُحمّل نسخة ثانية من LaMa"""
+        return self.render(PageFrame(self.clean(image, blocks, inpainter), owned=True), blocks)
 
-    def restore_panel(self, image, blocks):
-        bboxes = [b["bbox"] for b in blocks]
-        cleaned = self.inpainter.inpaint(image.copy(), bboxes)
-        rgb = cv2.cvtColor(cleaned, cv2.COLOR_BGR2RGB)
-        pil = Image.fromarray(rgb); draw = ImageDraw.Draw(pil)
+    def clean(self, image, blocks, inpainter):
+        return inpainter.inpaint(PageFrame.of(image).writable(), BoxTable.of(blocks))
 
-        for blk in blocks:
-            bb = blk["bbox"]; txt = blk["translated_text"]
-            style = self._get_style(blk.get("type","speech"))
-            x1,y1 = bb[0]; x2,y2 = bb[2]
+    def render(self, cleaned, blocks):
+        """يرسم النص في نفس المخزن (BGR) ويعيده. Pillow يرسم على قصاصة كل فقاعة فقط،
+        وألوان النص تُعكس (RGB→BGR) بدل تحويل الصفحة كاملة ذهاباً وإياباً."""
+        page = PageFrame.of(cleaned).writable()
+        H, W = page.shape[:2]
+        table = BoxTable.of(blocks)
+        for (x1,y1,x2,y2), txt, t in zip(table.rects.tolist(), table.translations or [], table.types.tolist()):
+            style = self._get_style(BLOCK_TYPES[t])
             w,h = x2-x1, y2-y1
-            fs = max(12, min(30, w//len(txt)*3))
-            try:
-                font = ImageFont.truetype(ARABIC_FONT_PATH, fs)
-            except:
-                font = ImageFont.load_default()
-            wrapped = self._wrap(txt, font, w)
-            _, _, tw, th = draw.multiline_textbbox((0,0), wrapped, font=font)
+            if not txt.strip(): continue
+            font, wrapped, tw, th = self.layout.layout(txt, w, h)
             tx = x1 + max(5, (w-tw)//2)
             ty = y1 + max(5, (h-th)//2)
+            # القصاصة تغطي الصندوق والنص مع هامش للحروف النازلة؛ ما يخرج عن الصفحة يُقص كما كان
+            m = getattr(font, "size", 10) // 2 + 4
+            cx1, cy1 = max(0, min(x1, tx) - m), max(0, min(y1, ty) - m)
+            cx2, cy2 = min(W, max(x2, tx+tw) + m), min(H, max(y2, ty+th) + m)
+            if cx1 >= cx2 or cy1 >= cy2: continue
+            roi = page[cy1:cy2, cx1:cx2]
+            pil = Image.fromarray(roi); draw = ImageDraw.Draw(pil)
             if style.get("bg",True):
-                draw.rounded_rectangle([x1,y1,x2,y2], radius=8, fill="white", outline="black", width=1)
-            draw.multiline_text((tx,ty), wrapped,
-                fill=style["color"], font=font,
-                align="center", direction='rtl', spacing=4
+                draw.rounded_rectangle([x1-cx1,y1-cy1,x2-cx1,y2-cy1], radius=8,
+                                       fill=_bgr("white"), outline=_bgr("black"), width=1)
+            draw.multiline_text((tx-cx1,ty-cy1), wrapped,
+                fill=_bgr(style["color"]), font=font,
+                align="center", direction=self.direction, spacing=4
             )
+            roi[:] = np.asarray(pil)
         self.logger.debug("Panel reintegration complete")
-        return cv2.cvtColor(np.array(pil), cv2.COLOR_RGB2BGR)
+        return page
 
     def _get_style(self, t):
         styles = {
@@ -50,16 +71,3 @@ class TextReintegrator:
             "title": {"color":"red","bg":False},
         }
         return styles.get(t, {"color":"black","bg":False})
-
-    def _wrap(self, text, font, max_w):
-        draw=ImageDraw.Draw(Image.new("RGB",(1,1)))
-        lines=[]; line=""
-        for w in text.split():
-            test=f"{line} {w}".strip()
-            width, *_ = draw.textbbox((0,0),test,font=font)
-            if width<=max_w: line=test
-            else:
-                if line: lines.append(line)
-                line=w
-        if line: lines.append(line)
-        return "\n".join(lines)
\ No newline at end of file
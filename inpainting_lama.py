@@ -2,13 +2,22 @@
 import numpy as np, cv2, torch, os, logging
 from lama_cleaner.model_manager import ModelManager
 from lama_cleaner.schema import Config as LaMaConfig
+from .config import Config
+from .box_ops import BoxTable, merge_boxes
+from .onnx_backend import LamaONNX
+from .performance_monitor import tracer
 
 class LamaInpainter:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.logger.info(f"LaMa Inpainter using device {self.device}")
-        self.model  = ModelManager(name="lama", device=torch.device(self.device))
+        onnx = Config.INFERENCE_BACKEND == "onnx"
+        self.device = "cuda" if torch.cuda.is_available() and not onnx else "cpu"
+        self.logger.info("LaMa Inpainter using device %s (%s backend)", self.device, Config.INFERENCE_BACKEND)
+        if onnx:
+            # التصدير يحتاج شبكة TorchScript الأصلية مرة واحدة فقط
+            self.model = LamaONNX(lambda: ModelManager(name="lama", device=torch.device("cpu")).model.model)
+        else:
+            self.model = ModelManager(name="lama", device=torch.device(self.device))
         self.config = LaMaConfig(
             ldm_steps=25, ldm_sampler="plms",
             hd_strategy="resize", hd_strategy_resize_limit=512,
@@ -16,33 +25,83 @@ class LamaInpainter:
             cv2_resize_interpolation=cv2.INTER_CUBIC,
             half=False if self.device=="cpu" else True,
         )
+        # مناطق ROI صغيرة تُعالج بدقتها الأصلية بدلاً من تصغير الصفحة كاملة
+        self.roi_config = LaMaConfig(
+            ldm_steps=25, ldm_sampler="plms",
+            hd_strategy="original", hd_strategy_resize_limit=Config.INPAINT_ROI_MAX_SIDE,
+            hd_strategy_crop_trigger_size=Config.INPAINT_ROI_MAX_SIDE, hd_strategy_crop_margin=32,
+            cv2_resize_interpolation=cv2.INTER_CUBIC,
+            half=False if self.device=="cpu" else True,
+        )
 
     def create_mask(self, shape, bboxes):
-        mask = np.zeros(shape[:2], dtype=np.uint8)
-        for bb in bboxes:
-            x1,y1 = bb[0]; x2,y2 = bb[2]
-            cv2.rectangle(mask,(x1,y1),(x2,y2),255,-1)
-        return mask
+        return BoxTable.of(bboxes).mask(shape)
 
     def inpaint(self, image, bboxes):
-        if not bboxes:
+        """bboxes: BoxTable أو قائمة صناديق؛ الصورة تُعدَّل في مكانها"""
+        boxes = BoxTable.of(bboxes)
+        if not len(boxes):
             self.logger.debug("No bboxes for inpainting")
             return image
+        mask = boxes.mask(image.shape)
+        if Config.INPAINT_MODE == "roi":
+            return self._inpaint_rois(image, mask, boxes)
+        # LaMa يأخذ RGB ويعيد BGR: التحويل الوحيد هنا عند مدخل النموذج
         rgb = cv2.cvtColor(image,cv2.COLOR_BGR2RGB)
-        mask= self.create_mask(image.shape,bboxes).astype(np.uint8)
         try:
             res = self.model(rgb, mask, self.config)
             self.logger.debug("Inpainting successful")
         except Exception as e:
-            self.logger.exception(f"LaMa Error: {e}, using fallback")
-            return self._fallback(image,bboxes)
-        return cv2.cvtColor(res,cv2.COLOR_RGB2BGR)
+            self.logger.exception("LaMa Error: %s, using fallback", e)
+            return self._fallback(image, boxes)
+        h, w = image.shape[:2]
+        image[:] = _to_uint8(res[:h, :w])
+        return image
+
+    def regions(self, boxes, shape):
+        """مناطق ROI من جدول الصناديق مباشرة (بدل تحليل مكونات القناع): هامش ثم دمج المتداخلة"""
+        h, w = shape[:2]
+        pad = Config.INPAINT_ROI_PADDING
+        # x2,y2 مشمولة في القناع (+1)، وما يقع خارج الصفحة كلياً لا يظهر فيه
+        r = np.clip(boxes.rects + np.array([0, 0, 1, 1], np.int32), 0, [w, h, w, h])
+        r = r[(r[:,0] < r[:,2]) & (r[:,1] < r[:,3])]
+        rects = merge_boxes(r + np.array([-pad, -pad, pad, pad], np.int32))
+        rects[:,[0,2]] = np.clip(rects[:,[0,2]], 0, w)
+        rects[:,[1,3]] = np.clip(rects[:,[1,3]], 0, h)
+        return rects
 
-    def _fallback(self, image, bboxes):
-        res = image.copy()
-        for bb in bboxes:
-            x1,y1 = bb[0]; x2,y2 = bb[2]
+    def _inpaint_rois(self, image, mask, boxes):
+        rects = self.regions(boxes, mask.shape)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            area = int(((rects[:,2]-rects[:,0])*(rects[:,3]-rects[:,1])).sum())
+            self.logger.debug("Inpainting %d ROIs covering %.1f%% of the page",
+                              len(rects), 100*area/(mask.shape[0]*mask.shape[1]))
+        try:
+            for x1,y1,x2,y2 in rects:
+                crop, m = image[y1:y2, x1:x2], mask[y1:y2, x1:x2]
+                big = max(crop.shape[:2]) > Config.INPAINT_ROI_MAX_SIDE
+                with tracer.span("inpaint.roi", w=int(x2-x1), h=int(y2-y1)):
+                    res = self.model(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), m,
+                                     self.config if big else self.roi_config)
+                # لصق البكسلات المقنّعة فقط، فيبقى ما حولها مطابقاً للأصل
+                sel = m > 0
+                crop[sel] = _to_uint8(res[:crop.shape[0], :crop.shape[1]][sel])
+        except Exception as e:
+            self.logger.exception("LaMa Error: %s, using fallback", e)
+            return self._fallback(image, boxes)
+        self.logger.debug("Inpainting successful")
+        return image
+
+    def _fallback(self, image, boxes):
+        res = image   # نسخة العمل نفسها (inpaint يعدّل في مكانه)
+        for x1,y1,x2,y2 in boxes.rects.tolist():
             roi = res[y1:y2,x1:x2]
             avg = np.mean(roi.reshape(-1,3),axis=0)
             cv2.rectangle(res,(x1,y1),(x2,y2),avg.astype(int).tolist(),-1)
-        return res
\ No newline at end of file
+        return res
+
+def _to_uint8(res):
+    """lama_cleaner يعيد float64 (BGR)؛ render وImage.fromarray يحتاجان uint8"""
+    if res.dtype == np.uint8:
+        return res
+    return np.clip(np.rint(res), 0, 255).astype(np.uint8)
@@ -1,12 +1,165 @@
 # core/logger.py
-import logging
-from logging.handlers import RotatingFileHandler
+"""التسجيل خارج مسار المعالجة: الخيط المُسجِّل يفلتر السجل ويدمج وسائطه في الرسالة ثم يضعه في طابور،
+وخيط QueueListener ينسّقه (نص أو JSON) ويكتبه إلى الطرفية والملفات.
+العمليات الناتجة عن fork (عمليات core.batch) لا تفتح الملفات: خيط فيها يرسل سجلاتها عبر طابور بين العمليات
+إلى خيط الكتابة في الأب، فيبقى كاتب واحد لكل ملف ولا تدوّر عدة عمليات نفس الملف.
+
+الوسائط تُدمج فقط للسجلات التي تجتاز الفلاتر، لذلك تُمرَّر القيم كوسائط (logger.debug("x=%s", x)) لا كـ f-string."""
+import os, json, time, queue, atexit, random, logging, itertools, threading, multiprocessing
+import multiprocessing.util
+from collections import Counter
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from .config import Config
 
+_handler = None    # _QueueHandler على root وlogger الأداء
+_listener = None   # خيط التنسيق والكتابة
+_limits = None     # RateLimitFilter
+_remote = None     # multiprocessing.SimpleQueue: سجلات العمليات الابنة إلى الأب (يُنشأ عند أول fork)
+_owner = None      # pid العملية التي تكتب الملفات وتفرّغ _remote
+_waiting = {}      # رقم علامة flush عبر _remote -> Event
+_tokens = itertools.count()
+
+def _per_logger(spec, cast=float):
+    """"AdvancedOCR=20,AITranslator=5" -> {"AdvancedOCR": 20.0, "AITranslator": 5.0}"""
+    out = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, value = item.partition("=")
+        out[name.strip()] = cast(value)
+    return out
+
+class RateLimitFilter(logging.Filter):
+    """حدود لكل logger (وأبنائه): rates سجل/ثانية (token bucket بسعة ثانية واحدة)، وsampling نسبة
+    السجلات المحتفظ بها. التحذيرات والأخطاء لا تُسقط أبداً؛ المُسقط يُعدّ لكل قاعدة."""
+
+    def __init__(self, rates=None, sampling=None):
+        super().__init__()
+        self.rates, self.sampling = rates or {}, sampling or {}
+        self._rules = {}     # اسم الـ logger -> (القاعدة، rate، sample)
+        self._buckets = {}   # القاعدة -> [tokens، آخر تعبئة]
+        self._lock = threading.Lock()
+        self.dropped = Counter()
+
+    def _match(self, name):
+        parts = name.split(".")
+        for i in range(len(parts), 0, -1):
+            key = ".".join(parts[:i])
+            if key in self.rates or key in self.sampling:
+                return key, self.rates.get(key), self.sampling.get(key, 1.0)
+        return None, None, 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rule = self._rules.get(record.name)
+        if rule is None:
+            rule = self._rules[record.name] = self._match(record.name)
+        key, rate, sample = rule
+        if key is None:
+            return True
+        keep = sample >= 1.0 or random.random() < sample
+        if keep and rate is not None:
+            now = time.monotonic()
+            with self._lock:
+                bucket = self._buckets.setdefault(key, [rate, now])
+                bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                keep = bucket[0] >= 1.0
+                if keep:
+                    bucket[0] -= 1.0
+        if not keep:
+            self.dropped[key] += 1
+        return keep
+
+class JsonFormatter(logging.Formatter):
+    """سطر JSON لكل سجل؛ الحقول الممرَّرة عبر extra= (مثل component من handle_errors) تُضاف كما هي"""
+    _STD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        rec = {"time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+               "level": record.levelname, "logger": record.name, "msg": record.getMessage(),
+               "pid": record.process, "thread": record.threadName}
+        rec.update((k, v) for k, v in vars(record).items() if k not in self._STD)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            rec["exc"] = record.exc_text
+        return json.dumps(rec, ensure_ascii=False, default=str)
+
+class _QueueHandler(QueueHandler):
+    """ما يدفعه الخيط المُسجِّل: الفلاتر ثم getMessage ثم وضع السجل في الطابور (بلا تنسيق ولا نسخ ولا قفل).
+    دمج الوسائط هنا لا على خيط الكتابة، فتعديل الكائنات الممرَّرة بعد التسجيل لا يغيّر الرسالة.
+    SimpleQueue أسرع من Queue بعدة مرات ولا تتعطل عند التسجيل من داخل تسجيل آخر (__del__، إشارات).
+    فوق LOG_QUEUE_SIZE سجل منتظر تُسقط سجلات DEBUG/INFO وتُعدّ؛ الأخطاء ومقاطع الأداء تُضاف دائماً."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.records = self.dropped = self.ns = 0
+
+    def handle(self, record):
+        start = time.perf_counter_ns()
+        rv = self.filter(record)
+        if rv:
+            self.records += 1
+            if (record.levelno < logging.WARNING and record.name != "performance"
+                    and self.queue.qsize() >= Config.LOG_QUEUE_SIZE):
+                self.dropped += 1
+            else:
+                record.msg, record.args = record.getMessage(), None
+                self.queue.put(record)
+        self.ns += time.perf_counter_ns() - start
+        return rv
+
+class _Listener(QueueListener):
+    def handle(self, record):
+        if isinstance(record, threading.Event):   # علامة flush_logging
+            record.set()
+        else:
+            super().handle(record)
+
+class _Forward(logging.Handler):
+    """handler العملية الابنة الوحيد: السجل (بعد دمج وسائطه) إلى طابور الأب كما هو.
+    traceback لا يُنقل بين العمليات، فيُنسَّق نصاً هنا (exc_text) كما يفعل QueueHandler.prepare."""
+
+    def __init__(self, remote):
+        super().__init__()
+        self.remote = remote
+        self.plain = logging.Formatter()
+
+    def emit(self, record):
+        try:
+            if record.exc_info:
+                record.exc_text = record.exc_text or self.plain.formatException(record.exc_info)
+                record.exc_info = None
+            self.remote.put(record)
+        except Exception:
+            self.handleError(record)
+
+def _drain(remote):
+    """خيط في الأب: سجلات العمليات الابنة إلى طابور خيط الكتابة بنفس ترتيب وصولها"""
+    while True:
+        item = remote.get()
+        if isinstance(item, tuple):   # علامة flush_logging من الأب
+            item = _waiting.pop(item[1])
+        if _handler is not None:
+            _handler.queue.put(item)
+        elif isinstance(item, threading.Event):
+            item.set()
+
+def _file_handler(path, level, formatter):
+    fh = RotatingFileHandler(filename=path, maxBytes=Config.LOG_MAX_BYTES,
+                             backupCount=Config.LOG_BACKUP_COUNT, encoding="utf-8")
+    fh.setLevel(level)
+    fh.setFormatter(formatter)
+    return fh
+
 def setup_logging():
     """إعداد نظام التسجيل"""
-    fmt = "[%(asctime)s] %(levelname)-8s %(name)s: %(message)s"
+    global _handler, _listener, _limits
+    stop_logging()
+    _handler = None
     datefmt = "%Y-%m-%d %H:%M:%S"
+    text = logging.Formatter("[%(asctime)s] %(levelname)-8s %(name)s: %(message)s", datefmt)
+    structured = JsonFormatter() if Config.LOG_FORMAT == "json" else text
 
     # إنشاء المجلدات إذا لم تكن موجودة
     Config.LOG_DIR.mkdir(exist_ok=True, parents=True)
@@ -18,48 +171,105 @@ def setup_logging():
     # إزالة أي handlers موجودة مسبقاً
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+    performance_logger = logging.getLogger("performance")
+    for handler in performance_logger.handlers[:]:
+        performance_logger.removeHandler(handler)
+    performance_logger.propagate = False
 
-    # Console handler
+    # Console (نص دائماً)، السجلات العامة، الأخطاء فقط
     ch = logging.StreamHandler()
     ch.setLevel(Config.LOG_LEVEL)
-    ch.setFormatter(logging.Formatter(fmt, datefmt))
-    logger.addHandler(ch)
-
-    # File handler للسجلات العامة
-    fh = RotatingFileHandler(
-        filename=Config.LOG_FILE,
-        maxBytes=Config.LOG_MAX_BYTES,
-        backupCount=Config.LOG_BACKUP_COUNT,
-        encoding="utf-8"
-    )
-    fh.setLevel(Config.LOG_LEVEL)
-    fh.setFormatter(logging.Formatter(fmt, datefmt))
-    logger.addHandler(fh)
-
-    # File handler للأخطاء فقط
-    error_fh = RotatingFileHandler(
-        filename=Config.ERROR_LOG_FILE,
-        maxBytes=Config.LOG_MAX_BYTES,
-        backupCount=Config.LOG_BACKUP_COUNT,
-        encoding="utf-8"
-    )
-    error_fh.setLevel(logging.ERROR)
-    error_fh.setFormatter(logging.Formatter(fmt, datefmt))
-    logger.addHandler(error_fh)
-
-    # File handler لأداء النظام
-    performance_fh = RotatingFileHandler(
-        filename=Config.PERFORMANCE_LOG_FILE,
-        maxBytes=Config.LOG_MAX_BYTES,
-        backupCount=Config.LOG_BACKUP_COUNT,
-        encoding="utf-8"
-    )
-    performance_fh.setLevel(logging.INFO)
-    performance_fh.setFormatter(logging.Formatter(fmt, datefmt))
-    
-    # إنشاء logger منفصل للأداء
-    performance_logger = logging.getLogger("performance")
-    performance_logger.addHandler(performance_fh)
-    performance_logger.propagate = False
+    ch.setFormatter(text)
+    handlers = [ch, _file_handler(Config.LOG_FILE, Config.LOG_LEVEL, structured),
+                _file_handler(Config.ERROR_LOG_FILE, logging.ERROR, structured)]
+    # ملف الأداء: سطور JSON من core.performance_monitor.tracer كما هي
+    performance_fh = _file_handler(Config.PERFORMANCE_LOG_FILE, logging.INFO, logging.Formatter("%(message)s"))
+
+    _limits = RateLimitFilter(_per_logger(Config.LOG_RATE_LIMITS), _per_logger(Config.LOG_SAMPLING))
+    if Config.LOG_ASYNC:
+        # طابور واحد للجميع؛ خيط الكتابة يوجّه سجلات الأداء إلى ملفها فقط
+        for h in handlers:
+            h.addFilter(lambda r: r.name != "performance")
+        performance_fh.addFilter(logging.Filter("performance"))
+        _handler = _QueueHandler(queue.SimpleQueue())
+        _handler.addFilter(_limits)
+        _listener = _Listener(_handler.queue, *handlers, performance_fh, respect_handler_level=True)
+        _listener.start()
+        logger.addHandler(_handler)
+        performance_logger.addHandler(_handler)
+    else:
+        for h in handlers:
+            h.addFilter(_limits)
+            logger.addHandler(h)
+        performance_logger.addHandler(performance_fh)
+
+    logger.info("Logging initialized (level=%s, format=%s, async=%s)",
+                Config.LOG_LEVEL, Config.LOG_FORMAT, Config.LOG_ASYNC)
+
+def flush_logging():
+    """انتظار كتابة كل ما في الطابور (قبل قراءة ملف الأداء، أو قبل إعادة نتيجة من عملية عاملة).
+    في الأب تمر العلامة عبر طابور العمليات الابنة أيضاً، فتُكتب سجلاتها التي وصلت قبلها؛
+    في العملية الابنة ينتظر حتى تُرسل سجلاتها إلى الأب."""
+    if _listener is None:
+        return
+    done = threading.Event()
+    if _remote is not None and os.getpid() == _owner:
+        token = next(_tokens)
+        _waiting[token] = done
+        _remote.put(("flush", token))
+    else:
+        _listener.queue.put(done)
+    done.wait()
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_stats():
+    """كلفة التسجيل على الخيوط المُسجِّلة منذ setup_logging (لكل عملية)"""
+    if _limits is None:
+        return {}
+    stats = {"async": _handler is not None,
+             "rate_limited": dict(_limits.dropped)}
+    if _handler is not None:
+        stats.update({"records": _handler.records, "dropped_queue_full": _handler.dropped,
+                      "caller_ms": round(_handler.ns / 1e6, 2),
+                      "caller_us_per_record": round(_handler.ns / 1e3 / _handler.records, 2) if _handler.records else 0.0,
+                      "queued": _handler.queue.qsize()})
+    return stats
+
+def _before_fork():
+    """إيقاف خيط الكتابة قبل fork (بعد كتابة ما في الطابور) حتى لا ترث العملية الابنة قفلاً
+    يمسكه (مخزن stderr، ملف مفتوح)؛ ما يُسجَّل أثناء fork يبقى في الطابور لخيط الأب التالي.
+    عند أول fork يُنشأ طابور العمليات الابنة وخيط الأب الذي يفرّغه."""
+    global _remote, _owner
+    if _listener is None:
+        return
+    if _remote is None:
+        _remote, _owner = multiprocessing.SimpleQueue(), os.getpid()
+        threading.Thread(target=_drain, args=(_remote,), name="LogDrain", daemon=True).start()
+    _listener.stop()
+
+def _after_fork_in_parent():
+    if _listener is not None:
+        _listener.start()
+
+def _after_fork_in_child():
+    """العملية الابنة: طابور جديد وخيط يرسل سجلاتها إلى الأب بدل الكتابة إلى الملفات"""
+    global _listener
+    if _listener is None:
+        return
+    _waiting.clear()
+    _handler.queue = queue.SimpleQueue()
+    _handler.records = _handler.dropped = _handler.ns = 0
+    _limits._lock = threading.Lock()
+    _listener = _Listener(_handler.queue, _Forward(_remote))
+    _listener.start()
+    # عمليات ProcessPoolExecutor تنتهي عبر os._exit دون atexit؛ finalizers الخاصة بـ multiprocessing تعمل قبلها
+    multiprocessing.util.Finalize(None, stop_logging, exitpriority=10)
 
-    logger.info(f"Logging initialized (level={Config.LOG_LEVEL})")
\ No newline at end of file
+os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent,
+                    after_in_child=_after_fork_in_child)
+atexit.register(stop_logging)
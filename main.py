@@ -1,11 +1,12 @@
 # main.py
 import sys
+import argparse
 import importlib.util
 from pathlib import Path
 from core.config import Config
 from core.logger import setup_logging
 
-def check_requirements():
+def check_requirements(gui=True):
     """فحص المتطلبات الأساسية"""
     required_packages = {
         'cv2': 'opencv-python',
@@ -17,6 +18,8 @@ def check_requirements():
         'easyocr': 'easyocr',
         'psutil': 'psutil'
     }
+    if not gui:
+        required_packages.pop('PyQt5')
     
     missing_packages = []
     
@@ -40,8 +43,70 @@ def handle_uncaught(exc_type, exc_value, exc_traceback):
     
     sys.exit(1)
 
+def parse_args(argv=None):
+    """قراءة خيارات سطر الأوامر"""
+    parser = argparse.ArgumentParser(description="MangaTranslatorPro")
+    parser.add_argument("--batch", nargs="+", metavar="INPUT",
+                        help="ترجمة مجلدات أو أنماط glob بدون واجهة رسومية")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="عدد العمليات العاملة (الافتراضي Config.BATCH_WORKERS)")
+    parser.add_argument("--output", default=None,
+                        help="مجلد الإخراج (الافتراضي ./output)")
+    parser.add_argument("--stream", action="store_true",
+                        help="تداخل المراحل (كشف → OCR → ترجمة → inpaint → رسم) في عملية واحدة")
+    parser.add_argument("--no-share-models", dest="share_models", action="store_false", default=None,
+                        help="تحميل نسخة مستقلة من النماذج في كل عملية عاملة")
+    parser.add_argument("--serve", action="store_true",
+                        help="تشغيل خدمة HTTP محلية للترجمة (انظر core/server.py)")
+    parser.add_argument("--port", type=int, default=None,
+                        help="منفذ الخدمة (الافتراضي Config.SERVER_PORT)")
+    return parser.parse_args(argv)
+
+def run_batch_cli(args):
+    """تشغيل وضع الترجمة الدفعية"""
+    missing_packages = check_requirements(gui=False)
+    if missing_packages:
+        print("❌ المكتبات التالية مفقودة: " + ", ".join(missing_packages))
+        return 2
+    
+    setup_logging()
+    Config.create_directories()
+    
+    from core.batch import run_batch
+    report = run_batch(args.batch, workers=args.workers, output_dir=args.output,
+                       stream=args.stream, shared=args.share_models)
+    
+    print(f"✅ {report.done}/{report.total} صفحة في {report.elapsed:.1f}s "
+          f"({report.pages_per_second:.2f} صفحة/ثانية)")
+    if report.failures:
+        print(f"❌ فشلت {len(report.failures)} صفحة:")
+        for path, err in report.failures:
+            print(f"  - {path}: {err}")
+        return 1
+    return 0
+
+def run_server_cli(args):
+    """تشغيل الخدمة المحلية حتى Ctrl+C"""
+    missing_packages = check_requirements(gui=False)
+    if missing_packages:
+        print("❌ المكتبات التالية مفقودة: " + ", ".join(missing_packages))
+        return 2
+    
+    setup_logging()
+    Config.create_directories()
+    
+    from core.server import run_server
+    run_server(port=args.port)
+    return 0
+
 def main():
     """نقطة البداية الرئيسية"""
+    args = parse_args()
+    if args.batch:
+        sys.exit(run_batch_cli(args))
+    if args.serve:
+        sys.exit(run_server_cli(args))
+    
     try:
         # فحص المتطلبات أولاً
         missing_packages = check_requirements()
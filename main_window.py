@@ -1,10 +1,14 @@
 # gui/main_window.py
-import sys, cv2, numpy as np, logging
+import io, os, sys, cv2, queue, logging
 from pathlib import Path
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui     import *
 from PyQt5.QtCore    import *
-from core.pipeline   import MangaTranslationPipeline
+from core.archive    import ArchiveReader, ArchiveWriter, PageBytes, is_archive, encode_page, ARCHIVE_FORMATS
+from core.config     import Config
+from core.pipeline   import MangaTranslationPipeline, PageCancelled
+from core.performance_monitor import tracer
+from core.strip      import StripProcessor, image_size, is_strip
 
 # Qt → logging bridge
 from PyQt5.QtCore import qInstallMessageHandler, QtMsgType
@@ -21,106 +25,370 @@ def qt_message_handler(mode, context, message):
 
 qInstallMessageHandler(qt_message_handler)
 
-def cv2_to_pixmap(img):
-    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    h,w,ch = rgb.shape
-    qimg = QImage(rgb.data, w, h, ch*w, QImage.Format_RGB888)
-    return QPixmap.fromImage(qimg).scaled(400,600, Qt.KeepAspectRatio)
+PREVIEW_SIZE = (400, 600)
+STAGES = ["load", "detect", "ocr", "translate", "inpaint", "render"]
+STAGE_LABELS = {"load": "تحميل", "detect": "كشف", "ocr": "OCR", "translate": "ترجمة",
+                "inpaint": "إزالة النص", "render": "رسم النص"}
+STATUS_LABELS = {"queued": "⏳ في الانتظار", "done": "✅ تمت", "failed": "❌ فشلت", "cancelled": "⛔ أُلغيت"}
 
-class Worker(QThread):
-    finished = pyqtSignal(np.ndarray)
-    error    = pyqtSignal(str)
-    def __init__(self, path, pipeline):
+def cv2_to_qimage(img):
+    """تصغير للعرض؛ QImage (عكس QPixmap) يمكن تجهيزها خارج خيط الواجهة، وتقرأ BGR مباشرة بلا تحويل"""
+    h, w = img.shape[:2]
+    scale = min(PREVIEW_SIZE[0]/w, PREVIEW_SIZE[1]/h, 1.0)
+    small = cv2.resize(img, (max(1, int(w*scale)), max(1, int(h*scale))), interpolation=cv2.INTER_AREA)
+    h, w, ch = small.shape
+    return QImage(small.data, w, h, ch*w, QImage.Format_BGR888).copy()
+
+class Job:
+    def __init__(self, job_id, path, sink=None):
+        self.id = job_id
+        self.path = path      # مسار ملف أو PageBytes من أرشيف
+        self.sink = sink      # (ArchiveWriter, member) لصفحات الأرشيف
+        self.status = "queued"
+        self.stage = None
+        self.cancelled = False
+        self.submitted = False
+        self.preview = None   # آخر QImage معروضة لهذه الصفحة
+        self.output = None
+
+    @property
+    def name(self):
+        return Path(str(self.path)).name
+
+    def release(self, data=None):
+        """تسليم الصفحة لأرشيفها الناتج مرة واحدة (None للصفحات الملغاة أو الفاشلة)"""
+        if self.sink is not None:
+            writer, member = self.sink
+            self.sink = None
+            return f"{writer.path}!{writer.add(member, data)}"
+
+class JobQueue(QThread):
+    """طابور صفحات يعالجها خيط واحد بالترتيب، فلا تتنافس مهمتان على نفس النماذج.
+    الإلغاء يسري بين المراحل؛ المرحلة الجارية تكتمل أولاً."""
+    stage    = pyqtSignal(int, str)
+    preview  = pyqtSignal(int, QImage)   # الخلفية بعد inpainting ثم الصفحة النهائية
+    page_done = pyqtSignal(int, str)     # QThread.finished يبقى لإشارة انتهاء الخيط نفسه
+    failed   = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+    def __init__(self, pipeline, output_dir=None):
         super().__init__()
-        self.path = path
         self.pipeline = pipeline
+        self.output_dir = Path(output_dir or Config.OUTPUT_DIR)
+        self.jobs = queue.Queue()
+        self.names = {}   # اسم الناتج -> المصدر
+
+    def output_path(self, source, name):
+        """ناتج فريد لكل مصدر: صفحتان بنفس الاسم من مجلدين مختلفين تُكتبان "page.png" و"page (2).png"،
+        وإعادة ترجمة نفس المصدر تكتب فوق ناتجه"""
+        source, (stem, ext) = str(Path(source).resolve()), os.path.splitext(name)
+        n = 1
+        while self.names.setdefault(name, source) != source:
+            n += 1; name = f"{stem} ({n}){ext}"
+        return self.output_dir / name
+
+    def submit(self, job):
+        self.jobs.put(job)
+
+    def stop(self):
+        self.jobs.put(None)
+        self.wait()
+
+    def run(self):
+        while (job := self.jobs.get()) is not None:
+            if job.cancelled:
+                job.release()
+                self.cancelled.emit(job.id); continue
+            def progress(name, result):
+                if job.cancelled:
+                    raise PageCancelled(job.path)
+                self.stage.emit(job.id, name)
+                if name == "inpaint":
+                    self.preview.emit(job.id, cv2_to_qimage(result))
+            try:
+                if is_strip(job.path):
+                    out = self._process_strip(job, progress)
+                    self.page_done.emit(job.id, str(out)); continue
+                final, _ = self.pipeline.process(job.path, progress=progress)
+                self.preview.emit(job.id, cv2_to_qimage(final))
+                if job.sink is not None:
+                    out = job.release(encode_page(job.path, final))
+                else:
+                    out = self.output_path(job.path, job.name)
+                    self.output_dir.mkdir(exist_ok=True, parents=True)
+                    if not cv2.imwrite(str(out), final):
+                        raise OSError(f"Could not write {out}")
+                self.page_done.emit(job.id, str(out))
+            except PageCancelled:
+                job.release()
+                self.cancelled.emit(job.id)
+            except Exception as e:
+                job.release()
+                logging.getLogger("JobQueue").exception("Job failed: %s", job.path)
+                self.failed.emit(job.id, str(e))
+            finally:
+                tracer.flush()   # مقاطع الصفحة إلى PERFORMANCE_LOG_FILE بعد كل صفحة
+        tracer.flush()   # ما بقي (تحميل النماذج مثلاً) عند الإغلاق
+
+    def _process_strip(self, job, progress):
+        """الشريط يُكتب شريحة شريحة دون تجميعه في الذاكرة؛ المعاينة تُجمع من الشرائح مصغّرة"""
+        w, h = image_size(job.path)
+        scale = min(PREVIEW_SIZE[0]/w, PREVIEW_SIZE[1]/h, 1.0)
+        parts = []
+        def on_slice(name, rows):
+            progress(name.replace("slice", "شريحة"), None)
+            parts.append(cv2.resize(rows, (max(1, int(w*scale)), max(1, int(rows.shape[0]*scale))),
+                                    interpolation=cv2.INTER_AREA))
+        if job.sink is not None:
+            buf = io.BytesIO()
+            StripProcessor(self.pipeline).process(job.path, buf, on_slice)
+            out = job.release(buf.getvalue())
+        else:
+            # الشريط يُكتب PNG دائماً
+            out = self.output_path(job.path, Path(job.path).stem + ".png")
+            self.output_dir.mkdir(exist_ok=True, parents=True)
+            StripProcessor(self.pipeline).process(job.path, out, on_slice)
+        self.preview.emit(job.id, cv2_to_qimage(cv2.vconcat(parts)))
+        return out
+
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(int, QImage)
+
+class Thumbnail(QRunnable):
+    """فك ترميز مصغّر للصورة في QThreadPool؛ QImageReader يصغّر أثناء فك JPEG فلا تُفك الصورة كاملة"""
+    def __init__(self, job_id, path, signals):
+        super().__init__()
+        self.job_id, self.path, self.signals = job_id, path, signals
 
     def run(self):
-        try:
-            img,_ = self.pipeline.process(self.path)
-            self.finished.emit(img)
-        except Exception as e:
-            logging.getLogger("Worker").exception("Worker failed")
-            self.error.emit(str(e))
+        if isinstance(self.path, PageBytes):
+            buf = QBuffer(); buf.setData(self.path.data); buf.open(QIODevice.ReadOnly)
+            reader = QImageReader(buf)
+        else:
+            reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if size.isValid():
+            reader.setScaledSize(size.scaled(*PREVIEW_SIZE, Qt.KeepAspectRatio))
+        self.signals.done.emit(self.job_id, reader.read())
+
+class StatsPoller(QThread):
+    """جمع الإحصاءات (psutil وذاكرة GPU) كل ثانيتين خارج خيط الواجهة"""
+    stats = pyqtSignal(dict)
+
+    def __init__(self, pipeline, interval_ms=2000):
+        super().__init__()
+        self.pipeline = pipeline
+        self.interval_ms = interval_ms
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            try:
+                self.stats.emit(self.pipeline.get_performance_stats())
+            except Exception:
+                logging.getLogger("StatsPoller").exception("Stats polling failed")
+            for _ in range(self.interval_ms // 100):
+                if self.isInterruptionRequested(): return
+                self.msleep(100)
 
 class PerformanceWidget(QWidget):
-    def __init__(self, translator):
+    def __init__(self, pipeline):
         super().__init__()
-        self.translator = translator
         v = QVBoxLayout()
         v.addWidget(QLabel("📊 إحصائيات الأداء"))
         self.txt = QTextEdit(); self.txt.setReadOnly(True); self.txt.setMaximumHeight(150)
         v.addWidget(self.txt)
         self.setLayout(v)
-        self.timer = QTimer(); self.timer.timeout.connect(self.update_stats); self.timer.start(2000)
+        self.poller = StatsPoller(pipeline)
+        self.poller.stats.connect(self.update_stats)
+        self.poller.start()
 
-    def update_stats(self):
-        s = self.translator.get_performance_stats()
-        out = (f"🔧 جهاز: {s['device']}\n"
-               f"🧠 CPU: {s['cpu_percent']:.1f}%\n"
-               f"💾 RAM: {s['ram_used_gb']:.1f}/{s['ram_total_gb']:.1f} GB\n")
+    def update_stats(self, s):
+        ready = s.get("readiness", {})
+        out = ""
+        if ready and not all(v == "ready" for v in ready.values()):
+            out += "⏳ تحميل النماذج: " + ", ".join(f"{k}={v}" for k,v in ready.items()) + "\n"
+        out += (f"🔧 جهاز: {s.get('device', '-')}\n"
+               f"🧠 CPU: {s.get('cpu_percent', 0.0):.1f}%\n"
+               f"💾 RAM: {s.get('ram_used_gb', 0.0):.1f}/{s.get('ram_total_gb', 0.0):.1f} GB\n")
         if 'gpu_memory_used_gb' in s:
             out += f"🎮 GPU: {s['gpu_memory_used_gb']:.1f}/{s['gpu_memory_total_gb']:.1f} GB\n"
+        page = s.get("stages", {}).get("page")
+        if page:
+            out += f"📄 صفحة: p50={page['p50_ms']/1000:.1f}s p95={page['p95_ms']/1000:.1f}s\n"
+        cache = s.get("page_cache")
+        if cache and cache["hits"]:
+            out += f"♻️ صفحات مكررة: {cache['hits']} ({cache['hit_rate']:.0%})، وُفّر {cache['saved_s']:.1f}s\n"
         self.txt.setPlainText(out)
 
+    def stop(self):
+        self.poller.requestInterruption()
+        self.poller.wait()
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("مترجم مانجا v2.0")
         self.resize(1000,700)
+        self.setAcceptDrops(True)
 
-        self.pipeline   = MangaTranslationPipeline()
-        self.translator = self.pipeline.translator
+        # النماذج تُحمّل في الخلفية؛ النافذة تظهر فوراً
+        self.pipeline = MangaTranslationPipeline()
+        self.pipeline.warm_up()
 
-        layout = QVBoxLayout()
-        self.label = QLabel("اسحب الصورة أو انقر لفتح")
+        self.jobs, self.items, self.next_id = {}, {}, 0
+        self.queue = JobQueue(self.pipeline)
+        self.queue.stage.connect(self.on_stage)
+        self.queue.preview.connect(self.on_preview)
+        self.queue.page_done.connect(self.on_done)
+        self.queue.failed.connect(self.on_failed)
+        self.queue.cancelled.connect(lambda i: self.set_status(i, "cancelled"))
+        self.queue.start()
+        self.thumbs = _ThumbnailSignals()
+        self.thumbs.done.connect(self.on_preview)
+        # مجمّع خاص: Qt يحوّل صيغ QImage الكبيرة (BGR888 عند setPixmap) على المجمّع العام وخيط الواجهة ينتظره
+        self.thumb_pool = QThreadPool(self)
+
+        self.label = QLabel("اسحب الصور أو انقر لفتح")
         self.label.setAlignment(Qt.AlignCenter)
+        self.label.setMinimumSize(*PREVIEW_SIZE)
         self.label.setStyleSheet("border:2px dashed #aaa; padding:20px;")
-        self.label.setAcceptDrops(True)
         self.label.mousePressEvent = self.open_file
 
+        self.list = QListWidget()
+        self.list.currentRowChanged.connect(self.show_selected)
+        self.progress = QProgressBar(); self.progress.setRange(0, len(STAGES))
+        self.follow = QCheckBox("متابعة الصفحة الجارية"); self.follow.setChecked(True)
+
         self.btn = QPushButton("⚡ ترجم إلى العربية")
         self.btn.clicked.connect(self.translate)
         self.btn.setEnabled(False)
+        self.cancel_btn = QPushButton("⛔ إلغاء المحدد")
+        self.cancel_btn.clicked.connect(lambda: self.cancel([self.current_job()]))
+        self.cancel_all_btn = QPushButton("⛔ إلغاء الكل")
+        self.cancel_all_btn.clicked.connect(lambda: self.cancel(list(self.jobs.values())))
 
-        self.perf = PerformanceWidget(self.translator)
+        self.perf = PerformanceWidget(self.pipeline)
 
-        layout.addWidget(self.label)
-        layout.addWidget(self.btn)
-        layout.addWidget(self.perf)
+        side = QVBoxLayout()
+        side.addWidget(self.list)
+        side.addWidget(self.progress)
+        side.addWidget(self.follow)
+        buttons = QHBoxLayout()
+        for b in (self.btn, self.cancel_btn, self.cancel_all_btn): buttons.addWidget(b)
+        side.addLayout(buttons)
+        side.addWidget(self.perf)
+        layout = QHBoxLayout()
+        layout.addWidget(self.label, 1)
+        layout.addLayout(side, 1)
 
         container = QWidget(); container.setLayout(layout)
         self.setCentralWidget(container)
-        self.image_path = None
 
     def dragEnterEvent(self, e):
         if e.mimeData().hasUrls(): e.accept()
 
     def dropEvent(self, e):
-        p = e.mimeData().urls()[0].toLocalFile()
-        if p.lower().endswith(('.png','.jpg','.jpeg','.webp')):
-            self.load_image(p)
+        exts = tuple(Config.SUPPORTED_IMAGE_FORMATS) + ARCHIVE_FORMATS
+        self.add_pages([u.toLocalFile() for u in e.mimeData().urls() if u.toLocalFile().lower().endswith(exts)])
 
     def open_file(self, e=None):
-        p,_ = QFileDialog.getOpenFileName(self, "اختر صورة", "", "Images (*.png *.jpg *.jpeg *.webp)")
-        if p: self.load_image(p)
+        ps,_ = QFileDialog.getOpenFileNames(self, "اختر صوراً أو فصولاً", "",
+                                            "Images / CBZ (*.png *.jpg *.jpeg *.webp *.bmp *.cbz *.zip)")
+        self.add_pages(ps)
 
-    def load_image(self, p):
-        self.image_path = p
-        pix = cv2.imread(p)
-        self.label.setPixmap(cv2_to_pixmap(pix))
-        self.btn.setEnabled(True)
+    def add_pages(self, paths):
+        for p in paths:
+            if not is_archive(p):
+                self.add_job(p); continue
+            # صفحات الفصل تُقرأ من الأرشيف في الذاكرة، والنتائج تُكتب في أرشيف بنفس الاسم في مجلد الإخراج
+            self.queue.output_dir.mkdir(exist_ok=True, parents=True)
+            with ArchiveReader(p) as reader:
+                writer = ArchiveWriter(self.queue.output_path(p, Path(p).name), len(reader), reader.extras, reader)
+                for page in reader.pages():
+                    self.add_job(page, (writer, page.member))
+        if self.jobs:
+            self.list.setCurrentItem(self.items[self.next_id - 1])
+        self.btn.setEnabled(any(j.status == "queued" and not j.cancelled for j in self.jobs.values()))
+
+    def add_job(self, path, sink=None):
+        job = Job(self.next_id, path, sink); self.next_id += 1
+        self.jobs[job.id] = job
+        self.items[job.id] = QListWidgetItem()
+        self.list.addItem(self.items[job.id])
+        self.refresh(job)
+        self.thumb_pool.start(Thumbnail(job.id, path, self.thumbs))
+
+    def current_job(self):
+        row = self.list.currentRow()
+        return list(self.jobs.values())[row] if row >= 0 else None
 
     def translate(self):
-        self.btn.setText("جاري الترجمة...")
-        self.worker = Worker(self.image_path, self.pipeline)
-        self.worker.finished.connect(self.on_done)
-        self.worker.error.connect(lambda e: QMessageBox.critical(self, "خطأ", e))
-        self.worker.start()
-
-    def on_done(self, img):
-        self.label.setPixmap(cv2_to_pixmap(img))
-        self.btn.setText("✅ تمت!")
+        for job in self.jobs.values():
+            if job.status == "queued" and not job.cancelled and not job.submitted:
+                job.submitted = True
+                self.queue.submit(job)
+        self.btn.setEnabled(False)
+
+    def cancel(self, jobs):
+        for job in jobs:
+            if job and job.status in ("queued", "running"):
+                job.cancelled = True
+                if not job.submitted:
+                    job.release()
+                    self.set_status(job.id, "cancelled")
+
+    def refresh(self, job):
+        if job.status == "running":
+            text = f"🔄 {STAGE_LABELS.get(job.stage, job.stage or '...')}"
+        else:
+            text = STATUS_LABELS[job.status]
+        self.items[job.id].setText(f"{job.name} — {text}")
+        if job is self.current_job():
+            self.progress.setValue(STAGES.index(job.stage) + 1 if job.stage in STAGES else 0)
+
+    def set_status(self, job_id, status):
+        job = self.jobs[job_id]
+        job.status = status
+        self.refresh(job)
+
+    def on_stage(self, job_id, stage):
+        job = self.jobs[job_id]
+        job.status, job.stage = "running", stage
+        if self.follow.isChecked() and job is not self.current_job():
+            self.list.setCurrentItem(self.items[job_id])
+        self.refresh(job)
+
+    def on_preview(self, job_id, qimg):
+        job = self.jobs[job_id]
+        if qimg.isNull():
+            return
+        job.preview = qimg
+        if job is self.current_job():
+            self.label.setPixmap(QPixmap.fromImage(qimg))
+
+    def on_done(self, job_id, out):
+        self.jobs[job_id].output = out
+        self.jobs[job_id].stage = "render"
+        self.set_status(job_id, "done")
+
+    def on_failed(self, job_id, err):
+        self.set_status(job_id, "failed")
+        self.items[job_id].setToolTip(err)
+
+    def show_selected(self, row):
+        job = self.current_job()
+        if job is None:
+            return
+        self.refresh(job)
+        if job.preview is not None:
+            self.label.setPixmap(QPixmap.fromImage(job.preview))
+
+    def closeEvent(self, e):
+        self.cancel(list(self.jobs.values()))
+        self.queue.stop()
+        self.perf.stop()
+        super().closeEvent(e)
 
 def run_gui():
     app = QApplication(sys.argv)
@@ -27,6 +27,20 @@ a = Analysis(
         ('core/inpainting_lama.py', 'core'),
         ('core/graphic_reintegration.py', 'core'),
         ('core/pipeline.py', 'core'),
+        ('core/batch.py', 'core'),
+        ('core/streaming.py', 'core'),
+        ('core/translation_memory.py', 'core'),
+        ('core/batching.py', 'core'),
+        ('core/weight_store.py', 'core'),
+        ('core/box_ops.py', 'core'),
+        ('core/text_layout.py', 'core'),
+        ('core/strip.py', 'core'),
+        ('core/onnx_backend.py', 'core'),
+        ('core/page_store.py', 'core'),
+        ('core/server.py', 'core'),
+        ('core/archive.py', 'core'),
+        ('core/page_frame.py', 'core'),
+        ('core/page_cache.py', 'core'),
         ('gui/__init__.py', 'gui'),
         ('gui/main_window.py', 'gui'),
     ],
@@ -35,6 +49,20 @@ a = Analysis(
         'core.cache_manager', 'core.gpu_optimizer', 'core.model_compressor', 
         'core.text_detector', 'core.advanced_ocr', 'core.ai_translator',
         'core.inpainting_lama', 'core.graphic_reintegration', 'core.pipeline',
+        'core.batch',
+        'core.streaming',
+        'core.translation_memory',
+        'core.batching',
+        'core.weight_store',
+        'core.box_ops',
+        'core.text_layout',
+        'core.strip',
+        'core.onnx_backend',
+        'core.page_store',
+        'core.server',
+        'core.archive',
+        'core.page_frame',
+        'core.page_cache',
         'gui.main_window',
         'cv2', 'numpy', 'PIL', 'PyQt5', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets',
         'easyocr', 'torch', 'transformers', 'lama_cleaner', 'psutil'
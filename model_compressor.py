@@ -1,32 +1,121 @@
 # core/model_compressor.py
-import torch, torch.nn as nn, logging
-from torch.quantization import quantize_dynamic
+import io, os, json, shutil, logging, importlib
+from pathlib import Path
+import torch, torch.nn as nn
+import torch.nn.utils.prune as prune
+from torch.ao.quantization import quantize_dynamic, default_dynamic_qconfig
+from .config import Config
+
+# quantization: الاسم القديم، ويعني int8 مع تصفير أصغر الأوزان بنسبة compression_ratio
+METHODS = {"int8": (False, True), "int8_sparse": (True, True), "quantization": (True, True),
+           "pruning": (True, False)}
 
 class ModelCompressor:
-    def __init__(self):
+    """ضغط النماذج (تقليم + int8) مع حفظ النتيجة في compressed_models/ لإعادة استخدامها مباشرة"""
+
+    def __init__(self, root=None):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.root = Path(root or Config.COMPRESSED_MODELS_DIR)
 
     def compress_model(self, model, method="quantization", compression_ratio=0.3):
-        orig = self._model_size(model)
-        if method=="quantization":
-            model = quantize_dynamic(model, {nn.Linear, nn.Conv2d}, dtype=torch.qint8)
-            for p in model.parameters():
-                th = torch.quantile(p.data.abs(), compression_ratio)
-                p.data[p.data.abs()<th] = 0
-        elif method=="pruning":
-            import torch.nn.utils.prune as prune
-            to_prune = [(m,"weight") for m in model.modules() if isinstance(m,(nn.Linear,nn.Conv2d))]
-            prune.global_unstructured(to_prune, pruning_method=prune.L1Unstructured, amount=compression_ratio)
-            for m,_ in to_prune: prune.remove(m,"weight")
-        else:
+        if method not in METHODS:
             raise ValueError(f"Unknown method {method}")
+        sparse, int8 = METHODS[method]
+        orig = self._model_size(model)
+        layers = self._linear_layers(model)
+        # التقليم يتم على الأوزان العائمة قبل التكميم: أوزان Linear المكمّمة لا تظهر في parameters()
+        if sparse and compression_ratio > 0:
+            for m in layers.values():
+                prune.l1_unstructured(m, "weight", amount=compression_ratio)
+                prune.remove(m, "weight")
+        if int8:
+            model = self._quantize(model, layers)
         new = self._model_size(model)
-        reduction = 100*(1-new/orig)
-        self.logger.info(f"[Compress] {reduction:.1f}% reduction ({orig:.1f}→{new:.1f} MB)")
+        self.logger.info("[Compress] %s: %.1f%% reduction (%.1f→%.1f MB), sparsity %.1f%%",
+                         method, 100*(1-new/orig), orig, new, 100*self.sparsity(model))
+        return model
+
+    def _linear_layers(self, model):
+        """طبقات Linear القابلة للضغط؛ المرتبطة بأوزان embedding (مثل lm_head) تُستثنى حتى لا ينفك الربط"""
+        tied = {id(m.weight) for m in model.modules() if isinstance(m, nn.Embedding)}
+        return {n: m for n, m in model.named_modules()
+                if isinstance(m, nn.Linear) and id(m.weight) not in tied}
+
+    def _quantize(self, model, layers):
+        return quantize_dynamic(model, {n: default_dynamic_qconfig for n in layers}, dtype=torch.qint8)
+
+    # ---- الحفظ والتحميل ----
+    def artifact_path(self, name, method, compression_ratio):
+        ratio = compression_ratio if METHODS[method][0] else 0
+        return self.root / f"{name.replace('/', '--')}-{method}-{ratio:g}"
+
+    def load_or_compress(self, name, loader, method="quantization", compression_ratio=0.3):
+        """يحمّل النسخة المضغوطة من القرص، أو يبنيها مرة واحدة من loader() ويحفظها"""
+        path = self.artifact_path(name, method, compression_ratio)
+        if (path / "manifest.json").exists():
+            try:
+                model = self.load(path)
+                self.logger.info("Loaded compressed model from %s", path)
+                return model
+            except Exception:
+                self.logger.exception("Compressed artifact %s is unusable, rebuilding", path)
+        model = self.compress_model(loader().eval(), method, compression_ratio)
+        self.save(path, model, method, compression_ratio, source=name)
         return model
 
+    def save(self, path, model, method, compression_ratio, source=None):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        torch.save(model.state_dict(), tmp / "model.pt")
+        cls = type(model)
+        manifest = {"class": f"{cls.__module__}:{cls.__qualname__}", "config": model.config.to_dict(),
+                    "method": method, "compression_ratio": compression_ratio, "source": source,
+                    "torch": torch.__version__, "size_mb": round(self._model_size(model), 2),
+                    "sparsity": round(self.sparsity(model), 4)}
+        if getattr(model, "generation_config", None) is not None:
+            manifest["generation_config"] = model.generation_config.to_dict()
+        (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        self.logger.info("Saved compressed model to %s", path)
+
+    def load(self, path):
+        path = Path(path)
+        manifest = json.loads((path / "manifest.json").read_text())
+        if manifest["torch"] != torch.__version__:
+            raise RuntimeError(f"artifact built with torch {manifest['torch']}, running {torch.__version__}")
+        module, qualname = manifest["class"].split(":")
+        cls = getattr(importlib.import_module(module), qualname)
+        # الهيكل فقط (بدون تهيئة أوزان)، ثم نفس التحويل الذي طُبّق عند الضغط، ثم الأوزان المحفوظة
+        with torch.device("meta"):
+            model = cls(cls.config_class.from_dict(manifest["config"]))
+        model = model.to_empty(device="cpu")
+        if hasattr(model, "tie_weights"): model.tie_weights()
+        if METHODS[manifest["method"]][1]:
+            model = self._quantize(model, self._linear_layers(model))
+        model.load_state_dict(torch.load(path / "model.pt", weights_only=False))
+        if "generation_config" in manifest:
+            from transformers import GenerationConfig
+            model.generation_config = GenerationConfig.from_dict(manifest["generation_config"])
+        return model.eval()
+
+    # ---- إحصاءات ----
     def _model_size(self, model):
-        ps, bs = 0,0
-        for p in model.parameters(): ps+=p.numel()*p.element_size()
-        for b in model.buffers():    bs+=b.numel()*b.element_size()
-        return (ps+bs)/1024/1024
\ No newline at end of file
+        """الحجم الفعلي بالـ MB (يشمل أوزان Linear المكمّمة المعبأة التي لا تظهر في parameters())"""
+        buf = io.BytesIO()
+        torch.save(model.state_dict(), buf)
+        return buf.tell()/1024/1024
+
+    def sparsity(self, model):
+        zeros = total = 0
+        for t in model.state_dict().values():
+            if isinstance(t, tuple):   # _packed_params لطبقات Linear المكمّمة: (weight, bias)
+                t = t[0]
+            if not isinstance(t, torch.Tensor) or not (t.is_floating_point() or t.is_quantized):
+                continue
+            if t.is_quantized:
+                t = t.dequantize()
+            zeros += int((t == 0).sum()); total += t.numel()
+        return zeros / max(1, total)
@@ -0,0 +1,201 @@
+# core/onnx_backend.py
+import os, math, shutil, logging, threading, importlib.util
+from pathlib import Path
+import cv2, numpy as np, psutil
+from .config import Config
+from .error_handler import MangaError
+
+logger = logging.getLogger("ONNXBackend")
+
+def available():
+    return importlib.util.find_spec("onnxruntime") is not None
+
+def _require(*modules):
+    missing = [m for m in modules if importlib.util.find_spec(m) is None]
+    if missing:
+        raise MangaError(f"INFERENCE_BACKEND=onnx requires {', '.join(missing)} "
+                         f"(pip install optimum[onnxruntime])", "ONNX")
+
+def onnx_dir(key):
+    """مكان ملفات ONNX المصدّرة داخل مجلد ذاكرة النماذج"""
+    return Path(Config.CACHE_DIR) / "onnx" / key
+
+def session_options():
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = Config.ONNX_INTRA_OP_THREADS or psutil.cpu_count(logical=False) or 1
+    opts.inter_op_num_threads = Config.ONNX_INTER_OP_THREADS
+    opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return opts
+
+def _export_once(path, export):
+    """تصدير إلى مجلد مؤقت ثم نقله، حتى لا يبقى تصدير ناقص على القرص"""
+    if path.exists():
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    export(tmp)
+    os.replace(tmp, path)
+
+# ---------------------------------------------------------------- MarianMT
+def load_marian(name, key):
+    """MarianMT عبر ONNX Runtime: encoder + decoder + decoder_with_past (KV cache).
+    يُصدَّر مرة واحدة بواسطة optimum ويُعاد استخدامه، ويدعم generate() كالنموذج الأصلي."""
+    _require("onnxruntime", "optimum")
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    path = onnx_dir(key)
+    def export(tmp):
+        logger.info("Exporting %s to ONNX (%s)", name, path)
+        ORTModelForSeq2SeqLM.from_pretrained(name, export=True, use_cache=True).save_pretrained(str(tmp))
+    _export_once(path, export)
+    return ORTModelForSeq2SeqLM.from_pretrained(str(path), use_cache=True, provider="CPUExecutionProvider",
+                                                session_options=session_options())
+
+# ---------------------------------------------------------------- LaMa
+# نموذج LaMa في lama_cleaner محفوظ كـ TorchScript، والمصدِّر لا يعرف عمليات FFT في طبقات FFC.
+# نمثل كل tensor مركّب بـ tensor حقيقي بُعده الأخير 2 (real, imag)، ونحسب الـ DFT كضرب مصفوفات
+# cos/sin تُبنى داخل الرسم حسب الأبعاد: FFC تعمل على 1/8 من الدقة، فيبقى MatMul أسرع من عملية DFT في ORT.
+_registered = False
+_register_lock = threading.Lock()
+
+def _const(g, v, dtype=None):
+    import torch
+    return g.op("Constant", value_t=torch.tensor(v, dtype=dtype or torch.int64))
+
+def _size(g, x, axis):
+    return g.op("Gather", g.op("Shape", x), _const(g, axis), axis_i=0)
+
+def _dft_matrices(g, n, k):
+    """cos و sin للزاوية 2π·i·j/n بأبعاد (n, k)"""
+    import torch
+    from torch.onnx import symbolic_helper as sh
+    ri = g.op("Range", _const(g, 0), n, _const(g, 1))
+    rj = g.op("Range", _const(g, 0), k, _const(g, 1))
+    ij = g.op("Mod", g.op("Mul", sh._unsqueeze_helper(g, ri, [1]), sh._unsqueeze_helper(g, rj, [0])), n)
+    angle = g.op("Mul", g.op("Cast", ij, to_i=1),
+                 g.op("Div", _const(g, 2*math.pi, torch.float32), g.op("Cast", n, to_i=1)))
+    return g.op("Cos", angle), g.op("Sin", angle)
+
+def _normalize(g, y, h, w, norm, inverse):
+    n = g.op("Cast", g.op("Mul", h, w), to_i=1)
+    if norm == "ortho":
+        return g.op("Div", y, g.op("Sqrt", n))
+    return g.op("Div", y, n) if (norm == "forward") != inverse else y
+
+def _check_dims(dims, rank):
+    if sorted(d % rank for d in dims) != [rank-2, rank-1]:
+        raise RuntimeError(f"ONNX export supports 2-D FFT over the last two axes only, got dim={dims}")
+
+def _register_fft_symbolics():
+    global _registered
+    import torch
+    from torch.onnx import symbolic_helper as sh
+    with _register_lock:
+        if _registered:
+            return
+
+        @sh.parse_args("v", "is", "is", "s")
+        def fft_rfftn(g, x, s, dim, norm):
+            rank = sh._get_tensor_rank(x) or 4
+            _check_dims(dim, rank)
+            h, w = _size(g, x, rank-2), _size(g, x, rank-1)
+            half = g.op("Add", g.op("Div", w, _const(g, 2)), _const(g, 1))
+            cw, sw = _dft_matrices(g, w, half)
+            ch, shh = _dft_matrices(g, h, h)
+            # rfft على العرض ثم fft كامل على الارتفاع: (a+ib)(cos - i·sin)
+            re, im = g.op("MatMul", x, cw), g.op("Neg", g.op("MatMul", x, sw))
+            RE = g.op("Add", g.op("MatMul", ch, re), g.op("MatMul", shh, im))
+            IM = g.op("Sub", g.op("MatMul", ch, im), g.op("MatMul", shh, re))
+            y = g.op("Concat", sh._unsqueeze_helper(g, RE, [rank]), sh._unsqueeze_helper(g, IM, [rank]), axis_i=rank)
+            return _normalize(g, y, h, w, norm, inverse=False)
+
+        def fft_irfftn(g, x, s, dim, norm):
+            rank = (sh._get_tensor_rank(x) or 5) - 1
+            _check_dims(sh._get_const(dim, "is", "dim"), rank)
+            RE, IM = real(g, x), imag(g, x)
+            h, half = _size(g, x, rank-2), _size(g, x, rank-1)
+            w = sh._unpack_list(s)[-1] if sh._is_packed_list(s) else g.op("Gather", s, _const(g, -1), axis_i=0)
+            ch, shh = _dft_matrices(g, h, h)
+            re = g.op("Sub", g.op("MatMul", ch, RE), g.op("MatMul", shh, IM))
+            im = g.op("Add", g.op("MatMul", ch, IM), g.op("MatMul", shh, RE))
+            # c2r: النصف المحذوف من الطيف مرآة مرافقة، فكل تردد عدا 0 و w/2 يُحسب مرتين
+            k = g.op("Range", _const(g, 0), half, _const(g, 1))
+            edge = g.op("Or", g.op("Equal", k, _const(g, 0)), g.op("Equal", g.op("Mul", k, _const(g, 2)), w))
+            weight = g.op("Sub", _const(g, 2.0, torch.float32), g.op("Cast", edge, to_i=1))
+            cw, sw = _dft_matrices(g, w, half)
+            cw = g.op("Transpose", g.op("Mul", cw, weight), perm_i=[1, 0])
+            sw = g.op("Transpose", g.op("Mul", sw, weight), perm_i=[1, 0])
+            y = g.op("Sub", g.op("MatMul", re, cw), g.op("MatMul", im, sw))
+            return _normalize(g, y, h, w, sh._maybe_get_const(norm, "s"), inverse=True)
+
+        def real(g, x):
+            return sh._squeeze_helper(g, g.op("Gather", x, _const(g, [0]), axis_i=-1), [-1])
+
+        def imag(g, x):
+            return sh._squeeze_helper(g, g.op("Gather", x, _const(g, [1]), axis_i=-1), [-1])
+
+        def complex_(g, re, im):
+            return g.op("Concat", sh._unsqueeze_helper(g, re, [-1]), sh._unsqueeze_helper(g, im, [-1]), axis_i=-1)
+
+        for op, fn in {"fft_rfftn": fft_rfftn, "fft_irfftn": fft_irfftn,
+                       "real": real, "imag": imag, "complex": complex_}.items():
+            torch.onnx.register_custom_op_symbolic(f"aten::{op}", fn, Config.ONNX_OPSET)
+        _registered = True
+
+def export_lama(model, path):
+    """تصدير شبكة LaMa (TorchScript) إلى ONNX بأبعاد ديناميكية (يجب أن تكون مضاعفات 8)"""
+    import torch
+    _register_fft_symbolics()
+    image, mask = torch.rand(1, 3, 256, 256), torch.zeros(1, 1, 256, 256)
+    axes = {2: "height", 3: "width"}
+    with torch.no_grad():
+        torch.onnx.export(model, (image, mask), str(path), opset_version=Config.ONNX_OPSET, dynamo=False,
+                          input_names=["image", "mask"], output_names=["output"],
+                          dynamic_axes={"image": axes, "mask": axes, "output": axes})
+
+def _mode(config):
+    hd = getattr(config, "hd_strategy", "original")
+    return str(getattr(hd, "value", hd)).lower()
+
+class LamaONNX:
+    """بديل لـ lama_cleaner.ModelManager("lama") يشغّل الشبكة عبر ONNX Runtime.
+    نفس الواجهة: model(rgb, mask, config) يعيد صورة BGR."""
+
+    def __init__(self, load_torch_model):
+        _require("onnxruntime")
+        import onnxruntime as ort
+        self.logger = logging.getLogger(self.__class__.__name__)
+        path = onnx_dir("lama")
+        def export(tmp):
+            self.logger.info("Exporting LaMa to ONNX (%s)", path)
+            export_lama(load_torch_model(), tmp / "lama.onnx")
+        _export_once(path, export)
+        self.session = ort.InferenceSession(str(path / "lama.onnx"), session_options(),
+                                            providers=["CPUExecutionProvider"])
+
+    def __call__(self, image, mask, config):
+        if _mode(config) == "resize" and max(image.shape[:2]) > config.hd_strategy_resize_limit:
+            h, w = image.shape[:2]
+            scale = config.hd_strategy_resize_limit / max(h, w)
+            size = (max(1, round(w*scale)), max(1, round(h*scale)))
+            res = self._forward(cv2.resize(image, size, interpolation=cv2.INTER_AREA),
+                                cv2.resize(mask, size, interpolation=cv2.INTER_NEAREST))
+            res = cv2.resize(res, (w, h), interpolation=cv2.INTER_CUBIC)
+        else:
+            res = self._forward(image, mask)
+        keep = mask < 127
+        res[keep] = image[:, :, ::-1][keep]
+        return res
+
+    def _forward(self, image, mask):
+        h, w = image.shape[:2]
+        ph, pw = (-h) % 8, (-w) % 8
+        img = np.pad(image, ((0, ph), (0, pw), (0, 0)), mode="symmetric")
+        m = np.pad(mask, ((0, ph), (0, pw)), mode="symmetric")
+        out = self.session.run(None, {
+            "image": np.ascontiguousarray(img.transpose(2, 0, 1)[None], np.float32) / 255,
+            "mask": (m > 0).astype(np.float32)[None, None]})[0][0]
+        out = np.clip(out.transpose(1, 2, 0)[:h, :w] * 255, 0, 255).astype(np.uint8)
+        return cv2.cvtColor(out, cv2.COLOR_RGB2BGR)
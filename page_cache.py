@@ -0,0 +1,204 @@
+# core/page_cache.py
+import os, json, time, uuid, shutil, logging, threading
+from pathlib import Path
+import cv2, numpy as np
+from .config import Config
+from .page_frame import PageFrame
+
+THUMB = 128   # الصورة المصغرة للتحقق (خلايا 8×8)
+INDEX_DTYPE = np.dtype([("hash", "<u8"), ("sig", "<u8"), ("h", "<u4"), ("w", "<u4"),
+                        ("secs", "<f4"), ("key", "S16")])
+
+def _thumb(gray):
+    return cv2.resize(gray, (THUMB, THUMB), interpolation=cv2.INTER_AREA)
+
+def phash(thumb):
+    """بصمة إدراكية 64 بت: إشارة أدنى 8×8 معاملات DCT بالنسبة لوسيطها"""
+    low = cv2.dct(cv2.resize(thumb, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32))[:8, :8].ravel()
+    return np.packbits(low > np.median(low[1:])).view(">u8").astype("<u8")[0]
+
+def _hamming(hashes, h):
+    return np.unpackbits((hashes ^ h).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def _cell_diff(a, b):
+    """أكبر فرق متوسط بين خلايا 8×8 المتقابلة؛ يرفض الصفحات التي تغيّر رسمها أو فقاعة كاملة فيها"""
+    d = cv2.absdiff(a, b).reshape(THUMB // 8, 8, THUMB // 8, 8).mean(axis=(1, 3))
+    return float(d.max())
+
+def _cells(gray):
+    """متوسطات خلايا 4×4 بكسل بالدقة الكاملة؛ تختلف فيها أرقام وحروف صغيرة لا تظهر في الصورة المصغرة"""
+    return cv2.resize(gray, (max(1, gray.shape[1] // 4), max(1, gray.shape[0] // 4)), interpolation=cv2.INTER_AREA)
+
+class PageCache:
+    """الصفحات المترجمة بمفتاح بصمة إدراكية للصفحة بعد فك ترميزها: الصفحات المكررة والمتقاربة
+    (صفحات الشكر، إعادة الرفع، نفس الفصل من مصدر آخر) تُعاد من القرص بدل تشغيل الـ pipeline.
+
+    CACHE_DIR/pages/index.bin: سجلات ثابتة الحجم تُضاف بكتابة واحدة (O_APPEND) فتتشاركه عمليات
+    المعالجة الدفعية؛ كل سجل يشير إلى <key>/ فيه final.png وblocks.json وthumb.png وcells.png.
+    التطابق: نفس بصمة إعدادات المراحل (sig)، فرق البصمة ≤ PAGE_CACHE_MAX_DISTANCE بت، والصورة المصغرة
+    (PAGE_CACHE_MAX_CELL_DIFF). لا يكفي ذلك لصفحات تختلف في نص صغير ("CHAPTER 12" و"CHAPTER 13")، لذلك:
+    - بنفس الأبعاد: خلايا 4×4 بكسل للصفحة كاملة (PAGE_CACHE_MAX_PIXEL_DIFF)
+    - بأبعاد أخرى: فروق إعادة التحجيم بحجم فروق الحروف، فيُتحقق بـ verify(blocks) (نص OCR في نفس الصناديق)
+    الحجم محدود بـ PAGE_CACHE_MAX_MB: الأقدم استخداماً (mtime المجلد، يُحدَّث عند كل إصابة) يُحذف أولاً."""
+
+    def __init__(self, root=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.root = Path(root or Config.PAGE_CACHE_DIR)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.index_file = self.root / "index.bin"
+        self.index = np.zeros(0, INDEX_DTYPE)
+        self._read_bytes = self._inode = 0
+        self._bytes = None   # تقدير حجم المجلد؛ يُحسب فعلياً عند تجاوز الحد
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evicted = 0
+        self.saved_s = 0.0
+
+    def _refresh(self):
+        """قراءة السجلات التي أضافتها عمليات أخرى منذ آخر قراءة"""
+        try:
+            st = self.index_file.stat()
+        except OSError:
+            return
+        if st.st_ino != self._inode or st.st_size < self._read_bytes:
+            # أعادت عملية أخرى كتابة الفهرس بعد الحذف
+            self.index, self._read_bytes, self._inode = np.zeros(0, INDEX_DTYPE), 0, st.st_ino
+        size = st.st_size - st.st_size % INDEX_DTYPE.itemsize   # سجل قيد الكتابة
+        if size > self._read_bytes:
+            with open(self.index_file, "rb") as f:
+                f.seek(self._read_bytes)
+                new = np.frombuffer(f.read(size - self._read_bytes), INDEX_DTYPE)
+            self.index = np.concatenate([self.index, new])
+            self._read_bytes = size
+
+    @staticmethod
+    def fingerprint(image):
+        """(الصورة المصغرة، البصمة، الأبعاد، الخلايا) للصفحة الأصلية، قبل أن تعدّلها المراحل في مكانها"""
+        frame = PageFrame.of(image)
+        thumb = _thumb(frame.gray)
+        return thumb, phash(thumb), frame.shape[:2], _cells(frame.gray)
+
+    def lookup(self, fp, sig, verify=None):
+        """يعيد (final, blocks) لصفحة مطابقة أو None.
+        verify(blocks): للمدخلات بأبعاد أخرى، يعيد True إن طابق نص الصفحة blocks (بإحداثيات الطلب)"""
+        start = time.perf_counter()
+        thumb, h, (H, W), cells = fp
+        with self.lock:
+            self._refresh()
+            idx = self.index
+            near = np.flatnonzero((idx["sig"] == sig) & (_hamming(idx["hash"], h) <= Config.PAGE_CACHE_MAX_DISTANCE)
+                                  # نفس نسبة الأبعاد (±2%)؛ الدقة قد تختلف بين المصادر
+                                  & (np.abs(idx["w"] / np.maximum(idx["h"], 1) - W / H) <= 0.02 * W / H))
+        for i in near[::-1]:   # الأحدث أولاً
+            entry = idx[i]
+            d = self.root / entry["key"].decode()
+            cached = cv2.imread(str(d / "thumb.png"), cv2.IMREAD_GRAYSCALE)
+            if cached is None or _cell_diff(cached, thumb) > Config.PAGE_CACHE_MAX_CELL_DIFF:
+                continue
+            try:
+                blocks = json.loads((d / "blocks.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if (int(entry["h"]), int(entry["w"])) == (H, W):
+                stored = cv2.imread(str(d / "cells.png"), cv2.IMREAD_GRAYSCALE)
+                if stored is None or stored.shape != cells.shape or \
+                        float(cv2.absdiff(stored, cells).max()) > Config.PAGE_CACHE_MAX_PIXEL_DIFF:
+                    continue
+            else:
+                blocks = _scale_blocks(blocks, W / int(entry["w"]), H / int(entry["h"]))
+                if verify is None or not verify(blocks):
+                    continue
+            final = cv2.imread(str(d / "final.png"))
+            if final is None:
+                continue
+            if final.shape[:2] != (H, W):
+                final = _resize(final, W, H)
+            try:
+                os.utime(d)   # LRU
+            except OSError:
+                pass
+            with self.lock:
+                self.hits += 1
+                self.saved_s += max(0.0, float(entry["secs"]) - (time.perf_counter() - start))
+            self.logger.info("Page cache hit (%s, %d bits)", entry["key"].decode(),
+                             _hamming(idx["hash"][i:i+1], h)[0])
+            return final, blocks
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def add(self, fp, final, blocks, sig, secs):
+        """secs: زمن معالجة الصفحة، يُحتسب وقتاً موفّراً عند كل إصابة لاحقة"""
+        thumb, h, (H, W), cells = fp
+        key = uuid.uuid4().hex[:16]
+        d = self.root / key
+        d.mkdir()
+        # المدخل يُكتب كاملاً قبل سجله في الفهرس، فلا يرى أحد مدخلاً ناقصاً
+        ok = (cv2.imwrite(str(d / "final.png"), final, [cv2.IMWRITE_PNG_COMPRESSION, 1]) and
+              cv2.imwrite(str(d / "thumb.png"), thumb) and cv2.imwrite(str(d / "cells.png"), cells))
+        if not ok:
+            raise OSError(f"Could not write page cache entry {d}")
+        # index يشير إلى مدخل الصفحة الأصلية في PageStore، لا إلى الصفحات المطابقة لها
+        blocks = [{k: v for k, v in b.items() if k != "index"} for b in blocks]
+        (d / "blocks.json").write_text(json.dumps(blocks, ensure_ascii=False), encoding="utf-8")
+        rec = np.array([(h, sig, H, W, secs, key.encode())], INDEX_DTYPE)
+        fd = os.open(self.index_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, rec.tobytes())
+        finally:
+            os.close(fd)
+        size = sum(f.stat().st_size for f in d.iterdir())
+        with self.lock:
+            if self._bytes is None:
+                self._bytes = _dir_bytes(self.root)
+            else:
+                self._bytes += size
+            over = self._bytes > Config.PAGE_CACHE_MAX_MB * 2**20
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """حذف الأقدم استخداماً حتى 90% من PAGE_CACHE_MAX_MB ثم إعادة كتابة الفهرس بدونها"""
+        entries = []
+        for d in self.root.iterdir():
+            if d.is_dir():
+                try:
+                    entries.append((d.stat().st_mtime, _dir_bytes(d), d))
+                except OSError:
+                    continue
+        total, budget = sum(e[1] for e in entries), 0.9 * Config.PAGE_CACHE_MAX_MB * 2**20
+        removed = set()
+        for _, size, d in sorted(entries, key=lambda e: e[0]):
+            if total <= budget:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            removed.add(d.name.encode())
+            total -= size
+        with self.lock:
+            self._refresh()
+            keep = self.index[~np.isin(self.index["key"], list(removed))] if removed else self.index
+            tmp = self.index_file.with_name(f"index.{uuid.uuid4().hex[:8]}.tmp")
+            tmp.write_bytes(keep.tobytes())
+            os.replace(tmp, self.index_file)
+            self.index, self._bytes = keep, total
+            self._read_bytes, self._inode = keep.nbytes, self.index_file.stat().st_ino
+            self.evicted += len(removed)
+        self.logger.info("Page cache: evicted %d entries (%.0f MB left)", len(removed), total / 2**20)
+
+    def stats(self):
+        with self.lock:
+            self._refresh()   # الفهرس يُقرأ عند أول بحث فقط؛ بدون هذا يظهر 0 مدخل حتى ذلك الحين
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                    "saved_s": round(self.saved_s, 2), "entries": len(self.index), "evicted": self.evicted}
+
+def _dir_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+def _scale_blocks(blocks, sx, sy):
+    """مدخل بدقة مختلفة لنفس الصفحة: الصناديق بأبعاد الطلب"""
+    return [dict(b, bbox=[[int(round(x * sx)), int(round(y * sy))] for x, y in b["bbox"]]) for b in blocks]
+
+def _resize(final, W, H):
+    interp = cv2.INTER_AREA if W < final.shape[1] else cv2.INTER_LINEAR
+    return cv2.resize(final, (W, H), interpolation=interp)
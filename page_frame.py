@@ -0,0 +1,40 @@
+# core/page_frame.py
+import cv2
+
+class PageFrame:
+    """الصفحة عبر كل المراحل: مخزن BGR واحد هو الصيغة المعتمدة، والتحويلات المشتقة منه تُحسب مرة واحدة.
+
+    - gray: يتشاركه الكشف وOCR بدل أن يحوّل كل منهما الصفحة
+    - crop: قصاصة view من المخزن بلا نسخ
+    - writable: المخزن للكتابة في مكانه (inpainting ثم رسم النص)؛ يُنسخ مرة واحدة فقط إن لم يكن ملكاً للـ pipeline
+    التحويل إلى RGB يحدث عند الحواف فقط: مدخل LaMa، والعرض في الواجهة."""
+    __slots__ = ("bgr", "owned", "_gray")
+
+    def __init__(self, bgr, owned=False):
+        self.bgr = bgr
+        self.owned = owned   # False: المخزن لمستدعٍ قد يعيد استخدامه (أو view من صورة أكبر)
+        self._gray = None
+
+    @classmethod
+    def of(cls, image):
+        return image if isinstance(image, cls) else cls(image)
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = self.bgr if self.bgr.ndim == 2 else cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def crop(self, x1, y1, x2, y2):
+        return self.bgr[y1:y2, x1:x2]
+
+    def writable(self):
+        if not self.owned:
+            self.bgr = self.bgr.copy()
+            self.owned = True
+        self._gray = None   # المخزن سيتغير
+        return self.bgr
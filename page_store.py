@@ -0,0 +1,171 @@
+# core/page_store.py
+import os, json, shutil, hashlib, logging, tempfile, threading
+from pathlib import Path
+import cv2
+from .archive import PageBytes
+from .config import Config
+
+STORE_VERSION = 1
+
+class PageStore:
+    """النتائج الوسيطة لكل صفحة على القرص، بمفتاح hash لمحتوى الصورة:
+    page_store/<key>/page.json (الصناديق، نص OCR، الترجمات، بصمات المراحل) + cleaned.png (الخلفية بعد inpainting).
+
+    كل عنصر في blocks: {"bbox", "type", "extracted_text"?, "translated_text"?, "text_edited"?, "translation_edited"?}
+    غياب الحقل يعني أن المرحلة المنتجة له يجب أن تُعاد لهذا الصندوق فقط."""
+
+    def __init__(self, root=None, max_mb=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.root = Path(root or Config.PAGE_STORE_DIR)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.max_bytes = (max_mb or Config.PAGE_STORE_MAX_MB) * 2**20
+        self._bytes = None   # تقدير حجم المجلد؛ يُحسب فعلياً عند أول كتابة
+        self.lock = threading.Lock()        # يحمي _bytes فقط
+        self._edit_locks = {}               # قفل لكل صفحة: load/تعديل/save دون تداخل
+
+    def key(self, image_path):
+        h = hashlib.sha256()
+        if isinstance(image_path, PageBytes):
+            h.update(image_path.data)
+            return h.hexdigest()[:32]
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()[:32]
+
+    def _dir(self, key):
+        return self.root / key
+
+    def exists(self, key):
+        return (self._dir(key) / "page.json").exists()
+
+    def load(self, key):
+        try:
+            page = json.loads((self._dir(key) / "page.json").read_text(encoding="utf-8"))
+            os.utime(self._dir(key))   # LRU
+            if page.get("version") == STORE_VERSION:
+                return page
+        except (OSError, ValueError):
+            pass
+        return {"version": STORE_VERSION, "sigs": {}, "blocks": [], "boxes_edited": False}
+
+    def _replace(self, key, name, write):
+        """write(مسار مؤقت) ثم os.replace إلى name؛ الاسم المؤقت فريد فلا تتصادم كتابتان لنفس الصفحة"""
+        d = self._dir(key); d.mkdir(exist_ok=True)
+        stem, ext = os.path.splitext(name)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=stem + ".", suffix=".tmp" + ext)
+        os.close(fd)
+        try:
+            write(tmp)
+            try:
+                old = os.path.getsize(d / name)
+            except OSError:
+                old = 0
+            os.replace(tmp, d / name)
+        except BaseException:
+            try: os.unlink(tmp)
+            except OSError: pass
+            raise
+        self._account(key, os.path.getsize(d / name) - old)
+
+    def save(self, key, page):
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(page, f, ensure_ascii=False)
+        self._replace(key, "page.json", write)
+
+    def load_cleaned(self, key):
+        path = self._dir(key) / "cleaned.png"
+        return cv2.imread(str(path)) if path.exists() else None
+
+    def save_cleaned(self, key, image):
+        def write(tmp):
+            if not cv2.imwrite(tmp, image):
+                raise OSError(f"Could not write {tmp}")
+        self._replace(key, "cleaned.png", write)
+
+    def remove(self, key):
+        shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def _account(self, key, delta):
+        """delta: فرق الحجم بعد الكتابة (الحجم الجديد ناقص القديم)"""
+        with self.lock:
+            if self._bytes is None:
+                self._bytes = _dir_bytes(self.root)
+            else:
+                self._bytes += delta
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict(keep=key)
+
+    def _evict(self, keep):
+        """حذف الصفحات الأقدم استخداماً (مع تعديلاتها) حتى 90% من max_bytes"""
+        entries = []
+        for d in self.root.iterdir():
+            if d.is_dir() and d.name != keep:
+                try:
+                    entries.append((d.stat().st_mtime, _dir_bytes(d), d))
+                except OSError:
+                    continue
+        total = _dir_bytes(self.root)
+        removed = 0
+        for _, size, d in sorted(entries):
+            if total <= 0.9 * self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size; removed += 1
+        with self.lock:
+            self._bytes = total
+        self.logger.info("Page store: evicted %d pages (%.0f MB left)", removed, total / 2**20)
+
+    # ---- تعديلات المحرر: كل تعديل يُسقط فقط ما يعتمد عليه ----
+    def _edit(self, key, fn):
+        with self.lock:
+            edit_lock = self._edit_locks.setdefault(key, threading.Lock())
+        with edit_lock:
+            page = self.load(key)
+            fn(page)
+            self.save(key, page)
+
+    def set_translation(self, key, index, text):
+        """تعديل ترجمة: يكفي إعادة الرسم"""
+        def fn(page):
+            page["blocks"][index].update(translated_text=text, translation_edited=True)
+        self._edit(key, fn)
+
+    def set_source_text(self, key, index, text):
+        """تصحيح نص OCR: تُعاد ترجمة هذا الصندوق فقط"""
+        def fn(page):
+            b = page["blocks"][index]
+            b.update(extracted_text=text, text_edited=True)
+            if not b.get("translation_edited"):
+                b.pop("translated_text", None)
+        self._edit(key, fn)
+
+    def set_type(self, key, index, block_type):
+        def fn(page):
+            page["blocks"][index]["type"] = block_type
+        self._edit(key, fn)
+
+    def set_bbox(self, key, index, bbox):
+        """تحريك صندوق: OCR والترجمة لهذا الصندوق، والـ inpainting للصفحة"""
+        def fn(page):
+            b = page["blocks"][index]
+            page["blocks"][index] = {"bbox": bbox, "type": b.get("type", "speech")}
+            page["boxes_edited"] = True
+        self._edit(key, fn)
+
+    def add_block(self, key, bbox, block_type="speech"):
+        def fn(page):
+            page["blocks"].append({"bbox": bbox, "type": block_type})
+            page["boxes_edited"] = True
+        self._edit(key, fn)
+
+    def remove_block(self, key, index):
+        def fn(page):
+            del page["blocks"][index]
+            page["boxes_edited"] = True
+        self._edit(key, fn)
+
+def _dir_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
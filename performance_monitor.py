@@ -1,35 +1,179 @@
 # core/performance_monitor.py
+import os
+import sys
+import json
 import time
 import logging
+import itertools
+import threading
 import functools
-from typing import Callable, Any
+from collections import deque, defaultdict
+from pathlib import Path
+from typing import Callable, Any, Dict, List, Optional
+from .config import Config
+
+class _Span:
+    """مقطع زمني واحد؛ يُستخدم كـ context manager عبر Tracer.span"""
+    __slots__ = ("tracer", "name", "attrs", "id", "parent", "start")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1].id if stack else None
+        self.id = next(self.tracer._ids)
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer._stack().pop()
+        self.tracer._finish(self, end - self.start)
+        return False
+
+class _NullSpan:
+    # مقطع واحد مشترك عند تعطيل التتبع: كل قراءة لـ attrs تعيد dict جديداً فتضيع الكتابة فيه ولا تتراكم
+    attrs = property(lambda self: {})
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_SPAN = _NullSpan()
+
+class Tracer:
+    """تتبع متداخل للمراحل بساعة monotonic مع مدرجات p50/p95/p99 متجددة.
+    المقاطع المنتهية تُصدَّر كسطور JSON إلى logger "performance" (PERFORMANCE_LOG_FILE)
+    ويمكن تحويلها إلى ملف Chrome trace (chrome://tracing أو Perfetto)."""
+
+    def __init__(self, enabled=True, window=1024, max_pending=10000):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending = deque(maxlen=max_pending)
+        self._hist = defaultdict(lambda: deque(maxlen=window))
+        self.out = logging.getLogger("performance")
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def _finish(self, span, dur_ns):
+        rec = {"name": span.name, "ts_us": span.start // 1000, "dur_us": dur_ns // 1000,
+               "pid": os.getpid(), "tid": threading.get_ident(),
+               "id": span.id, "parent": span.parent}
+        if span.attrs:
+            rec["attrs"] = span.attrs
+        with self._lock:
+            self._pending.append(rec)
+            self._hist[span.name].append(dur_ns)
+
+    def record(self, name, dur_ns, **attrs):
+        """تسجيل مدة قيست خارج span (مثل الطلبات غير المتزامنة التي تتداخل على نفس الخيط)"""
+        if not self.enabled:
+            return
+        rec = {"name": name, "ts_us": (time.perf_counter_ns() - dur_ns) // 1000, "dur_us": dur_ns // 1000,
+               "pid": os.getpid(), "tid": threading.get_ident(), "id": next(self._ids), "parent": None}
+        if attrs:
+            rec["attrs"] = attrs
+        with self._lock:
+            self._pending.append(rec)
+            self._hist[name].append(dur_ns)
+
+    def percentiles(self, names=None) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 (بالميلي ثانية) لآخر `window` قياس لكل مرحلة"""
+        with self._lock:
+            data = {n: sorted(v) for n, v in self._hist.items() if names is None or n in names}
+        return {n: _summarize_ns(v) for n, v in data.items() if v}
+
+    def flush(self) -> List[dict]:
+        """تصدير المقاطع المنتهية كسطور JSON وإعادتها"""
+        with self._lock:
+            recs = list(self._pending)
+            self._pending.clear()
+        for rec in recs:
+            self.out.info(json.dumps(rec, ensure_ascii=False, default=str))
+        return recs
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._hist.clear()
+
+def _summarize_ns(values):
+    def pct(p):
+        return values[min(len(values)-1, int(p*len(values)))] / 1e6
+    return {"count": len(values), "mean_ms": sum(values)/len(values)/1e6,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+def read_trace_records(path=None, since_us=0) -> List[dict]:
+    """قراءة سطور المقاطع من ملف الأداء ونسخه المدوّرة (performance.log.N ... .1 ثم الحالي، من الأقدم)،
+    فلا تضيع مقاطع دفعة دار الملف أثناءها. تتجاهل أي سطر ليس JSON."""
+    path = Path(path or Config.PERFORMANCE_LOG_FILE)
+    files = [path.with_name(f"{path.name}.{i}") for i in range(Config.LOG_BACKUP_COUNT, 0, -1)] + [path]
+    recs = []
+    for p in files:
+        try:
+            f = open(p, encoding="utf-8")
+        except OSError:
+            continue
+        with f:
+            for line in f:
+                if not line.startswith("{"):
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if "dur_us" in rec and rec["ts_us"] >= since_us:
+                    recs.append(rec)
+    return recs
+
+def summarize_records(recs) -> Dict[str, Dict[str, float]]:
+    by_name = defaultdict(list)
+    for r in recs:
+        by_name[r["name"]].append(r["dur_us"] * 1000)
+    return {n: _summarize_ns(sorted(v)) for n, v in by_name.items()}
+
+def write_chrome_trace(recs, path):
+    """كتابة المقاطع بصيغة Chrome Trace Event (أحداث "X" كاملة)"""
+    events = [{"name": r["name"], "ph": "X", "ts": r["ts_us"], "dur": r["dur_us"],
+               "pid": r["pid"], "tid": r["tid"], "args": r.get("attrs", {})} for r in recs]
+    Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    return path
+
+# متتبع عالمي مشترك بين جميع المكونات
+tracer = Tracer(enabled=Config.ENABLE_TRACING)
 
 class PerformanceMonitor:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.tracer = tracer
     
     def measure_time(self, func: Callable) -> Callable:
-        """ديكوراتور لقياس زمن التنفيذ"""
+        """ديكوراتور لقياس زمن التنفيذ (يسجّل مقطعاً في tracer)"""
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            start_time = time.time()
-            try:
-                result = func(*args, **kwargs)
-                return result
-            finally:
-                end_time = time.time()
-                duration = end_time - start_time
-                self.logger.info(
-                    f"{func.__name__} executed in {duration:.2f}s",
-                    extra={"component": "PERFORMANCE"}
-                )
+            with self.tracer.span(func.__qualname__):
+                return func(*args, **kwargs)
         return wrapper
     
     def get_system_stats(self):
         """الحصول على إحصائيات النظام"""
         try:
             import psutil
-            import torch
+            # لا نستورد torch هنا فقط لأجل الإحصائيات؛ نستخدمه إن كان محمّلاً بالفعل
+            torch = sys.modules.get("torch")
             
             stats = {
                 "cpu_percent": psutil.cpu_percent(),
@@ -38,7 +182,8 @@ class PerformanceMonitor:
                 "memory_total_gb": round(psutil.virtual_memory().total / (1024**3), 2),
             }
             
-            if torch.cuda.is_available():
+            # قد يكون torch قيد الاستيراد في خيط التحميل (warm_up) فلا يملك cuda بعد
+            if getattr(torch, "cuda", None) is not None and torch.cuda.is_available():
                 stats.update({
                     "gpu_memory_allocated_mb": round(torch.cuda.memory_allocated() / (1024**2), 2),
                     "gpu_memory_cached_mb": round(torch.cuda.memory_reserved() / (1024**2), 2),
@@ -47,7 +192,7 @@ class PerformanceMonitor:
             return stats
             
         except Exception as e:
-            self.logger.error(f"Failed to get system stats: {e}")
+            self.logger.error("Failed to get system stats: %s", e)
             return {}
 
 # إنشاء instance عالمي
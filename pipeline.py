@@ -1,45 +1,303 @@
 # core/pipeline.py
-import cv2, logging
-from .text_detector import TextDetector
-from .advanced_ocr    import AdvancedOCR
-from .ai_translator   import AITranslator
-from .graphic_reintegration import TextReintegrator
+import cv2, json, time, hashlib, logging, threading, importlib
+from .config import Config
+from .error_handler import MangaError
+from .logger import log_stats
+from .archive import PageBytes
+from .box_ops import BoxTable
+from .page_cache import PageCache
+from .page_frame import PageFrame
+from .page_store import PageStore
+from .performance_monitor import tracer, performance_monitor
+from .strip import image_size, strip_shape
+
+# المراحل تُحمّل عند أول استخدام (أو في الخلفية عبر warm_up) حتى لا تؤخر بدء التطبيق
+STAGES = {
+    "detector":     (".text_detector", "TextDetector"),
+    "ocr":          (".advanced_ocr", "AdvancedOCR"),
+    "translator":   (".ai_translator", "AITranslator"),
+    "inpainter":    (".inpainting_lama", "LamaInpainter"),
+    "reintegrator": (".graphic_reintegration", "TextReintegrator"),
+}
+
+class PageCancelled(Exception):
+    """يرفعه progress لإيقاف معالجة الصفحة بين مرحلتين"""
 
 class MangaTranslationPipeline:
-    def __init__(self):
+    def __init__(self, preload=False, stages=None, store=None, page_cache=None):
+        """stages: كائنات جاهزة تحل محل المراحل الافتراضية (مثل {"ocr": ...})
+        store: PageStore لحفظ النتائج الوسيطة (افتراضياً حسب Config.ENABLE_PAGE_STORE)
+        page_cache: PageCache للصفحات المكررة (افتراضياً حسب Config.ENABLE_PAGE_CACHE)"""
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.detector     = TextDetector()
-        self.ocr          = AdvancedOCR()
-        self.translator   = AITranslator()
-        self.reintegrator = TextReintegrator()
+        self.store = store if store is not None else (PageStore() if Config.ENABLE_PAGE_STORE else None)
+        self.page_cache = page_cache if page_cache is not None else (
+            PageCache() if Config.ENABLE_PAGE_CACHE else None)
+        self._stages = dict(stages or {})
+        self._state  = {name: "ready" if name in self._stages else "pending" for name in STAGES}
+        self._locks  = {name: threading.Lock() for name in STAGES}
+        self._load_s = 0.0   # زمن تحميل المراحل، يُستبعد من زمن الصفحة المسجّل في PageCache
+        if preload:
+            self.warm_up(background=False)
+
+    detector     = property(lambda self: self._stage("detector"))
+    ocr          = property(lambda self: self._stage("ocr"))
+    translator   = property(lambda self: self._stage("translator"))
+    inpainter    = property(lambda self: self._stage("inpainter"))
+    reintegrator = property(lambda self: self._stage("reintegrator"))
+
+    def _stage(self, name):
+        stage = self._stages.get(name)
+        if stage is not None:
+            return stage
+        with self._locks[name]:
+            if name not in self._stages:
+                module, cls = STAGES[name]
+                self._state[name] = "loading"
+                self.logger.info("Loading stage '%s'", name)
+                t0 = time.perf_counter()
+                try:
+                    with tracer.span(f"load_stage.{name}"):
+                        obj = getattr(importlib.import_module(module, __package__), cls)()
+                except Exception as e:
+                    self._state[name] = f"error: {e}"
+                    raise
+                self._stages[name] = obj
+                self._state[name] = "ready"
+                self._load_s += time.perf_counter() - t0
+            return self._stages[name]
+
+    def warm_up(self, stages=None, background=True):
+        """تحميل المراحل مسبقاً؛ في الخلفية افتراضياً"""
+        def run():
+            for name in stages or STAGES:
+                try:
+                    self._stage(name)
+                except Exception:
+                    self.logger.exception("Warm-up of stage '%s' failed", name)
+        if not background:
+            run(); return None
+        t = threading.Thread(target=run, name="pipeline-warmup", daemon=True)
+        t.start()
+        return t
+
+    def readiness(self):
+        """حالة كل مرحلة: pending / loading / ready / error: ..."""
+        return dict(self._state)
 
-    def process(self, image_path):
-        self.logger.info(f"Processing image: {image_path}")
+    def is_ready(self, stages=None):
+        return all(self._state[n] == "ready" for n in (stages or STAGES))
+
+    def get_performance_stats(self):
+        if self.is_ready(["translator"]):
+            stats = self.translator.get_performance_stats()
+        else:
+            s = performance_monitor.get_system_stats()
+            stats = {"device": "-", "cpu_percent": s.get("cpu_percent", 0.0),
+                     "ram_used_gb": s.get("memory_used_gb", 0.0),
+                     "ram_total_gb": s.get("memory_total_gb", 0.0)}
+        stats["stages"] = tracer.percentiles(
+            ["page", "detect", "ocr", "translate", "translate.batch", "inpaint", "render"])
+        if self.is_ready(["detector"]):
+            stats.update({f"detector_{k}": v for k,v in self.detector.stats.items()})
+        if self.page_cache is not None:
+            stats["page_cache"] = self.page_cache.stats()
+        stats["logging"] = log_stats()
+        stats["readiness"] = self.readiness()
+        return stats
+
+    def process(self, image_path, progress=None):
+        """progress(stage, result): يُستدعى بعد كل مرحلة (load, detect, ocr, translate, inpaint, render)؛
+        نتيجة inpaint هي الخلفية النظيفة فيمكن عرضها قبل رسم النص. رفع PageCancelled منه يوقف الصفحة."""
+        self.logger.info("Processing image: %s", image_path)
+        step = progress or (lambda stage, result: None)
+        start, loads = time.perf_counter(), self._load_s
         try:
-            image  = cv2.imread(image_path)
-            bboxes = self.detector.detect(image)
-            results=[]
-            for i,bb in enumerate(bboxes):
-                raw = self.ocr.extract_text(image, bb)
-                if raw.strip():
-                    results.append({
-                        "id": f"{i}-0",
-                        "bbox": bb,
-                        "extracted_text": raw,
-                        "type": "speech"
-                    })
-            texts = [r["extracted_text"] for r in results]
-            trans = self.translator.translate(texts, {"emotion":"neutral"})
-            blocks=[]
-            for r,t in zip(results,trans):
-                blocks.append({
-                    "bbox": r["bbox"],
-                    "translated_text": t,
-                    "type": r["type"]
-                })
-            final = self.reintegrator.restore_panel(image, blocks)
+            with tracer.span("page", path=str(image_path)):
+                key = self.store.key(image_path) if self.store is not None else None
+                image = fp = sig = None
+                # صفحة موجودة في PageStore (وقد تحمل تعديلات المحرر) تُعاد منه لا من ذاكرة الصفحات
+                if self.page_cache is not None and (key is None or not self.store.exists(key)):
+                    image = self.load(image_path); step("load", image)
+                    with tracer.span("page_cache.lookup"):
+                        fp = self.page_cache.fingerprint(image)
+                        sig = self._cache_sig()
+                        hit = self.page_cache.lookup(fp, sig, verify=lambda blocks: self._same_text(image, blocks))
+                    if hit is not None:
+                        step("render", hit[0])
+                        return hit
+                if self.store is not None:
+                    final, blocks = self._process_stored(image_path, step, key, image)
+                else:
+                    if image is None:
+                        image = self.load(image_path);           step("load", image)
+                    bboxes  = self.detect(image);                step("detect", bboxes)
+                    results = self.recognize(image, bboxes);     step("ocr", results)
+                    blocks  = self.translate_results(results);   step("translate", blocks)
+                    cleaned = self.inpaint(image, blocks);       step("inpaint", cleaned)
+                    final   = self.render(PageFrame(cleaned, owned=True), blocks)   # ناتج inpaint ملك للـ pipeline
+                    step("render", final)
+                    blocks  = blocks.to_blocks()
+                if fp is not None:
+                    try:
+                        secs = time.perf_counter() - start - (self._load_s - loads)
+                        self.page_cache.add(fp, final, blocks, sig, secs)
+                    except OSError:
+                        self.logger.exception("Could not add page to the page cache")
             self.logger.info("Image processed successfully")
             return final, blocks
+        except PageCancelled:
+            self.logger.info("Cancelled: %s", image_path)
+            raise
         except Exception:
             self.logger.exception("Pipeline processing failed")
-            raise
\ No newline at end of file
+            raise
+
+    # ---- المعالجة التزايدية عبر PageStore ----
+    def _signatures(self):
+        """بصمة إعدادات كل مرحلة؛ تغيّرها يُسقط النتائج المحفوظة لتلك المرحلة وما بعدها"""
+        ids = {n: type(self._stages[n]).__name__ if n in self._stages else STAGES[n][1] for n in STAGES}
+        c = Config
+        compress = c.COMPRESS_MODELS and f"{c.COMPRESSION_METHOD}:{c.COMPRESSION_RATIO}"
+        return {
+            "detect":    f"{ids['detector']}|{c.DETECTOR_MAX_BOX}|{c.DETECTOR_MIN_BOX}|"
+                         f"{c.DETECTOR_MERGE_GAP}|{c.READING_ORDER_RTL}",
+            "ocr":       ids["ocr"],
+            "translate": f"{ids['translator']}|{c.INFERENCE_BACKEND}|{compress}",
+            "inpaint":   f"{ids['inpainter']}|{c.INFERENCE_BACKEND}|{c.INPAINT_MODE}|"
+                         f"{c.INPAINT_ROI_PADDING}|{c.INPAINT_ROI_MAX_SIDE}",
+        }
+
+    def _cache_sig(self):
+        """بصمة 64 بت لإعدادات كل المراحل (ومنها الرسم)؛ مدخلات PageCache بإعدادات أخرى لا تُستخدم"""
+        render = self._stages.get("reintegrator")
+        render = type(render).__name__ if render is not None else STAGES["reintegrator"][1]
+        sigs = dict(self._signatures(),
+                    render=f"{render}|{Config.LAYOUT_MIN_FONT_SIZE}|{Config.LAYOUT_MAX_FONT_SIZE}")
+        return int.from_bytes(hashlib.sha1(json.dumps(sigs, sort_keys=True).encode()).digest()[:8], "little")
+
+    def _same_text(self, image, blocks):
+        """تحقق PageCache لمدخل بدقة أخرى: نص OCR في صناديق المدخل (بإحداثيات هذه الصفحة) هو نصه المخزن"""
+        norm = lambda t: " ".join(t.split()).lower()
+        with tracer.span("page_cache.verify", boxes=len(blocks)):
+            texts = self.ocr.extract_batch(PageFrame.of(image).gray, BoxTable.of(blocks))
+        return [norm(t) for t in texts] == [norm(b.get("extracted_text", "")) for b in blocks]
+
+    def _process_stored(self, image_path, step, key, image=None):
+        """مثل process لكن يعيد استخدام ما حُفظ للصفحة ولا يشغّل إلا المراحل التي تغيّرت مدخلاتها.
+        بعد تعديل ترجمة أو خط لا يُشغَّل إلا TextReintegrator."""
+        store, sigs = self.store, self._signatures()
+        page = store.load(key)
+        page["source"] = str(image_path)
+        blocks, done, ran = page["blocks"], page["sigs"], []
+        def get_image():
+            nonlocal image
+            if image is None: image = self.load(image_path); step("load", image)
+            return image
+
+        if done.get("detect") != sigs["detect"] and not page["boxes_edited"]:
+            blocks[:] = self.detect(get_image()).to_blocks()
+            done.clear(); done["detect"] = sigs["detect"]; ran.append("detect")
+        step("detect", [b["bbox"] for b in blocks])
+
+        if done.get("ocr") != sigs["ocr"]:
+            for b in blocks:
+                if not b.get("text_edited"): b.pop("extracted_text", None)
+        todo = [i for i,b in enumerate(blocks) if "extracted_text" not in b]
+        if todo:
+            results = self.recognize(get_image(), [blocks[i]["bbox"] for i in todo])
+            texts = dict(zip(results.ids.tolist(), results.texts))
+            for j,i in enumerate(todo):
+                blocks[i]["extracted_text"] = texts.get(j, "")
+                if not blocks[i].get("translation_edited"): blocks[i].pop("translated_text", None)
+            ran.append(f"ocr({len(todo)})")
+        done["ocr"] = sigs["ocr"]
+        step("ocr", blocks)
+
+        if done.get("translate") != sigs["translate"]:
+            for b in blocks:
+                if not b.get("translation_edited"): b.pop("translated_text", None)
+        todo = [i for i,b in enumerate(blocks) if b["extracted_text"].strip() and "translated_text" not in b]
+        if todo:
+            translated = self.translate_results([{"bbox": blocks[i]["bbox"], "type": blocks[i]["type"],
+                                                  "extracted_text": blocks[i]["extracted_text"]} for i in todo])
+            for i,t in zip(todo, translated.translations):
+                blocks[i]["translated_text"] = t
+            ran.append(f"translate({len(todo)})")
+        done["translate"] = sigs["translate"]
+        step("translate", blocks)
+
+        text_blocks = [{"bbox": b["bbox"], "extracted_text": b["extracted_text"], "translated_text": b["translated_text"],
+                        "type": b["type"], "index": i} for i,b in enumerate(blocks) if b["extracted_text"].strip()]
+        boxes = json.dumps([b["bbox"] for b in text_blocks]).encode()
+        inpaint_sig = f"{sigs['inpaint']}|{hashlib.sha1(boxes).hexdigest()}"
+        cleaned = store.load_cleaned(key) if done.get("inpaint") == inpaint_sig else None
+        if cleaned is None:
+            cleaned = self.inpaint(get_image(), text_blocks)
+            store.save_cleaned(key, cleaned)
+            done["inpaint"] = inpaint_sig; ran.append("inpaint")
+        store.save(key, page)
+        step("inpaint", cleaned)
+
+        self.logger.info("Page %s: ran %s", key[:12], ", ".join(ran) or "render only")
+        final = self.render(PageFrame(cleaned, owned=True), text_blocks)   # ناتج inpaint أو قراءة جديدة من القرص
+        step("render", final)
+        return final, text_blocks
+
+    # ---- المراحل المنفصلة (تُستخدم أيضاً في core.streaming) ----
+    # المراحل تقبل PageFrame أو ndarray بصيغة BGR؛ الصفحات المحمّلة هنا يملكها الـ pipeline فتُعدَّل في مكانها
+    def load(self, image_path):
+        """image_path: مسار ملف أو PageBytes (صفحة من أرشيف CBZ تُفك من الذاكرة). يعيد PageFrame"""
+        in_memory = isinstance(image_path, PageBytes)
+        # الحد على الأبعاد بعد فك الترميز لا على حجم الملف؛ الشرائط الطويلة تمر عبر core.strip في كل مداخل التطبيق
+        w, h = image_size(image_path)
+        if strip_shape(w, h):
+            raise MangaError(f"{image_path} is a long strip; process it with core.strip.StripProcessor", "PIPELINE")
+        if w * h > Config.MAX_IMAGE_PIXELS:
+            raise MangaError(f"{image_path} is {w}x{h} ({w*h/1e6:.0f} MP, limit "
+                             f"{Config.MAX_IMAGE_PIXELS/1e6:.0f} MP)", "PIPELINE")
+        with tracer.span("load"):
+            image = image_path.decode() if in_memory else cv2.imread(str(image_path))
+        if image is None:
+            raise OSError(f"Could not read image: {image_path}")
+        return PageFrame(image, owned=True)
+
+    # الصناديق تمر بين المراحل كـ BoxTable؛ recognize/translate_results/inpaint/render تقبل أيضاً قوائم blocks
+    def detect(self, image):
+        detector = self.detector
+        with tracer.span("detect") as sp:
+            bboxes = detector.detect(PageFrame.of(image).gray)
+            sp.attrs["boxes"] = len(bboxes)
+        st = self.detector.last_stats
+        self.logger.info("Detection: %d fragments -> %d boxes", st["boxes_raw"], st["boxes"])
+        return bboxes
+
+    def recognize(self, image, bboxes):
+        """يعيد صفوف الصناديق التي فيها نص فقط، مع عمود texts (ids تبقى أرقام الصناديق المُدخلة)"""
+        boxes = BoxTable.of(bboxes)
+        ocr = self.ocr
+        with tracer.span("ocr", boxes=len(boxes)):
+            texts = ocr.extract_batch(PageFrame.of(image).gray, boxes)
+        keep = [i for i,raw in enumerate(texts) if raw.strip()]
+        results = boxes.take(keep)
+        results.texts = [texts[i] for i in keep]
+        return results
+
+    def translate_results(self, results, context=None):
+        results = BoxTable.of(results)
+        texts = results.texts or []
+        translator = self.translator if texts else None
+        with tracer.span("translate", texts=len(texts)):
+            trans = translator.translate(texts, context or {"emotion":"neutral"}) if texts else []
+        return results.replace(translations=list(trans))
+
+    def inpaint(self, image, blocks):
+        inpainter = self.inpainter
+        with tracer.span("inpaint", boxes=len(blocks)):
+            return inpainter.inpaint(PageFrame.of(image).writable(), BoxTable.of(blocks))
+
+    def render(self, cleaned, blocks):
+        """cleaned: PageFrame أو ndarray؛ يُرسم النص في مكانه فقط إن كان PageFrame(owned=True)، وإلا يُنسخ مرة واحدة.
+        ناتج inpaint ملك للمستدعي الذي حصل عليه، فيمرره كـ PageFrame(cleaned, owned=True)"""
+        reintegrator = self.reintegrator
+        with tracer.span("render", blocks=len(blocks)):
+            return reintegrator.render(PageFrame.of(cleaned), BoxTable.of(blocks))
@@ -0,0 +1,326 @@
+# core/server.py
+"""خدمة HTTP محلية (asyncio، بدون مكتبات إضافية) فوق MangaTranslationPipeline:
+
+    POST /v1/translate  {"texts": [...], "context": {"emotion": ...}}  -> {"translations": [...]}
+    POST /v1/page       بايتات الصورة                                  -> PNG مترجمة
+    POST /v1/page       {"path": ..., "output": ...} (JSON)            -> {"output": ..., "blocks": [...]}
+                        (path نسبةً إلى SERVER_INPUT_DIR وoutput إلى SERVER_OUTPUT_DIR، ولا يخرجان منهما)
+    GET  /health        حالة تحميل المراحل
+    GET  /metrics       عمق الطوابير، أحجام الدفعات، زمن الطلبات p50/p95/p99، كلفة التسجيل
+
+طلبات الترجمة التي تصل خلال SERVER_BATCH_WINDOW_MS (ومنها نصوص الصفحات) تُجمع في استدعاء واحد
+لـ translate_pages على خيط واحد، فالنموذج يبقى محمّلاً ويرى دفعات أكبر بدل طلبات متفرقة."""
+import io, json, time, asyncio, logging
+import cv2, numpy as np
+from collections import Counter
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .archive import PageBytes
+from .config import Config
+from .error_handler import MangaError
+from .logger import log_stats
+from .page_frame import PageFrame
+from .performance_monitor import tracer
+from .strip import StripProcessor, is_strip
+
+class Overloaded(Exception):
+    pass
+
+class MicroBatcher:
+    """يجمع العناصر المرسلة من coroutines مختلفة ويشغّل fn(items) مرة واحدة لكل نافذة زمنية.
+    الدفعة تُرسل عند انتهاء النافذة أو عند بلوغ max_size (حسب size(item))."""
+
+    def __init__(self, fn, executor, window_ms, max_size, size=lambda item: 1):
+        self.fn, self.executor = fn, executor
+        self.window, self.max_size, self.size = window_ms / 1000, max_size, size
+        self.items, self.pending = [], 0
+        self.batches, self.batched_items = 0, 0
+        self.batch_sizes = Counter()
+        self._wake, self._full = asyncio.Event(), asyncio.Event()
+
+    async def submit(self, item):
+        fut = asyncio.get_running_loop().create_future()
+        self.items.append((item, fut))
+        self.pending += self.size(item)
+        self._wake.set()
+        if self.pending >= self.max_size:
+            self._full.set()
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            if self.pending < self.max_size and self.window > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            batch, n = [], 0
+            while self.items and (not batch or n + self.size(self.items[0][0]) <= self.max_size):
+                item, fut = self.items.pop(0)
+                n += self.size(item)
+                if not fut.cancelled():
+                    batch.append((item, fut))
+            self.pending -= n
+            if not self.items:
+                self._wake.clear()
+            if self.pending < self.max_size:
+                self._full.clear()
+            if not batch:
+                continue
+            self.batches += 1; self.batched_items += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, [i for i, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done(): fut.set_exception(e)
+                continue
+            for (_, fut), res in zip(batch, results):
+                if not fut.done(): fut.set_result(res)
+
+    def stats(self):
+        return {"pending_requests": len(self.items), "pending_items": self.pending,
+                "batches": self.batches,
+                "mean_batch": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items()))}
+
+class TranslationServer:
+    def __init__(self, pipeline=None, host=None, port=None):
+        from .pipeline import MangaTranslationPipeline
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pipeline = pipeline or MangaTranslationPipeline()
+        self.host = host or Config.SERVER_HOST
+        self.port = Config.SERVER_PORT if port is None else port
+        self.page_slots = asyncio.Semaphore(Config.SERVER_MAX_CONCURRENT_PAGES)
+        self.pages_waiting = self.pages_active = 0
+        self.counts = Counter()
+        # الترجمة على خيط واحد (نموذج واحد مقيم)؛ مراحل الصور على خيوط بعدد الصفحات المتزامنة
+        self.gen_pool = ThreadPoolExecutor(1, thread_name_prefix="server-translate")
+        self.cpu_pool = ThreadPoolExecutor(Config.SERVER_MAX_CONCURRENT_PAGES, thread_name_prefix="server-page")
+        self.batcher = MicroBatcher(lambda pages: self.pipeline.translator.translate_pages(pages),
+                                    self.gen_pool, Config.SERVER_BATCH_WINDOW_MS,
+                                    Config.SERVER_BATCH_MAX_TEXTS, size=lambda page: max(1, len(page[0])))
+        self.server = None
+
+    # ---- المعالجة ----
+    def _admit(self, waiting, limit):
+        """حدّان منفصلان بوحدتين مختلفتين: صفحات تنتظر مكاناً، ونصوص تنتظر في المجمّع.
+        waiting: العدد بعد قبول الطلب"""
+        if waiting > limit:
+            self.counts["rejected"] += 1
+            raise Overloaded()
+
+    async def translate(self, texts, context=None):
+        self._admit(self.batcher.pending + len(texts), Config.SERVER_MAX_PENDING_TEXTS)
+        start = time.perf_counter_ns()
+        result = await self.batcher.submit((list(texts), context or {"emotion": "neutral"}))
+        tracer.record("server.translate", time.perf_counter_ns() - start, texts=len(texts))
+        return result
+
+    @asynccontextmanager
+    async def _page_slot(self):
+        # نصوص الصفحات المقبولة تمر عبر المجمّع دون حد النصوص: الصفحة تُرفض هنا أو تكتمل
+        self._admit(self.pages_waiting + 1, Config.SERVER_MAX_QUEUE)
+        self.pages_waiting += 1
+        try:
+            await self.page_slots.acquire()
+        finally:
+            self.pages_waiting -= 1
+        self.pages_active += 1
+        try:
+            yield
+        finally:
+            self.pages_active -= 1
+            self.page_slots.release()
+
+    async def translate_page(self, image):
+        """نفس مراحل MangaTranslationPipeline.process، مع تمرير النصوص عبر المجمّع المشترك"""
+        loop, p = asyncio.get_running_loop(), self.pipeline
+        run = lambda fn, *a: loop.run_in_executor(self.cpu_pool, fn, *a)
+        start = time.perf_counter_ns()
+        async with self._page_slot():
+            boxes = await run(p.detect, image)
+            results = await run(p.recognize, image, boxes)
+            trans = await self.batcher.submit((results.texts, {"emotion": "neutral"})) if len(results) else []
+            blocks = results.replace(translations=trans)
+            cleaned = await run(p.inpaint, image, blocks)
+            final = await run(p.render, PageFrame(cleaned, owned=True), blocks)
+        tracer.record("server.page", time.perf_counter_ns() - start, boxes=len(blocks))
+        return final, blocks.to_blocks()
+
+    async def translate_strip(self, page, output):
+        """شريط طويل (core.strip) في مكان صفحة واحدة على خيط الصفحات؛ نصوص كل شريحة تمر عبر المجمّع"""
+        loop = asyncio.get_running_loop()
+        def translate(results):
+            if not len(results):
+                return results.replace(translations=[])
+            batch = self.batcher.submit((results.texts, {"emotion": "neutral"}))
+            return results.replace(translations=asyncio.run_coroutine_threadsafe(batch, loop).result())
+        start = time.perf_counter_ns()
+        async with self._page_slot():
+            _, blocks = await loop.run_in_executor(
+                self.cpu_pool, StripProcessor(self.pipeline, translate).process, page, output)
+        tracer.record("server.page", time.perf_counter_ns() - start, boxes=len(blocks))
+        return blocks
+
+    def metrics(self):
+        return {"queue": {"translate": self.batcher.stats(), "pages_waiting": self.pages_waiting,
+                          "pages_active": self.pages_active,
+                          "max_concurrent_pages": Config.SERVER_MAX_CONCURRENT_PAGES,
+                          "max_queue": Config.SERVER_MAX_QUEUE,
+                          "max_pending_texts": Config.SERVER_MAX_PENDING_TEXTS},
+                "requests": dict(self.counts),
+                "latency": tracer.percentiles(["server.translate", "server.page", "translate.batch",
+                                               "detect", "ocr", "inpaint", "render"]),
+                "logging": log_stats(),
+                "readiness": self.pipeline.readiness()}
+
+    # ---- HTTP ----
+    async def _route(self, method, path, headers, body):
+        loop = asyncio.get_running_loop()
+        if method == "GET" and path == "/health":
+            return 200, {"ready": self.pipeline.is_ready(), "stages": self.pipeline.readiness()}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method == "POST" and path == "/v1/translate":
+            req = json.loads(body or b"{}")
+            texts = req.get("texts", [req["text"]] if "text" in req else [])
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("'texts' must be a list of strings")
+            if len(texts) > Config.SERVER_MAX_PENDING_TEXTS:
+                raise ValueError(f"at most {Config.SERVER_MAX_PENDING_TEXTS} texts per request")
+            return 200, {"translations": await self.translate(texts, req.get("context")) if texts else []}
+        if method == "POST" and path == "/v1/page":
+            as_json = headers.get("content-type", "").startswith("application/json")
+            req = json.loads(body) if as_json else None
+            page = _inside(Config.SERVER_INPUT_DIR, req["path"], "path") if as_json \
+                else PageBytes("upload", "page", body)
+            if as_json and not page.is_file():
+                raise ValueError(f"'path' not found: {req['path']}")
+            try:
+                strip = is_strip(page)   # الأبعاد من الترويسة فقط
+            except OSError:
+                raise ValueError("'path' is not a decodable image" if as_json
+                                 else "request body is not a decodable image")
+            if as_json:
+                out = _inside(Config.SERVER_OUTPUT_DIR, req.get("output") or
+                              (page.stem + ".png" if strip else page.name), "output")
+                out.parent.mkdir(exist_ok=True, parents=True)
+            if strip:
+                if as_json:
+                    return 200, {"output": str(out), "blocks": await self.translate_strip(page, out)}
+                out = io.BytesIO()
+                await self.translate_strip(page, out)
+                return 200, out.getvalue()
+            if as_json:
+                image = await loop.run_in_executor(self.cpu_pool, self.pipeline.load, str(page))
+            else:
+                image = await loop.run_in_executor(
+                    self.cpu_pool, cv2.imdecode, np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError("request body is not a decodable image")
+                image = PageFrame(image, owned=True)
+            final, blocks = await self.translate_page(image)
+            if as_json:
+                ok = await loop.run_in_executor(self.cpu_pool, cv2.imwrite, str(out), final)
+                if not ok:
+                    raise OSError(f"Could not write {out}")
+                return 200, {"output": str(out), "blocks": blocks}
+            ok, png = await loop.run_in_executor(self.cpu_pool, cv2.imencode, ".png", final)
+            return 200, png.tobytes()
+        return 404, {"error": f"{method} {path} not found"}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length", 0))
+                if length > Config.SERVER_MAX_BODY_MB * 1024 * 1024:
+                    await self._respond(writer, 413, {"error": "request body too large"}, keep=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self.counts["total"] += 1
+                try:
+                    status, payload = await self._route(method, target.split("?")[0], headers, body)
+                except Overloaded:
+                    status, payload = 503, {"error": "server overloaded, retry later"}
+                except (ValueError, KeyError, MangaError) as e:
+                    self.counts["errors"] += 1
+                    status, payload = 400, {"error": f"{type(e).__name__}: {e}"}
+                except Exception as e:
+                    self.counts["errors"] += 1
+                    self.logger.exception("%s %s failed", method, target)
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep)
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep):
+        if isinstance(payload, bytes):
+            ctype = "image/png"
+        else:
+            ctype, payload = "application/json; charset=utf-8", json.dumps(payload, ensure_ascii=False).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error", 503: "Service Unavailable"}[status]
+        head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep else 'close'}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode() + b"\r\n" + payload)
+        await writer.drain()
+
+    async def start(self):
+        """تحميل النماذج في الخلفية وبدء الاستماع؛ يعيد (host, port) الفعليين"""
+        self.pipeline.warm_up()
+        self._batcher_task = asyncio.create_task(self.batcher.run())
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.host, self.port = self.server.sockets[0].getsockname()[:2]
+        self.logger.info("Listening on http://%s:%d", self.host, self.port)
+        return self.host, self.port
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self._batcher_task.cancel()
+        self.gen_pool.shutdown(wait=False); self.cpu_pool.shutdown(wait=False)
+        tracer.flush()
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+def _inside(root, path, field):
+    """مسار من الطلب نسبةً إلى root (أو مطلق داخله)؛ ما يخرج منه (.. أو روابط رمزية) يُرفض بـ 400"""
+    if not isinstance(path, str) or not path:
+        raise ValueError(f"'{field}' must be a non-empty string")
+    root = Path(root).resolve()
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root) or resolved == root:
+        raise ValueError(f"'{field}' must be inside {root}")
+    return resolved
+
+def run_server(port=None):
+    server = TranslationServer(port=port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
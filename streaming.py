@@ -0,0 +1,86 @@
+# core/streaming.py
+import queue, threading, logging
+from .config import Config
+from .page_frame import PageFrame
+from .strip import is_strip
+
+_DONE = object()
+
+class PageJob:
+    def __init__(self, index, path):
+        self.index  = index
+        self.path   = path
+        self.image  = None
+        self.bboxes = None
+        self.results = None
+        self.blocks = None
+        self.cleaned = None
+        self.final  = None
+        self.error  = None
+        self.strip  = False   # شريط طويل: لا يمر بالمراحل، يعالجه المستهلك عبر core.strip
+
+class StreamingPipeline:
+    """تنفيذ مراحل الـ pipeline بالتوازي: كل مرحلة في خيط مستقل مع طوابير محدودة"""
+
+    def __init__(self, pipeline, queue_size=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pipeline = pipeline
+        self.queue_size = queue_size or Config.STREAM_QUEUE_SIZE
+        p = pipeline
+        self.stages = [
+            ("load",      lambda j: setattr(j, "image", p.load(j.path))),
+            ("detect",    lambda j: setattr(j, "bboxes", p.detect(j.image))),
+            ("ocr",       lambda j: setattr(j, "results", p.recognize(j.image, j.bboxes))),
+            ("translate", lambda j: setattr(j, "blocks", p.translate_results(j.results))),
+            ("inpaint",   lambda j: setattr(j, "cleaned", p.inpaint(j.image, j.blocks))),
+            ("render",    self._render),
+        ]
+
+    def _render(self, job):
+        job.final = self.pipeline.render(PageFrame(job.cleaned, owned=True), job.blocks)
+        # تحرير الصور الوسيطة مبكراً لإبقاء الذاكرة محدودة
+        job.image = job.cleaned = job.results = None
+
+    def _stage_loop(self, name, fn, q_in, q_out):
+        while True:
+            job = q_in.get()
+            if job is _DONE:
+                q_out.put(_DONE)
+                return
+            if job.error is None and not job.strip:
+                try:
+                    fn(job)
+                except Exception as e:
+                    self.logger.exception("Stage '%s' failed for %s", name, job.path)
+                    job.error = e
+                    job.image = job.cleaned = None
+            q_out.put(job)
+
+    def _feed(self, paths, q):
+        for i, path in enumerate(paths):
+            job = PageJob(i, path)
+            try:
+                job.strip = is_strip(path)
+            except Exception as e:
+                job.error = e
+            q.put(job)
+        q.put(_DONE)
+
+    def run(self, paths):
+        """يعيد PageJob لكل صفحة بترتيب الإدخال فور انتهائها؛ الشرائط الطويلة (job.strip) تُعاد دون معالجة"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages)+1)]
+        threads = [threading.Thread(target=self._feed, args=(paths, queues[0]),
+                                    name="stream-feed", daemon=True)]
+        for i, (name, fn) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._stage_loop,
+                                            args=(name, fn, queues[i], queues[i+1]),
+                                            name=f"stream-{name}", daemon=True))
+        for t in threads: t.start()
+        try:
+            while True:
+                job = queues[-1].get()
+                if job is _DONE:
+                    break
+                yield job
+        finally:
+            for t in threads: t.join(timeout=0.1)
\ No newline at end of file
@@ -0,0 +1,230 @@
+# core/strip.py
+import io, os, zlib, struct, logging
+from pathlib import Path
+import cv2, numpy as np
+from PIL import Image
+from .archive import PageBytes
+from .config import Config
+from .box_ops import BoxTable
+from .page_frame import PageFrame
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def _chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+class PNGStreamWriter:
+    """كتابة PNG صفاً بصف: لا تحتاج إلى الصورة الكاملة في الذاكرة. out مسار أو ملف مفتوح (BytesIO)"""
+
+    def __init__(self, out, width, height):
+        self.own = isinstance(out, (str, os.PathLike))
+        self.f = open(out, "wb") if self.own else out
+        self.width = width
+        self.z = zlib.compressobj(6)
+        self.buf = bytearray()
+        self.f.write(PNG_SIGNATURE)
+        self.f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+
+    def write_rows(self, bgr):
+        rows = np.empty((bgr.shape[0], self.width*3 + 1), np.uint8)
+        rows[:,0] = 0   # فلتر None لكل صف
+        rows[:,1:] = bgr[:,:,::-1].reshape(bgr.shape[0], -1)
+        self.buf += self.z.compress(rows.tobytes())
+        if len(self.buf) >= 1 << 20:
+            self.f.write(_chunk(b"IDAT", bytes(self.buf))); self.buf.clear()
+
+    def close(self):
+        self.buf += self.z.flush()
+        if self.buf: self.f.write(_chunk(b"IDAT", bytes(self.buf)))
+        self.f.write(_chunk(b"IEND", b""))
+        if self.own: self.f.close()
+
+class StripReader:
+    """صفوف الصورة من الأعلى إلى الأسفل مع الإبقاء على [top, top+len(buf)) فقط في الذاكرة.
+
+    PNG غير المتداخل بعمق 8 بت يُفك شريطاً شريطاً: zlib تدريجي لصفوف الشريط، ثم تُلف في PNG صغير
+    (الصف السابق غير المرشَّح أولاً بفلتر None، فتُفك فلاتر Up/Avg/Paeth للصف الأول صحيحة) يفكه Pillow.
+    باقي الصيغ (JPEG...) لا تسمح بذلك فتُفك كاملة مرة واحدة."""
+    _CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}   # نوع اللون في IHDR -> بايتات البكسل
+
+    def __init__(self, page):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.f = io.BytesIO(page.data) if isinstance(page, PageBytes) else open(page, "rb")
+        self.top, self.image = 0, None
+        try:
+            header = self._png_header()
+        except Exception:
+            self.f.close(); raise
+        if header is None:
+            self.f.close()
+            self.image = page.decode() if isinstance(page, PageBytes) else cv2.imread(str(page))
+            if self.image is None:
+                raise OSError(f"Could not read image: {page}")
+            self.height, self.width = self.image.shape[:2]
+            self.logger.debug("%s: not a plain 8-bit PNG, decoded whole", page)
+        self.buf = np.empty((0, self.width, 3), np.uint8)
+
+    def _png_header(self):
+        """يقرأ الترويسة حتى أول IDAT؛ None إن لم يكن PNG قابلاً للفك شريطاً شريطاً"""
+        if self.f.read(8) != PNG_SIGNATURE:
+            return None
+        self.extra, self.pending, self.prev = b"", bytearray(), None
+        while True:
+            tag, data = self._chunk()
+            if tag == b"IHDR":
+                self.width, self.height, depth, self.color, _, _, interlace = struct.unpack(">IIBBBBB", data)
+                if depth != 8 or interlace or self.color not in self._CHANNELS:
+                    return None
+            elif tag in (b"PLTE", b"tRNS"):
+                self.extra += _chunk(tag, data)
+            elif tag == b"IDAT":
+                self.z, self.next_idat = zlib.decompressobj(), data
+                self.stride = self.width * self._CHANNELS[self.color]
+                return True
+            elif tag == b"IEND":
+                return None
+
+    def _chunk(self):
+        """(نوع المقطع، بياناته)؛ الملف المقطوع (صفحة أرشيف ناقصة) يرفع OSError لا struct.error"""
+        head = self.f.read(8)
+        n, tag = struct.unpack(">I4s", head) if len(head) == 8 else (0, None)
+        data = self.f.read(n); self.f.read(4)
+        if tag is None or len(data) < n:
+            raise OSError("Truncated PNG data")
+        return tag, data
+
+    def _idat(self):
+        data, self.next_idat = self.next_idat, None
+        while data is None:
+            tag, data = self._chunk()
+            if tag == b"IEND":
+                return b""
+            if tag != b"IDAT":
+                data = None
+        return data
+
+    def _decode(self, n):
+        """الصفوف n التالية بصيغة BGR"""
+        if self.image is not None:
+            return self.image[self.top + len(self.buf):][:n]
+        need = n * (self.stride + 1)
+        while len(self.pending) < need:
+            data = self.z.unconsumed_tail or self._idat()
+            if not data:
+                raise OSError("Truncated PNG data")
+            self.pending += self.z.decompress(data, need - len(self.pending))
+        prev = self.prev or bytes(self.stride)   # ما قبل الصف الأول أصفار (مواصفة PNG)
+        raw = b"\x00" + prev + bytes(self.pending[:need])
+        del self.pending[:need]
+        png = (PNG_SIGNATURE + _chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, n + 1, 8, self.color, 0, 0, 0))
+               + self.extra + _chunk(b"IDAT", zlib.compress(raw, 0)) + _chunk(b"IEND", b""))
+        with Image.open(io.BytesIO(png)) as im:
+            im.load()
+            self.prev = im.crop((0, n, self.width, n + 1)).tobytes()
+            rgb = np.asarray(im.convert("RGB"))
+        return np.ascontiguousarray(rgb[1:, :, ::-1])
+
+    def rows(self, y0, y1):
+        """الصفوف [y0, y1)؛ y0 لا يسبق آخر release"""
+        end = self.top + len(self.buf)
+        if y1 > end:
+            self.buf = np.concatenate([self.buf, self._decode(min(y1, self.height) - end)])
+        return self.buf[y0 - self.top:y1 - self.top]
+
+    def release(self, y):
+        """لن تُطلب صفوف قبل y بعد الآن"""
+        if y > self.top:
+            self.buf = self.buf[y - self.top:].copy()
+            self.top = y
+
+    def close(self):
+        self.f.close()
+        self.image = self.buf = None
+
+def image_size(page):
+    """(العرض، الارتفاع) من ترويسة الملف دون فك الترميز؛ page مسار أو PageBytes"""
+    with Image.open(io.BytesIO(page.data) if isinstance(page, PageBytes) else page) as im:
+        return im.size
+
+def strip_shape(w, h):
+    return h >= Config.STRIP_MIN_HEIGHT and h >= Config.STRIP_MIN_ASPECT * w
+
+def is_strip(page):
+    """صورة webtoon طويلة؟ (يقرأ الأبعاد فقط دون فك الترميز)"""
+    return strip_shape(*image_size(page))
+
+class StripProcessor:
+    """معالجة شرائط webtoon الطويلة كشرائح أفقية متداخلة مع كتابة النتيجة تدريجياً.
+
+    كل شريحة k لها منطقة أساسية [c0,c1) ونافذة أوسع بمقدار STRIP_OVERLAP من الجهتين.
+    الصندوق ينتمي للشريحة التي يقع مركزه في منطقتها الأساسية، ويُرسم في كل نافذة يتقاطع معها،
+    لذلك تُحلَّل الشريحة k+1 قبل رسم الشريحة k. الصورة تُقرأ بـ StripReader فلا يبقى في الذاكرة
+    إلا ما بين بداية نافذة k ونهاية نافذة k+1.
+
+    translate: بديل لـ pipeline.translate_results (الخدمة تمرر النصوص عبر مجمّعها)"""
+
+    def __init__(self, pipeline, translate=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.pipeline = pipeline
+        self.translate = translate or pipeline.translate_results
+        self.slice_h = Config.STRIP_SLICE_HEIGHT
+        self.overlap = Config.STRIP_OVERLAP
+
+    def process(self, image_path, output, progress=None):
+        """image_path: مسار أو PageBytes؛ output: مسار أو ملف مفتوح يُكتب فيه PNG.
+        progress(name, rows) بعد كتابة كل شريحة مع صفوفها النهائية (يمكنه رفع PageCancelled)"""
+        reader = StripReader(image_path)
+        try:
+            H, W = reader.height, reader.width
+            cores = [(y, min(y+self.slice_h, H)) for y in range(0, H, self.slice_h)]
+            self.logger.info("Strip %s: %dx%d, %d slices", image_path, W, H, len(cores))
+
+            analysed, all_blocks = {}, []   # BoxTable لكل شريحة بإحداثيات الصورة كاملة
+            writer = PNGStreamWriter(output, W, H)
+            try:
+                analysed[0] = self._analyse(reader, cores, 0)
+                for k, (c0, c1) in enumerate(cores):
+                    if k+1 < len(cores):
+                        analysed[k+1] = self._analyse(reader, cores, k+1)
+                    near = BoxTable.concat([analysed[j] for j in (k-1, k, k+1) if j in analysed])
+                    rows = self._render(reader, c0, c1, near)
+                    writer.write_rows(rows)
+                    if progress: progress(f"slice {k+1}/{len(cores)}", rows)
+                    reader.release(self._window(c1, c1, H)[0])
+                    if k-1 in analysed: all_blocks.append(analysed.pop(k-1))
+            finally:
+                writer.close()
+        finally:
+            reader.close()
+        all_blocks += [analysed[k] for k in sorted(analysed)]
+        return output, BoxTable.concat(all_blocks).to_blocks()
+
+    def process_page(self, page, output_dir, progress=None):
+        """كما في core.batch: الملف يُكتب output_dir/<الاسم>.png، وصفحة الأرشيف (PageBytes) تُعاد بايتات PNG.
+        يعيد (الناتج، blocks)"""
+        if isinstance(page, PageBytes):
+            buf = io.BytesIO()
+            _, blocks = self.process(page, buf, progress)
+            return buf.getvalue(), blocks
+        out = Path(output_dir) / (Path(page).stem + ".png")
+        _, blocks = self.process(page, out, progress)
+        return str(out), blocks
+
+    def _window(self, c0, c1, H):
+        return max(0, c0-self.overlap), min(H, c1+self.overlap)
+
+    def _analyse(self, reader, cores, k):
+        c0, c1 = cores[k]
+        w0, w1 = self._window(c0, c1, reader.height)
+        view = PageFrame(reader.rows(w0, w1))   # الكشف وOCR يتشاركان نفس التحويل الرمادي
+        found = self.pipeline.detect(view)
+        cy = w0 + (found.rects[:,1] + found.rects[:,3]) // 2
+        results = self.pipeline.recognize(view, found.take((c0 <= cy) & (cy < c1)))
+        return self.translate(results).shifted(w0)
+
+    def _render(self, reader, c0, c1, blocks):
+        w0, w1 = self._window(c0, c1, reader.height)
+        local = blocks.take((blocks.rects[:,3] > w0) & (blocks.rects[:,1] < w1)).shifted(-w0)
+        cleaned = self.pipeline.inpaint(reader.rows(w0, w1), local.clipped((w1-w0, reader.width)))
+        final = self.pipeline.render(PageFrame(cleaned, owned=True), local)
+        return final[c0-w0:c1-w0]
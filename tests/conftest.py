@@ -0,0 +1,66 @@
+# core/tests/conftest.py
+"""تشغيل الاختبارات من داخل مجلد الحزمة: يُسجَّل المجلد الأب باسم core
+حتى تعمل الاستيرادات النسبية (from .config import Config) كما في التطبيق."""
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+if "core" not in sys.modules:
+    core = types.ModuleType("core")
+    core.__path__ = [str(ROOT)]
+    sys.modules["core"] = core
+
+import cv2
+import numpy as np
+import pytest
+
+class StubOCR:
+    def extract_batch(self, image, bboxes):
+        return [f"TEXT {i}" for i in range(len(bboxes))]
+
+class StubTranslator:
+    def translate(self, texts, context=None):
+        return self.translate_pages([(texts, context)])[0]
+
+    def translate_pages(self, pages):
+        return [["ترجمة " + t.lower() for t in texts] for texts, _ in pages]
+
+class StubInpainter:
+    def inpaint(self, image, bboxes):
+        from core.box_ops import BoxTable
+        for x1, y1, x2, y2 in BoxTable.of(bboxes).rects.tolist():
+            image[max(y1, 0):y2 + 1, max(x1, 0):x2 + 1] = 255
+        return image
+
+def make_page(w=400, h=600, bubbles=3):
+    """صفحة اصطناعية: فقاعات بيضاء فيها نص أسود فوق خلفية رمادية"""
+    img = np.full((h, w, 3), 180, np.uint8)
+    for i in range(bubbles):
+        cx, cy = w // 2, (i + 1) * h // (bubbles + 1)
+        cv2.ellipse(img, (cx, cy), (110, 40), 0, 0, 360, (255, 255, 255), -1)
+        cv2.putText(img, f"HELLO {i}", (cx - 70, cy + 8), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    return img
+
+def tiny_marian():
+    """MarianMT صغير بأوزان عشوائية (بدون تحميل من الشبكة)"""
+    import torch, transformers
+    config = transformers.MarianConfig(vocab_size=64, d_model=16, encoder_layers=1, decoder_layers=1,
+                                       encoder_attention_heads=2, decoder_attention_heads=2,
+                                       encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=32,
+                                       pad_token_id=0, eos_token_id=1, decoder_start_token_id=0)
+    torch.manual_seed(0)
+    return transformers.MarianMTModel(config).eval()
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """pipeline بمراحل بديلة خفيفة (الكاشف والرسم الحقيقيان، بالخط الافتراضي إن غاب Amiri) دون مخزن أو cache"""
+    from core.config import Config
+    from core.graphic_reintegration import TextReintegrator
+    from core.pipeline import MangaTranslationPipeline
+    monkeypatch.setattr(Config, "ENABLE_PAGE_STORE", False)
+    monkeypatch.setattr(Config, "ENABLE_PAGE_CACHE", False)
+    return MangaTranslationPipeline(stages={"ocr": StubOCR(), "translator": StubTranslator(),
+                                            "inpainter": StubInpainter(),
+                                            "reintegrator": TextReintegrator(strict=False)})
@@ -0,0 +1,58 @@
+# core/tests/test_archive.py
+import zipfile
+from contextlib import nullcontext
+import cv2
+import numpy as np
+import pytest
+from core.archive import ArchiveReader, ArchiveWriter, PageBytes, encode_page
+
+PNG = cv2.imencode(".png", np.zeros((4, 4, 3), np.uint8))[1].tobytes()
+JPG = cv2.imencode(".jpg", np.zeros((4, 4, 3), np.uint8))[1].tobytes()
+
+@pytest.fixture
+def chapter(tmp_path):
+    path = tmp_path / "ch.cbz"
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in [("p10.jpg", JPG), ("p2.jpg", JPG), ("p2.png", PNG), ("ComicInfo.xml", b"<x/>")]:
+            z.writestr(name, data)
+    return path
+
+def test_reader_orders_pages_naturally(chapter):
+    with ArchiveReader(chapter) as r:
+        assert r.members == ["p2.jpg", "p2.png", "p10.jpg"] and r.extras == ["ComicInfo.xml"]
+        assert [p.decode().shape for p in r.pages()] == [(4, 4, 3)] * 3
+
+def test_writer_publishes_when_all_pages_arrive(chapter, tmp_path):
+    out = tmp_path / "out.cbz"
+    with ArchiveReader(chapter) as r, ArchiveWriter(out, len(r), r.extras, r) as w:
+        assert w.add("p10.jpg", JPG) == "p10.jpg"
+        assert w.add("p2.png", None) == "p2.png"
+        assert not out.exists()
+        w.add("p2.jpg", JPG)
+    assert sorted(zipfile.ZipFile(out).namelist()) == ["ComicInfo.xml", "p10.jpg", "p2.jpg"]
+
+def test_strip_rename_avoids_existing_member(chapter, tmp_path):
+    out = tmp_path / "out.cbz"
+    with ArchiveReader(chapter) as r, ArchiveWriter(out, len(r), r.extras, r) as w:
+        # p2.jpg رُمّز PNG (شريط): p2.png محجوز لصفحة أخرى لم تصل بعد
+        assert w.add("p2.jpg", PNG) == "p2 (2).png"
+        assert w.add("p2.png", PNG) == "p2.png"
+        assert w.add("p10.jpg", PNG) == "p10.png"
+    z = zipfile.ZipFile(out)
+    assert sorted(z.namelist()) == ["ComicInfo.xml", "p10.png", "p2 (2).png", "p2.png"]
+
+@pytest.mark.parametrize("fail", [True, False])
+def test_incomplete_archive_keeps_previous_output(chapter, tmp_path, fail):
+    out = tmp_path / "out.cbz"
+    out.write_bytes(b"previous")
+    with pytest.raises(RuntimeError) if fail else nullcontext():
+        with ArchiveReader(chapter) as r, ArchiveWriter(out, len(r), r.extras, r) as w:
+            w.add("p2.jpg", JPG)
+            if fail:
+                raise RuntimeError("worker died")
+    assert out.read_bytes() == b"previous"
+    assert not (tmp_path / "out.cbz.tmp").exists()
+
+def test_encode_page_keeps_member_format():
+    page = PageBytes("ch.cbz", "a/p1.jpg", JPG)
+    assert encode_page(page, np.zeros((4, 4, 3), np.uint8))[:2] == b"\xff\xd8"
@@ -0,0 +1,13 @@
+# core/tests/test_batching.py
+from core.batching import plan_batches, run_batched
+
+def test_batches_respect_token_budget_and_order():
+    lengths = [5, 50, 3, 40, 7, 8]
+    batches = plan_batches(lengths, token_budget=80, max_batch_size=2)
+    assert sorted(i for b in batches for i in b) == list(range(6))
+    for b in batches:
+        assert len(b) <= 2 and len(b) * max(lengths[i] for i in b) <= 80
+    seen = []
+    out = run_batched(list("abcdef"), lengths, lambda xs: (seen.append(len(xs)), [x.upper() for x in xs])[1],
+                      token_budget=80, max_batch_size=2)
+    assert out == list("ABCDEF") and sum(seen) == 6
@@ -0,0 +1,52 @@
+# core/tests/test_box_ops.py
+import numpy as np
+from core.box_ops import BoxTable, merge_boxes, reading_order, to_corners, to_rects
+
+def test_corners_and_rects_round_trip():
+    rects = np.array([[1, 2, 30, 40], [5, 6, 7, 8]], np.int32)
+    assert (to_rects(to_corners(rects)) == rects).all()
+    assert to_rects([]).shape == (0, 4)
+
+def test_merge_overlapping_adjacent_and_contained():
+    rects = [[0, 0, 10, 10], [5, 5, 20, 20], [100, 100, 110, 110], [102, 102, 105, 105], [22, 0, 30, 10]]
+    merged = sorted(merge_boxes(rects).tolist())
+    assert merged == [[0, 0, 20, 20], [22, 0, 30, 10], [100, 100, 110, 110]]
+    assert sorted(merge_boxes(rects, gap_x=2).tolist()) == [[0, 0, 30, 20], [100, 100, 110, 110]]
+
+def test_merge_respects_max_size():
+    # سلسلة متجاورة لا تتحول إلى صندوق واحد بعرض الصفحة
+    chain = [[i * 10, 0, i * 10 + 9, 9] for i in range(10)]
+    merged = merge_boxes(chain, gap_x=1, max_size=(30, 30))
+    assert len(merged) > 1 and ((merged[:, 2] - merged[:, 0]) <= 30).all()
+    assert merged[:, 0].min() == 0 and merged[:, 2].max() == 99
+
+def test_reading_order_right_to_left_rows():
+    rects = np.array([[0, 0, 10, 10], [50, 0, 60, 10], [0, 50, 10, 60], [50, 50, 60, 60]], np.int32)
+    assert reading_order(rects).tolist() == [1, 0, 3, 2]
+    assert reading_order(rects, rtl=False).tolist() == [0, 1, 2, 3]
+
+def test_table_blocks_round_trip_and_columns():
+    blocks = [{"bbox": [[1, 2], [9, 2], [9, 8], [1, 8]], "type": "narration", "extracted_text": "A"},
+              {"bbox": [[3, 4], [5, 4], [5, 6], [3, 6]], "type": "unknown", "extracted_text": "B"}]
+    table = BoxTable.of(blocks)
+    assert table.type_names() == ["narration", "other"] and table.translations is None
+    out = table.replace(translations=["أ", "ب"]).to_blocks()
+    assert out[0] == {**blocks[0], "translated_text": "أ"}
+    assert out[1]["type"] == "other"
+
+def test_take_concat_and_shift():
+    a = BoxTable([[0, 0, 1, 1], [2, 2, 3, 3]], texts=["x", "y"])
+    b = BoxTable([[4, 4, 5, 5]], ids=[7])
+    picked = a.take(np.array([False, True]))
+    assert picked.rects.tolist() == [[2, 2, 3, 3]] and picked.texts == ["y"] and picked.ids.tolist() == [1]
+    both = BoxTable.concat([a, BoxTable(np.zeros((0, 4))), b])
+    assert len(both) == 3 and both.ids.tolist() == [0, 1, 7] and both.texts is None
+    assert a.shifted(10).rects[:, [1, 3]].tolist() == [[10, 11], [12, 13]]
+    assert a.rects[0, 1] == 0   # shifted لا يعدّل الأصل
+
+def test_mask_includes_edges_and_clips():
+    table = BoxTable([[2, 1, 4, 3], [-5, -5, 0, 0], [8, 8, 20, 20]])
+    mask = table.mask((10, 10))
+    assert mask[1:4, 2:5].all() and mask[:4, 2:5].sum() == 255 * 9
+    assert mask[0, 0] == 255 and mask[9, 9] == 255
+    assert table.clipped((10, 10)).rects.tolist() == [[2, 1, 4, 3], [0, 0, 0, 0], [8, 8, 10, 10]]
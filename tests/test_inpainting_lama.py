@@ -0,0 +1,42 @@
+# core/tests/test_inpainting_lama.py
+import logging
+import numpy as np
+import pytest
+
+pytest.importorskip("lama_cleaner")
+from core.config import Config
+from core.box_ops import BoxTable
+from core.inpainting_lama import LamaInpainter
+
+def _inpainter(model):
+    """LamaInpainter دون تحميل الأوزان: model يحاكي ModelManager (float64 BGR بحجم المدخل)"""
+    inp = LamaInpainter.__new__(LamaInpainter)
+    inp.logger = logging.getLogger("LamaInpainter")
+    inp.model, inp.config, inp.roi_config = model, None, None
+    return inp
+
+def _float_model(value):
+    return lambda rgb, mask, config: np.full(rgb.shape, value, np.float64)
+
+@pytest.mark.parametrize("mode", ["full", "roi"])
+def test_inpaint_returns_uint8_in_place(monkeypatch, mode):
+    monkeypatch.setattr(Config, "INPAINT_MODE", mode)
+    image = np.zeros((64, 80, 3), np.uint8)
+    out = _inpainter(_float_model(300.7)).inpaint(image, BoxTable([[10, 10, 30, 20]]))
+    assert out is image and out.dtype == np.uint8
+    assert (image[10:21, 10:31] == 255).all()
+
+def test_roi_paste_rounds_and_clips(monkeypatch):
+    monkeypatch.setattr(Config, "INPAINT_MODE", "roi")
+    image = np.full((64, 80, 3), 7, np.uint8)
+    _inpainter(_float_model(-3.0)).inpaint(image, BoxTable([[0, 0, 5, 5]]))
+    assert (image[:6, :6] == 0).all()
+    assert (image[40:, 40:] == 7).all()    # خارج القناع دون تغيير
+
+def test_fallback_on_model_error(monkeypatch):
+    monkeypatch.setattr(Config, "INPAINT_MODE", "full")
+    def broken(*args):
+        raise RuntimeError("boom")
+    image = np.full((32, 32, 3), 50, np.uint8)
+    out = _inpainter(broken).inpaint(image, BoxTable([[4, 4, 10, 10]]))
+    assert out is image and out.dtype == np.uint8
@@ -0,0 +1,61 @@
+# core/tests/test_logger.py
+import os
+import logging
+import pytest
+from core import logger as core_logger
+from core.config import Config
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "LOG_DIR", tmp_path)
+    monkeypatch.setattr(Config, "LOG_FILE", tmp_path / "manga_translator.log")
+    monkeypatch.setattr(Config, "ERROR_LOG_FILE", tmp_path / "errors.log")
+    monkeypatch.setattr(Config, "PERFORMANCE_LOG_FILE", tmp_path / "performance.log")
+    monkeypatch.setattr(Config, "LOG_ASYNC", True)
+    monkeypatch.setattr(Config, "LOG_LEVEL", "INFO")
+    core_logger.setup_logging()
+    yield tmp_path
+    core_logger.stop_logging()
+    for name in ("", "performance"):
+        for h in logging.getLogger(name).handlers[:]:
+            logging.getLogger(name).removeHandler(h)
+
+def test_arguments_are_merged_when_logged(logs):
+    d = {"v": 1}
+    logging.getLogger("t").info("state %s", d)
+    d["v"] = 2
+    core_logger.flush_logging()
+    assert "state {'v': 1}" in (logs / "manga_translator.log").read_text(encoding="utf-8")
+
+def test_performance_records_go_to_their_own_file(logs):
+    logging.getLogger("performance").info('{"name": "x"}')
+    core_logger.flush_logging()
+    assert (logs / "performance.log").read_text(encoding="utf-8") == '{"name": "x"}\n'
+    assert '"name"' not in (logs / "manga_translator.log").read_text(encoding="utf-8")
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork only")
+def test_forked_child_logs_through_parent(logs):
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logging.getLogger("child").exception("boom %d", 7)
+            core_logger.flush_logging()
+            code = 0 if core_logger._listener.handlers[0].__class__.__name__ == "_Forward" else 2
+        finally:
+            os._exit(code)
+    assert os.waitpid(pid, 0)[1] == 0
+    core_logger.flush_logging()
+    text = (logs / "manga_translator.log").read_text(encoding="utf-8")
+    assert "child: boom 7" in text and "ZeroDivisionError" in text
+    assert "ZeroDivisionError" in (logs / "errors.log").read_text(encoding="utf-8")
+
+def test_rate_limit_keeps_warnings():
+    f = core_logger.RateLimitFilter(rates={"noisy": 1})
+    rec = lambda level: logging.LogRecord("noisy.sub", level, "", 0, "m", None, None)
+    kept = sum(f.filter(rec(logging.INFO)) for _ in range(50))
+    assert kept <= 2 and f.dropped["noisy"] >= 48
+    assert all(f.filter(rec(logging.WARNING)) for _ in range(10))
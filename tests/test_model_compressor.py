@@ -0,0 +1,46 @@
+# core/tests/test_model_compressor.py
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+from core.model_compressor import ModelCompressor
+from conftest import tiny_marian
+
+def _logits(model):
+    with torch.no_grad():
+        return model(input_ids=torch.tensor([[5, 6, 7, 1]]), decoder_input_ids=torch.tensor([[0, 5]])).logits
+
+def test_pruning_zeroes_linear_weights_but_not_tied_head():
+    comp = ModelCompressor()
+    model = comp.compress_model(tiny_marian(), "pruning", compression_ratio=0.5)
+    fc1 = model.model.encoder.layers[0].fc1.weight
+    assert (fc1 == 0).float().mean() >= 0.5
+    assert model.lm_head.weight.data_ptr() == model.model.shared.weight.data_ptr()
+    assert (model.model.shared.weight[1:] != 0).all()   # الصف 0 هو padding_idx
+
+def test_int8_artifact_is_built_once_and_reloaded(tmp_path):
+    comp, calls = ModelCompressor(tmp_path), []
+    def loader():
+        calls.append(1)
+        return tiny_marian()
+    built = comp.load_or_compress("org/tiny", loader, method="int8_sparse", compression_ratio=0.3)
+    path = comp.artifact_path("org/tiny", "int8_sparse", 0.3)
+    assert (path / "manifest.json").exists() and path.name == "org--tiny-int8_sparse-0.3"
+    again = comp.load_or_compress("org/tiny", loader, method="int8_sparse", compression_ratio=0.3)
+    assert len(calls) == 1
+    assert torch.allclose(_logits(built), _logits(again))
+    assert abs(comp.sparsity(again) - comp.sparsity(built)) < 1e-6
+    assert comp._model_size(again) < comp._model_size(tiny_marian())
+
+def test_unusable_artifact_is_rebuilt(tmp_path):
+    comp = ModelCompressor(tmp_path)
+    comp.load_or_compress("tiny", tiny_marian, method="int8")
+    manifest = comp.artifact_path("tiny", "int8", 0.3) / "manifest.json"
+    manifest.write_text(manifest.read_text().replace(torch.__version__, "0.0"))
+    calls = []
+    comp.load_or_compress("tiny", lambda: calls.append(1) or tiny_marian(), method="int8")
+    assert calls and torch.__version__ in manifest.read_text()
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        ModelCompressor().compress_model(tiny_marian(), "zip")
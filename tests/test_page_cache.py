@@ -0,0 +1,59 @@
+# core/tests/test_page_cache.py
+import cv2
+import numpy as np
+import pytest
+from core.config import Config
+from core.page_cache import PageCache, phash, _thumb
+from conftest import make_page
+
+BLOCKS = [{"bbox": [[10, 10], [60, 10], [60, 40], [10, 40]], "type": "speech",
+           "extracted_text": "HELLO", "translated_text": "مرحبا"}]
+
+def _page(text):
+    img = make_page(bubbles=1)
+    cv2.putText(img, text, (20, 580), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    return img
+
+def test_identical_page_hits_and_stats_see_existing_entries(tmp_path):
+    page = _page("CHAPTER 12")
+    cache = PageCache(tmp_path)
+    cache.add(PageCache.fingerprint(page), page, BLOCKS, sig=1, secs=2.0)
+    fresh = PageCache(tmp_path)    # عملية أخرى / تشغيل لاحق
+    assert fresh.stats()["entries"] == 1
+    final, blocks = fresh.lookup(PageCache.fingerprint(page.copy()), sig=1)
+    assert final.shape == page.shape and blocks == BLOCKS
+    assert fresh.stats()["hits"] == 1 and fresh.stats()["saved_s"] > 0
+
+def test_small_text_change_or_other_settings_miss(tmp_path):
+    cache = PageCache(tmp_path)
+    page = _page("CHAPTER 12")
+    cache.add(PageCache.fingerprint(page), page, BLOCKS, sig=1, secs=1.0)
+    assert cache.lookup(PageCache.fingerprint(_page("CHAPTER 13")), sig=1) is None
+    assert cache.lookup(PageCache.fingerprint(page), sig=2) is None
+
+def test_other_resolution_needs_verification(tmp_path):
+    cache = PageCache(tmp_path)
+    page = _page("CHAPTER 12")
+    cache.add(PageCache.fingerprint(page), page, BLOCKS, sig=1, secs=1.0)
+    small = cv2.resize(page, (200, 300), interpolation=cv2.INTER_AREA)
+    fp = PageCache.fingerprint(small)
+    assert cache.lookup(fp, sig=1) is None
+    assert cache.lookup(fp, sig=1, verify=lambda blocks: False) is None
+    final, blocks = cache.lookup(fp, sig=1, verify=lambda blocks: True)
+    assert final.shape == small.shape and blocks[0]["bbox"][2] == [30, 20]
+
+def test_eviction_bounds_disk_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "PAGE_CACHE_MAX_MB", 1)
+    cache = PageCache(tmp_path)
+    rng = np.random.default_rng(0)
+    for i in range(6):
+        noise = rng.integers(0, 255, (400, 400, 3), dtype=np.uint8)   # لا يُضغط: ~0.5 MB لكل مدخل
+        cache.add(PageCache.fingerprint(noise), noise, [], sig=1, secs=1.0)
+    assert cache.evicted > 0
+    assert cache.stats()["entries"] == len([d for d in tmp_path.iterdir() if d.is_dir()])
+
+def test_phash_is_stable_under_recompression():
+    page = cv2.cvtColor(_page("X"), cv2.COLOR_BGR2GRAY)
+    jpg = cv2.imdecode(cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, 70])[1], cv2.IMREAD_GRAYSCALE)
+    diff = bin(int(phash(_thumb(page))) ^ int(phash(_thumb(jpg)))).count("1")
+    assert diff <= Config.PAGE_CACHE_MAX_DISTANCE
@@ -0,0 +1,60 @@
+# core/tests/test_page_store.py
+import threading
+import numpy as np
+import pytest
+from core.page_store import PageStore, _dir_bytes
+
+@pytest.fixture
+def store(tmp_path):
+    return PageStore(root=tmp_path / "store", max_mb=1)
+
+def _run(fn, *args, timeout=5):
+    """تشغيل fn في خيط مع مهلة: القفل غير القابل لإعادة الدخول كان يعلّق المحرر للأبد"""
+    t = threading.Thread(target=fn, args=args, daemon=True)
+    t.start(); t.join(timeout)
+    assert not t.is_alive(), f"{fn.__name__} did not return"
+
+def test_editor_calls_do_not_deadlock(store):
+    key = "page"
+    store.save(key, {"version": 1, "sigs": {}, "blocks": [], "boxes_edited": False})
+    _run(store.add_block, key, [0, 0, 10, 10])
+    _run(store.set_source_text, key, 0, "HELLO")
+    _run(store.set_translation, key, 0, "مرحبا")
+    _run(store.set_type, key, 0, "narration")
+    page = store.load(key)
+    assert page["blocks"] == [{"bbox": [0, 0, 10, 10], "type": "narration", "extracted_text": "HELLO",
+                               "text_edited": True, "translated_text": "مرحبا", "translation_edited": True}]
+    assert page["boxes_edited"]
+    _run(store.set_bbox, key, 0, [1, 1, 5, 5])
+    assert store.load(key)["blocks"] == [{"bbox": [1, 1, 5, 5], "type": "narration"}]
+    _run(store.remove_block, key, 0)
+    assert store.load(key)["blocks"] == []
+
+def test_concurrent_edits_are_not_lost(store):
+    key = "page"
+    store.save(key, {"version": 1, "sigs": {}, "blocks": [], "boxes_edited": False})
+    threads = [threading.Thread(target=store.add_block, args=(key, [i, i, i + 1, i + 1])) for i in range(20)]
+    for t in threads: t.start()
+    for t in threads: t.join(5)
+    assert len(store.load(key)["blocks"]) == 20
+
+def test_overwrite_accounts_size_difference(store):
+    store.save("a", {"blocks": ["x" * 1000]})
+    for _ in range(5):
+        store.save("a", {"blocks": ["x" * 1000]})
+    assert store._bytes == _dir_bytes(store.root)
+    store.save("a", {"blocks": []})
+    assert store._bytes == _dir_bytes(store.root)
+
+def test_eviction_keeps_current_page(store, tmp_path):
+    image = np.random.default_rng(0).integers(0, 255, (300, 400, 3), dtype=np.uint8)
+    for key in ("a", "b", "c", "d", "e"):
+        store.save_cleaned(key, image)
+    assert store.load_cleaned("e") is not None
+    assert _dir_bytes(store.root) <= store.max_bytes
+    assert store._bytes == _dir_bytes(store.root)
+
+def test_load_missing_or_stale_version(store):
+    assert store.load("missing")["blocks"] == []
+    store.save("old", {"version": 0, "blocks": [{"bbox": [0, 0, 1, 1]}]})
+    assert store.load("old")["blocks"] == []
@@ -0,0 +1,45 @@
+# core/tests/test_performance_monitor.py
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+from core.performance_monitor import Tracer, read_trace_records, summarize_records
+
+def test_spans_nest_and_flush(caplog):
+    tracer = Tracer()
+    with tracer.span("page") as outer:
+        with tracer.span("ocr", boxes=3):
+            pass
+    with caplog.at_level(logging.INFO, logger="performance"):
+        recs = tracer.flush()
+    assert [r["name"] for r in recs] == ["ocr", "page"]
+    assert recs[0]["parent"] == outer.id and recs[0]["attrs"] == {"boxes": 3}
+    assert [json.loads(m)["name"] for m in caplog.messages] == ["ocr", "page"]
+    assert tracer.flush() == []
+    assert set(tracer.percentiles()) == {"ocr", "page"}
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+    with tracer.span("page") as span:
+        span.attrs["x"] = 1
+    assert span.attrs == {}
+    assert tracer.flush() == [] and tracer.percentiles() == {}
+
+def test_read_trace_records_includes_rotated_backups(tmp_path):
+    path = tmp_path / "performance.log"
+    out = logging.getLogger("test.performance.rotate")
+    out.propagate = False
+    out.setLevel(logging.INFO)
+    fh = RotatingFileHandler(path, maxBytes=2000, backupCount=5, encoding="utf-8")
+    out.addHandler(fh)
+    try:
+        tracer = Tracer()
+        tracer.out = out
+        for i in range(60):
+            tracer.record("page", 1000, i=i)
+        tracer.flush()
+    finally:
+        out.removeHandler(fh); fh.close()
+    assert (tmp_path / "performance.log.1").exists()
+    recs = read_trace_records(path)
+    assert [r["attrs"]["i"] for r in recs] == list(range(60))
+    assert summarize_records(recs)["page"]["count"] == 60
@@ -0,0 +1,109 @@
+# core/tests/test_server.py
+import json
+import asyncio
+import cv2
+import numpy as np
+import pytest
+from core.config import Config
+from core.server import TranslationServer, MicroBatcher, Overloaded
+from conftest import make_page
+
+@pytest.fixture
+def roots(tmp_path, monkeypatch):
+    inp, out = tmp_path / "in", tmp_path / "out"
+    inp.mkdir()
+    cv2.imwrite(str(inp / "p1.png"), make_page())
+    (tmp_path / "secret.png").write_bytes((inp / "p1.png").read_bytes())
+    monkeypatch.setattr(Config, "SERVER_INPUT_DIR", inp)
+    monkeypatch.setattr(Config, "SERVER_OUTPUT_DIR", out)
+    return inp, out
+
+async def _request(port, method, path, body=b"", ctype="application/json"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    head, _, payload = (await reader.read()).partition(b"\r\n\r\n")
+    writer.close()
+    status = int(head.split()[1])
+    return status, json.loads(payload) if b"application/json" in head else payload
+
+def _serve(pipeline, *requests):
+    async def main():
+        server = TranslationServer(pipeline, port=0)
+        _, port = await server.start()
+        try:
+            return [await _request(port, *r) for r in requests]
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+def _page(**req):
+    return ("POST", "/v1/page", json.dumps(req).encode())
+
+def test_json_page_paths_stay_inside_roots(pipeline, roots):
+    inp, out = roots
+    results = _serve(pipeline,
+                     _page(path="p1.png"),
+                     _page(path="p1.png", output="sub/x.png"),
+                     _page(path="../secret.png"),
+                     _page(path=str(inp.parent / "secret.png")),
+                     _page(path="p1.png", output="../escape.png"),
+                     _page(path="p1.png", output="/tmp/escape.png"),
+                     _page(path="missing.png"),
+                     _page(path=3))
+    (s1, r1), (s2, r2), *rejected = results
+    assert (s1, r1["output"]) == (200, str((out / "p1.png").resolve())) and r1["blocks"]
+    assert s2 == 200 and (out / "sub" / "x.png").exists()
+    assert [s for s, _ in rejected] == [400] * 6
+    assert not (out.parent / "escape.png").exists()
+
+def test_page_upload_returns_png(pipeline, roots):
+    ok, png = cv2.imencode(".png", make_page())
+    (status, body), (bad, _) = _serve(pipeline, ("POST", "/v1/page", png.tobytes(), "image/png"),
+                                      ("POST", "/v1/page", b"garbage", "image/png"))
+    assert status == 200 and cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR).shape == (600, 400, 3)
+    assert bad == 400
+
+def test_translate_limit_counts_texts(pipeline, monkeypatch):
+    monkeypatch.setattr(Config, "SERVER_MAX_PENDING_TEXTS", 4)
+    (ok, r), (too_many, _) = _serve(pipeline,
+                                    ("POST", "/v1/translate", json.dumps({"texts": ["A", "B"]}).encode()),
+                                    ("POST", "/v1/translate", json.dumps({"texts": ["A"] * 5}).encode()))
+    assert ok == 200 and r["translations"] == ["ترجمة a", "ترجمة b"]
+    assert too_many == 400
+
+def test_admission_limits_use_separate_units(pipeline, monkeypatch):
+    monkeypatch.setattr(Config, "SERVER_MAX_QUEUE", 2)
+    monkeypatch.setattr(Config, "SERVER_MAX_PENDING_TEXTS", 10)
+    async def main():
+        server = TranslationServer(pipeline, port=0)
+        server.batcher.pending = 50        # كثير من النصوص المنتظرة لا يرفض الصفحات
+        async with server._page_slot():
+            pass
+        server.pages_waiting = 2
+        with pytest.raises(Overloaded):
+            async with server._page_slot():
+                pass
+        server.pages_waiting, server.batcher.pending = 0, 9
+        with pytest.raises(Overloaded):
+            await server.translate(["a", "b"])
+        return server.counts["rejected"]
+    assert asyncio.run(main()) == 2
+
+def test_micro_batcher_groups_concurrent_submits():
+    async def main():
+        from concurrent.futures import ThreadPoolExecutor
+        calls = []
+        def fn(items):
+            calls.append(list(items))
+            return [x * 2 for x in items]
+        with ThreadPoolExecutor(1) as pool:
+            b = MicroBatcher(fn, pool, window_ms=20, max_size=3)
+            task = asyncio.create_task(b.run())
+            results = await asyncio.gather(*(b.submit(i) for i in range(5)))
+            task.cancel()
+        return results, calls
+    results, calls = asyncio.run(main())
+    assert results == [0, 2, 4, 6, 8]
+    assert [len(c) for c in calls] == [3, 2]
@@ -0,0 +1,73 @@
+# core/tests/test_strip.py
+import io
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+from core.archive import PageBytes
+from core.config import Config
+from core.strip import PNGStreamWriter, StripProcessor, StripReader, is_strip
+from conftest import make_page
+
+def _noise(h=300, w=64):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (h, w, 3), np.uint8)
+    img[::7] = img[::7] // 2   # صفوف متكررة جزئياً فيختار المرمّز فلاتر Up/Avg/Paeth
+    return img
+
+def _read_in_windows(reader, step=37):
+    out = []
+    for y in range(0, reader.height, step):
+        out.append(reader.rows(max(0, y - 5), min(y + step, reader.height))[y - max(0, y - 5):].copy())
+        reader.release(max(0, y + step - 5))
+        assert len(reader.buf) <= step + 5    # لا يبقى في الذاكرة إلا ما بعد آخر release
+    return np.concatenate(out)
+
+def test_writer_output_decodes_to_same_pixels(tmp_path):
+    img = _noise()
+    writer = PNGStreamWriter(tmp_path / "s.png", img.shape[1], img.shape[0])
+    for y in range(0, len(img), 100):
+        writer.write_rows(img[y:y + 100])
+    writer.close()
+    assert (cv2.imread(str(tmp_path / "s.png")) == img).all()
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "P"])
+def test_reader_decodes_png_in_windows(tmp_path, mode):
+    rgb = _noise()[:, :, ::-1]
+    im = Image.fromarray(np.ascontiguousarray(rgb)).convert(mode)
+    path = tmp_path / "p.png"
+    im.save(path, optimize=False)
+    expected = np.asarray(im.convert("RGB"))[:, :, ::-1]
+    reader = StripReader(path)
+    assert reader.image is None     # فك تدريجي لا فك كامل
+    assert (_read_in_windows(reader) == expected).all()
+    reader.close()
+
+def test_reader_falls_back_to_full_decode_for_jpeg():
+    data = cv2.imencode(".jpg", _noise())[1].tobytes()
+    reader = StripReader(PageBytes("a.cbz", "p.jpg", data))
+    assert reader.image is not None
+    assert (_read_in_windows(reader) == cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)).all()
+
+def test_reader_rejects_truncated_png(tmp_path):
+    data = cv2.imencode(".png", _noise())[1].tobytes()
+    reader = StripReader(PageBytes("a.cbz", "p.png", data[:len(data) // 2]))
+    with pytest.raises(OSError):
+        reader.rows(0, reader.height)
+    with pytest.raises(OSError):
+        StripReader(PageBytes("a.cbz", "p.png", data[:20]))
+
+def test_processor_translates_every_bubble_once(pipeline, monkeypatch):
+    monkeypatch.setattr(Config, "STRIP_SLICE_HEIGHT", 500)
+    monkeypatch.setattr(Config, "STRIP_OVERLAP", 120)
+    monkeypatch.setattr(Config, "STRIP_MIN_HEIGHT", 1000)
+    # فقاعات متساوية البعد، بعضها يعبر حدود الشرائح (500، 1000...)
+    img = make_page(w=400, h=2000, bubbles=8)
+    page = PageBytes("a.cbz", "strip.png", cv2.imencode(".png", img)[1].tobytes())
+    assert is_strip(page)
+    data, blocks = StripProcessor(pipeline).process_page(page, None)
+    out = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert out.shape == img.shape
+    centres = sorted((b["bbox"][0][1] + b["bbox"][2][1]) // 2 for b in blocks)
+    assert len(blocks) == len(pipeline.detect(img)) and len(set(centres)) == len(centres)
+    assert all(b["translated_text"].startswith("ترجمة") for b in blocks)
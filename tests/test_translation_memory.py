@@ -0,0 +1,35 @@
+# core/tests/test_translation_memory.py
+import pytest
+from core.config import Config
+from core.translation_memory import TranslationMemory
+
+def test_lookup_normalizes_and_survives_reopen(tmp_path):
+    tm = TranslationMemory(tmp_path / "tm.db", model_id="m")
+    tm.store(["Hello  world"], ["مرحبا بالعالم"], "neutral")
+    tm.close()
+    tm = TranslationMemory(tmp_path / "tm.db", model_id="m")
+    assert tm.lookup(["Hello world ", "other"], "neutral") == {0: "مرحبا بالعالم"}
+    assert tm.get_stats()["tm_hits"] == 1 and tm.get_stats()["tm_misses"] == 1
+
+def test_model_id_and_emotion_separate_entries(tmp_path):
+    a = TranslationMemory(tmp_path / "tm.db", model_id="a")
+    a.store(["Hi"], ["أهلا"], "neutral")
+    b = TranslationMemory(tmp_path / "tm.db", model_id="b")
+    assert b.lookup(["Hi"], "neutral") == {}
+    assert a.lookup(["Hi"], "angry") == {}
+
+def test_memory_id_covers_backend_and_decoding(monkeypatch):
+    translator = pytest.importorskip("core.ai_translator")
+    ids = set()
+    for backend, beams in (("torch", 4), ("onnx", 4), ("torch", 1)):
+        monkeypatch.setattr(Config, "INFERENCE_BACKEND", backend)
+        monkeypatch.setattr(Config, "TRANSLATION_BEAM_SIZE", beams)
+        ids.add(translator.AITranslator._memory_id("m"))
+    assert len(ids) == 3
+
+def test_decoding_is_deterministic_unless_sampling(monkeypatch):
+    translator = pytest.importorskip("core.ai_translator")
+    monkeypatch.setattr(Config, "TRANSLATION_SAMPLING", False)
+    assert translator.AITranslator._decoding() == {"do_sample": False}
+    monkeypatch.setattr(Config, "TRANSLATION_SAMPLING", True)
+    assert translator.AITranslator._decoding()["do_sample"] is True
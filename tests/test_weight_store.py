@@ -0,0 +1,46 @@
+# core/tests/test_weight_store.py
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+from core.weight_store import WeightStore
+from conftest import tiny_marian
+
+def _logits(model):
+    ids = torch.tensor([[5, 6, 7, 1]])
+    with torch.no_grad():
+        return model(input_ids=ids, decoder_input_ids=torch.tensor([[0, 5]])).logits
+
+def test_round_trip_maps_file_and_keeps_ties(tmp_path):
+    model = tiny_marian()
+    store = WeightStore(tmp_path)
+    assert store.can_store(model) and not store.exists("m")
+    store.save("m", model)
+    loaded = store.load("m")
+    assert store.exists("m") and store.size_mb("m") > 0
+    assert torch.equal(_logits(model), _logits(loaded))
+    # lm_head مربوط بالـ embedding بعد التحميل، والأوزان نسخة copy-on-write من الملف لا من الأصل
+    assert loaded.lm_head.weight.data_ptr() == loaded.model.shared.weight.data_ptr()
+    weight = loaded.model.encoder.layers[0].fc1.weight
+    assert weight.data_ptr() != model.model.encoder.layers[0].fc1.weight.data_ptr()
+    with torch.no_grad():
+        weight.add_(1)
+    assert torch.equal(_logits(model), _logits(store.load("m")))   # التعديل لا يصل إلى الملف
+    assert loaded.generation_config.decoder_start_token_id == 0
+
+def test_half_precision_and_replace(tmp_path):
+    store = WeightStore(tmp_path)
+    model = tiny_marian().to(torch.bfloat16)
+    store.save("m", model)
+    loaded = store.load("m")
+    assert loaded.model.shared.weight.dtype == torch.bfloat16
+    assert torch.equal(loaded.model.shared.weight, model.model.shared.weight)
+    store.save("m", tiny_marian())          # الكتابة فوق مفتاح موجود
+    assert store.load("m").model.shared.weight.dtype == torch.float32
+    store.remove("m")
+    assert not store.exists("m")
+
+def test_quantized_models_are_not_storable():
+    q = torch.ao.quantization.quantize_dynamic(tiny_marian(), {torch.nn.Linear}, dtype=torch.qint8)
+    assert not WeightStore.can_store(q)
+    assert not WeightStore.can_store(torch.nn.Linear(2, 2))   # بدون config
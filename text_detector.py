@@ -1,19 +1,39 @@
 # core/text_detector.py
 import cv2, numpy as np, logging
+from .config import Config
+from .box_ops import BoxTable, merge_boxes, reading_order
 
 class TextDetector:
     def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_stats = {}
+        self.stats = {"pages": 0, "boxes_raw": 0, "boxes": 0}
 
     def detect(self, image):
-        gray    = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        """يعيد BoxTable بترتيب القراءة"""
+        gray    = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         blurred = cv2.GaussianBlur(gray, (5,5), 0)
         edged   = cv2.Canny(blurred, 30,150)
         contours,_ = cv2.findContours(edged, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        boxes=[]
-        for cnt in contours:
-            x,y,w,h = cv2.boundingRect(cnt)
-            if 15<w<500 and 8<h<200:
-                boxes.append([[x,y],[x+w,y],[x+w,y+h],[x,y+h]])
-        self.logger.debug(f"Detected {len(boxes)} text boxes")
-        return boxes
\ No newline at end of file
+        rects = np.array([cv2.boundingRect(c) for c in contours], np.int32).reshape(-1,4)
+        # x,y,w,h → x1,y1,x2,y2 مع استبعاد الحواف الكبيرة (إطارات اللوحات) والنقاط الصغيرة جداً
+        w, h = rects[:,2], rects[:,3]
+        max_w, max_h = Config.DETECTOR_MAX_BOX
+        rects = rects[(w >= 2) & (h >= 2) & (w < max_w) & (h < max_h)]
+        rects[:,2:] += rects[:,:2]
+        raw = len(rects)
+
+        # دمج الحروف إلى أسطر والأسطر إلى فقاعات، ثم ترتيب القراءة
+        rects = merge_boxes(rects, *Config.DETECTOR_MERGE_GAP, max_size=Config.DETECTOR_MAX_BOX)
+        min_w, min_h = Config.DETECTOR_MIN_BOX
+        w, h = rects[:,2]-rects[:,0], rects[:,3]-rects[:,1]
+        rects = rects[(w > min_w) & (h > min_h)]
+        rects = rects[reading_order(rects, rtl=Config.READING_ORDER_RTL)]
+
+        boxes = BoxTable(rects)
+        self.last_stats = {"boxes_raw": raw, "boxes": len(boxes)}
+        self.stats["pages"] += 1
+        self.stats["boxes_raw"] += raw
+        self.stats["boxes"] += len(boxes)
+        self.logger.debug("Detected %d text boxes (%d fragments before merging)", len(boxes), raw)
+        return boxes
@@ -0,0 +1,82 @@
+# core/text_layout.py
+import logging
+from functools import lru_cache
+from PIL import ImageFont
+from .config import Config
+
+class TextLayoutEngine:
+    """تخطيط النص داخل الفقاعات مع ذاكرة للخطوط حسب الحجم ولعرض الكلمات المقاسة"""
+
+    def __init__(self, font_path, min_size=None, max_size=None, spacing=4, padding=5):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.font_path = font_path
+        self.min_size = min_size or Config.LAYOUT_MIN_FONT_SIZE
+        self.max_size = max_size or Config.LAYOUT_MAX_FONT_SIZE
+        self.spacing = spacing
+        self.padding = padding
+        self.font = lru_cache(maxsize=Config.LAYOUT_FONT_CACHE_SIZE)(self._load_font)
+        self._widths = {}
+        self._warned = False
+
+    def _load_font(self, size):
+        try:
+            return ImageFont.truetype(self.font_path, size)
+        except OSError:
+            if not self._warned:
+                self.logger.warning("Could not load %s, using default font", self.font_path)
+                self._warned = True
+            return ImageFont.load_default()
+
+    def width(self, word, size):
+        key = (size, word)
+        w = self._widths.get(key)
+        if w is None:
+            if len(self._widths) >= Config.LAYOUT_WIDTH_CACHE_SIZE:
+                self._widths.clear()
+            w = self._widths[key] = self.font(size).getlength(word)
+        return w
+
+    def line_height(self, size):
+        ascent, descent = self.font(size).getmetrics()
+        return ascent + descent
+
+    def wrap(self, text, size, max_w):
+        """تقسيم النص إلى أسطر (خطي في عدد الكلمات). يعيد (الأسطر، أكبر عرض)"""
+        space = self.width(" ", size)
+        lines, line, line_w, widest = [], [], 0.0, 0.0
+        for word in text.split():
+            ww = self.width(word, size)
+            new_w = line_w + space + ww if line else ww
+            if new_w <= max_w or not line:
+                line.append(word); line_w = new_w
+            else:
+                lines.append(" ".join(line)); widest = max(widest, line_w)
+                line, line_w = [word], ww
+        if line:
+            lines.append(" ".join(line)); widest = max(widest, line_w)
+        return lines, widest
+
+    def _fits(self, text, size, w, h):
+        lines, widest = self.wrap(text, size, w)
+        th = len(lines)*self.line_height(size) + max(0, len(lines)-1)*self.spacing
+        return widest <= w and th <= h, lines, widest, th
+
+    def layout(self, text, box_w, box_h):
+        """اختيار أكبر حجم خط يتسع فيه النص داخل الصندوق (بحث ثنائي).
+        يعيد (font, النص الملتف، العرض، الارتفاع)"""
+        w = max(1, box_w - 2*self.padding)
+        h = max(1, box_h - 2*self.padding)
+        lo, hi = self.min_size, self.max_size
+        best = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            ok, lines, tw, th = self._fits(text, mid, w, h)
+            if ok:
+                best = (mid, lines, tw, th); lo = mid + 1
+            else:
+                hi = mid - 1
+        if best is None:
+            _, lines, tw, th = self._fits(text, self.min_size, w, h)
+            best = (self.min_size, lines, tw, th)
+        size, lines, tw, th = best
+        return self.font(size), "\n".join(lines), int(tw), int(th)
\ No newline at end of file
@@ -0,0 +1,72 @@
+# core/translation_memory.py
+import re, sqlite3, hashlib, threading, unicodedata, logging
+from pathlib import Path
+
+class TranslationMemory:
+    """ذاكرة ترجمة دائمة (SQLite) مفتاحها النص المطبّع + السياق العاطفي + معرّف النموذج"""
+
+    def __init__(self, path, model_id):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self.model_id = model_id
+        self.hits = 0
+        self.misses = 0
+        self.reopen()
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tm ("
+                " key TEXT PRIMARY KEY, source TEXT, emotion TEXT, model TEXT, target TEXT)")
+
+    def reopen(self):
+        """اتصال وقفل جديدان؛ تستدعيه العملية الناتجة عن fork (core.batch) قبل أي استعلام.
+        الاتصال الموروث يُترك دون close: إغلاقه من العملية الابنة قد يمس ملفات الأب المفتوحة"""
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+
+    @staticmethod
+    def normalize(text):
+        text = unicodedata.normalize("NFKC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def make_key(self, text, emotion):
+        raw = f"{self.model_id}\x1f{emotion}\x1f{self.normalize(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, texts, emotion):
+        """يعيد dict {index: ترجمة} للنصوص الموجودة في الذاكرة"""
+        keys = [self.make_key(t, emotion) for t in texts]
+        found = {}
+        with self.lock:
+            uniq = list(dict.fromkeys(keys))
+            for i in range(0, len(uniq), 500):
+                chunk = uniq[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT key, target FROM tm WHERE key IN ({','.join('?'*len(chunk))})",
+                    chunk).fetchall()
+                found.update(rows)
+            hits = {i: found[k] for i, k in enumerate(keys) if k in found}
+            self.hits += len(hits)
+            self.misses += len(texts) - len(hits)
+        return hits
+
+    def store(self, texts, translations, emotion):
+        rows = [(self.make_key(s, emotion), self.normalize(s), emotion, self.model_id, t)
+                for s, t in zip(texts, translations)]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tm (key, source, emotion, model, target) VALUES (?,?,?,?,?)",
+                rows)
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "tm_hits": self.hits,
+            "tm_misses": self.misses,
+            "tm_hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,134 @@
+# core/weight_store.py
+import os, json, shutil, importlib, logging
+from pathlib import Path
+import numpy as np
+import torch
+
+_ALIGN = 64
+_DTYPES = {
+    torch.float32: ("float32", np.float32),
+    torch.float16: ("float16", np.float16),
+    torch.bfloat16: ("bfloat16", np.int16),   # numpy لا يدعم bfloat16، نخزّن البتات كما هي
+    torch.int64: ("int64", np.int64),
+    torch.int32: ("int32", np.int32),
+    torch.uint8: ("uint8", np.uint8),
+    torch.bool: ("bool", np.bool_),
+}
+_BY_NAME = {name: (tdt, ndt) for tdt, (name, ndt) in _DTYPES.items()}
+
+def _class_path(obj):
+    cls = type(obj)
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+def _resolve(path):
+    module, qualname = path.split(":")
+    obj = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+class WeightStore:
+    """مخزن أوزان بصيغة ملف ثنائي واحد يُفتح بـ mmap + manifest صغير.
+    التحميل لا ينسخ الأوزان: الـ tensors تشير مباشرة إلى صفحات الملف (copy-on-write)،
+    فتتشارك العمليات على نفس الجهاز نفس صفحات الـ page cache."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def path(self, key):
+        return self.root / key
+
+    def exists(self, key):
+        return (self.path(key) / "manifest.json").exists()
+
+    @staticmethod
+    def can_store(obj):
+        if hasattr(obj, "save_pretrained") and not isinstance(obj, torch.nn.Module):
+            return True
+        if not isinstance(obj, torch.nn.Module) or not hasattr(getattr(obj, "config", None), "to_dict"):
+            return False
+        return all(isinstance(t, torch.Tensor) and t.dtype in _DTYPES and not t.is_quantized
+                   for t in obj.state_dict().values())
+
+    def save(self, key, obj):
+        final = self.path(key)
+        tmp = final.with_name(final.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        manifest = {"format": 1, "class": _class_path(obj)}
+        if isinstance(obj, torch.nn.Module):
+            manifest.update(kind="module", config=obj.config.to_dict(),
+                            **self._write_tensors(tmp / "weights.bin", obj.state_dict()))
+            if getattr(obj, "generation_config", None) is not None:
+                manifest["generation_config"] = obj.generation_config.to_dict()
+        else:
+            manifest["kind"] = "pretrained"
+            obj.save_pretrained(str(tmp))
+        (tmp / "manifest.json").write_text(json.dumps(manifest))
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+
+    def _write_tensors(self, path, state):
+        tensors, aliases, seen = {}, {}, {}
+        offset = 0
+        with open(path, "wb") as f:
+            for name, t in state.items():
+                ptr = (t.data_ptr(), t.dtype, tuple(t.shape))
+                if ptr in seen:           # أوزان مربوطة (مثل lm_head ↔ shared)
+                    aliases[name] = seen[ptr]; continue
+                seen[ptr] = name
+                arr = t.detach().cpu().contiguous()
+                if arr.dtype == torch.bfloat16: arr = arr.view(torch.int16)
+                buf = arr.numpy().tobytes()
+                pad = (-offset) % _ALIGN
+                f.write(b"\0" * pad); offset += pad
+                tensors[name] = {"offset": offset, "dtype": _DTYPES[t.dtype][0],
+                                 "shape": list(t.shape)}
+                f.write(buf); offset += len(buf)
+        return {"tensors": tensors, "aliases": aliases}
+
+    def load(self, key):
+        root = self.path(key)
+        manifest = json.loads((root / "manifest.json").read_text())
+        cls = _resolve(manifest["class"])
+        if manifest["kind"] == "pretrained":
+            return cls.from_pretrained(str(root))
+
+        state = self._map_tensors(root / "weights.bin", manifest)
+        config = cls.config_class.from_dict(manifest["config"])
+        with torch.device("meta"):
+            model = cls(config)
+        model.load_state_dict(state, strict=False, assign=True)
+        if hasattr(model, "tie_weights"): model.tie_weights()
+        if "generation_config" in manifest:
+            from transformers import GenerationConfig
+            model.generation_config = GenerationConfig.from_dict(manifest["generation_config"])
+        leftover = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+        if leftover:
+            raise RuntimeError(f"Weight store '{key}' is missing tensors: {leftover[:5]}")
+        return model.eval()
+
+    def _map_tensors(self, path, manifest):
+        if os.path.getsize(path) == 0:
+            return {}
+        mm = np.memmap(path, dtype=np.uint8, mode="c")
+        state = {}
+        for name, meta in manifest["tensors"].items():
+            tdt, ndt = _BY_NAME[meta["dtype"]]
+            count = int(np.prod(meta["shape"], dtype=np.int64))
+            nbytes = count * np.dtype(ndt).itemsize
+            arr = mm[meta["offset"]:meta["offset"]+nbytes].view(ndt).reshape(meta["shape"])
+            t = torch.from_numpy(arr)
+            state[name] = t.view(tdt) if tdt == torch.bfloat16 else t
+        for name, target in manifest["aliases"].items():
+            state[name] = state[target]
+        return state
+
+    def size_mb(self, key):
+        root = self.path(key)
+        return round(sum(f.stat().st_size for f in root.rglob("*") if f.is_file())/(1024*1024), 2)
+
+    def remove(self, key):
+        shutil.rmtree(self.path(key), ignore_errors=True)
\ No newline at end of file